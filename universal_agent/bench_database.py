@@ -0,0 +1,54 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from core.database import Database, SAVE_TASK_SQL
+from core.types import Task, TaskStatus
+
+def legacy_save(db_path: str, params: tuple):
+    # What Database.save_task used to do: connect, write, commit, close (rollback journal)
+    conn = sqlite3.connect(db_path)
+    conn.execute(SAVE_TASK_SQL, params)
+    conn.commit()
+    conn.close()
+
+def run(count: int):
+    print("=== TASK SAVE THROUGHPUT ===")
+    print(f"{count} tasks x 3 status transitions (pending -> running -> completed)\n")
+
+    tasks = [Task(description=f"Benchmark task {i}", metadata={"type": "general", "duration": 1}) for i in range(count)]
+    statuses = [TaskStatus.PENDING, TaskStatus.RUNNING, TaskStatus.COMPLETED]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "pooled.db"))
+
+        # Before: new connection per write on a rollback-journal database
+        legacy_path = os.path.join(tmp, "legacy.db")
+        Database(legacy_path).close()
+        conn = sqlite3.connect(legacy_path)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+        start = time.perf_counter()
+        for status in statuses:
+            for task in tasks:
+                task.status = status
+                legacy_save(legacy_path, db._task_params(task))
+        legacy = time.perf_counter() - start
+
+        # After: pooled per-thread connection, WAL, cached statements
+        start = time.perf_counter()
+        for status in statuses:
+            for task in tasks:
+                task.status = status
+                db.save_task(task)
+        pooled = time.perf_counter() - start
+        db.close()
+
+    writes = count * len(statuses)
+    print(f"Before (connect per call):  {legacy:7.2f}s  {writes / legacy:9.0f} writes/s")
+    print(f"After  (pooled WAL conn):   {pooled:7.2f}s  {writes / pooled:9.0f} writes/s")
+    print(f"Speedup: {legacy / pooled:.1f}x")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
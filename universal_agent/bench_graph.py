@@ -0,0 +1,73 @@
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from memory.graph_index import EdgeIndex
+
+EDGE_TYPES = ["related_to", "part_of", "mentions", "located_in"]
+
+def timed(label: str, fn, calls: int = 1):
+    # fn performs `calls` queries; report the average per query
+    start = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - start) / calls
+    print(f"{label:<40} {elapsed * 1000:9.3f} ms")
+    return result
+
+def run(nodes: int, edges: int):
+    print("=== KNOWLEDGE GRAPH TRAVERSAL ===")
+    print(f"{nodes} nodes, {edges} typed edges (random, power-law-ish sources)\n")
+    rng = random.Random(7)
+    names = [f"node-{i}" for i in range(nodes)]
+    edge_list = [
+        (names[int(rng.paretovariate(1.2)) % nodes], rng.choice(EDGE_TYPES), names[rng.randrange(nodes)])
+        for _ in range(edges)
+    ]
+
+    # Before: what a naive dict-of-lists adjacency (both directions) costs in memory
+    gc.collect()
+    tracemalloc.start()
+    naive_out, naive_in = {}, {}
+    for src, edge_type, dst in edge_list:
+        naive_out.setdefault(src, []).append((edge_type, dst))
+        naive_in.setdefault(dst, []).append((edge_type, src))
+    naive_mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del naive_out, naive_in
+
+    gc.collect()
+    tracemalloc.start()
+    index = EdgeIndex()
+    index.build(edge_list)
+    csr_mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Timed separately: tracemalloc slows allocation-heavy code down a lot
+    index = EdgeIndex()
+    start = time.perf_counter()
+    index.build(edge_list)
+    build = time.perf_counter() - start
+    print(f"{'Build CSR (forward + reverse)':<40} {build:9.2f} s")
+    print(f"{'Memory, dict-of-lists adjacency':<40} {naive_mem / 1024 / 1024:9.1f} MB")
+    print(f"{'Memory, CSR index (incl. id maps)':<40} {csr_mem / 1024 / 1024:9.1f} MB\n")
+
+    samples = [names[rng.randrange(nodes)] for _ in range(200)]
+    sources = [edge_list[rng.randrange(edges)][0] for _ in range(20)]  # biased towards hubs
+    timed("neighbors (out)", lambda: [index.neighbors(n) for n in samples], len(samples))
+    timed("neighbors (both, one type)", lambda: [index.neighbors(n, "mentions", "both") for n in samples], len(samples))
+    timed("2-hop expansion (both, limit 500)", lambda: [index.k_hop(n, 2, limit=500) for n in samples], len(samples))
+    timed("3-hop expansion (out, limit 5000)", lambda: [index.k_hop(n, 3, direction="out", limit=5000) for n in sources], len(sources))
+    timed("shortest path (out)", lambda: [index.shortest_path(a, b) for a, b in zip(samples[:50], samples[50:100])], 50)
+    hoods = [list(index.k_hop(n, 1, limit=50)) for n in sources]
+    timed("subgraph edges among <=50 nodes", lambda: [index.edges_among(h) for h in hoods], len(hoods))
+
+    start = time.perf_counter()
+    for i in range(20000):
+        index.add(names[rng.randrange(nodes)], "mentions", names[rng.randrange(nodes)])
+    print(f"{'20k incremental adds (incl. compaction)':<40} {(time.perf_counter() - start) * 1000:9.3f} ms")
+
+if __name__ == "__main__":
+    nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    edges = int(sys.argv[2]) if len(sys.argv) > 2 else 2000000
+    run(nodes, edges)
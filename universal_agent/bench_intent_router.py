@@ -0,0 +1,73 @@
+import asyncio
+import re
+import sys
+import time
+from cognitive.intent_router import CLAUSE_RE, GRAMMAR, IntentRouter
+from cognitive.llm_interface import OpenAIProvider
+from cognitive.llm_stub_server import LLMStubServer
+from core.config import Config
+
+COMMANDS = [
+    "open notepad and type hello world", "close spotify", "remind me to call John in 5 minutes",
+    "search for python asyncio tutorials", "play lofi hip hop", "press ctrl+s", "install git",
+    "open chrome then search for flight prices", "launch calculator", "quit discord",
+    # Left to the planner
+    "what is on my screen?", "open visual studio code", "summarize this page", "hey how are you",
+    "remind me to stretch", "open it, then type hello",
+]
+
+# Slot text the router must keep exactly, checked before timing
+CHECKS = [
+    ("type hello world!", "text", "hello world!"),
+    ("type 'quoted'", "text", "'quoted'"),
+    ("search for what is asyncio?", "query", "what is asyncio?"),
+    ("Open Chrome.", "app", "chrome"),
+    ("remind me to call John in 5 minutes.", "message", "call John"),
+]
+
+def check_slots(router: IntentRouter):
+    for command, slot, expected in CHECKS:
+        plan = router.route(command)
+        got = plan[-1]["metadata"].get(slot) if plan else None
+        assert got == expected, f"{command!r}: {slot} is {got!r}, expected {expected!r}"
+
+def time_clauses(match, clauses, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for clause in clauses:
+            match(clause)
+    return (time.perf_counter() - start) / (rounds * len(clauses))
+
+async def run(delay: float, rounds: int):
+    print("=== INTENT ROUTER vs LLM PLANNING ===")
+    router = IntentRouter()
+    check_slots(router)
+    routed = [c for c in COMMANDS if router.route(c) is not None]
+    print(f"{len(routed)}/{len(COMMANDS)} commands routed locally\n")
+
+    clauses = [clause for command in COMMANDS for clause in CLAUSE_RE.split(command)]
+    # One pattern per intent tried in turn is what a hand-written chain of regexes does
+    patterns = [re.compile(p, re.IGNORECASE) for _, p in GRAMMAR]
+    looped = time_clauses(lambda c: any(p.fullmatch(c) for p in patterns), clauses, rounds)
+    compiled = time_clauses(router.pattern.fullmatch, clauses, rounds)
+    print(f"{'Match: pattern per intent':<28} {looped * 1e6:9.1f} us/clause")
+    print(f"{'Match: compiled alternation':<28} {compiled * 1e6:9.1f} us/clause")
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for command in COMMANDS:
+            router.route(command)
+    print(f"{'route() incl. slots and plan':<28} {(time.perf_counter() - start) / (rounds * len(COMMANDS)) * 1e6:9.1f} us/command")
+
+    server = LLMStubServer(delay=delay).start()
+    Config.OPENAI_API_KEY, Config.OPENAI_BASE_URL = "stub-key", server.url
+    provider = OpenAIProvider()
+    start = time.perf_counter()
+    for command in routed:
+        await provider.analyze_task(command)
+    llm = (time.perf_counter() - start) / len(routed)
+    print(f"{'LLM plan (stub endpoint)':<28} {llm * 1e6:9.0f} us/command ({delay * 1000:.0f} ms model latency)")
+    provider.client.close()
+    server.stop()
+
+if __name__ == "__main__":
+    asyncio.run(run(float(sys.argv[1]) if len(sys.argv) > 1 else 0.3, 2000))
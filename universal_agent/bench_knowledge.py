@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+import tempfile
+import time
+from memory.knowledge_graph import KnowledgeGraph
+
+def legacy_add_node(path: str, data: dict, node_id: str, properties: dict):
+    # What KnowledgeGraph.add_node used to do: rewrite the whole file on every insert
+    data[node_id] = properties
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+def node(i: int) -> dict:
+    return {"type": "fact", "text": f"Knowledge node number {i}", "source": "benchmark", "weight": i % 7}
+
+def run(count: int, legacy_count: int):
+    print("=== KNOWLEDGE GRAPH INSERTS ===\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before: full JSON rewrite per insert (O(total size) each), so only a sample
+        path = os.path.join(tmp, "legacy.json")
+        data = {}
+        start = time.perf_counter()
+        for i in range(legacy_count):
+            legacy_add_node(path, data, f"node-{i}", node(i))
+        legacy = time.perf_counter() - start
+        print(f"Before (rewrite per insert): {legacy_count:>7} nodes  {legacy:7.2f}s  {legacy_count / legacy:9.0f} nodes/s")
+
+        # After: one appended log record per insert, fsync'ed in batches
+        path = os.path.join(tmp, "knowledge.json")
+        graph = KnowledgeGraph(path, backend="log")
+        start = time.perf_counter()
+        for i in range(count):
+            graph.add_node(f"node-{i}", node(i))
+        graph.backend.store.flush()
+        single = time.perf_counter() - start
+        print(f"After  (log, add_node):      {count:>7} nodes  {single:7.2f}s  {count / single:9.0f} nodes/s")
+
+        start = time.perf_counter()
+        graph.add_nodes((f"bulk-{i}", node(i)) for i in range(count))
+        graph.backend.store.flush()
+        bulk = time.perf_counter() - start
+        print(f"After  (log, add_nodes):     {count:>7} nodes  {bulk:7.2f}s  {count / bulk:9.0f} nodes/s")
+        graph.close()
+
+        start = time.perf_counter()
+        reloaded = KnowledgeGraph(path, backend="log")
+        replay = time.perf_counter() - start
+        print(f"\nReload (snapshot + log replay): {len(reloaded)} nodes in {replay:.2f}s")
+        reloaded.close()
+
+        # SQLite backend: one transaction for the batch, FTS rows maintained by triggers
+        graph = KnowledgeGraph(os.path.join(tmp, "unused.json"), backend="sqlite",
+                               db_path=os.path.join(tmp, "knowledge.db"))
+        start = time.perf_counter()
+        graph.add_nodes((f"bulk-{i}", node(i)) for i in range(count))
+        bulk = time.perf_counter() - start
+        print(f"\nSQLite (add_nodes):          {count:>7} nodes  {bulk:7.2f}s  {count / bulk:9.0f} nodes/s")
+        graph.close()
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    run(count, min(count, 2000))
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+import urllib.request
+from cognitive.llm_client import ChatClient
+from cognitive.llm_stub_server import LLMStubServer
+
+MESSAGES = [{"role": "user", "content": "Parse this command: open notepad and type hello"}]
+
+async def blocking_call(url: str):
+    # What the synchronous SDK call did inside `async def`: the whole loop waits on the socket
+    request = urllib.request.Request(
+        f"{url}/chat/completions", data=json.dumps({"model": "stub", "messages": MESSAGES}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+async def lag_probe(stop: asyncio.Event) -> float:
+    # Longest gap between ticks on this loop; a blocked loop shows up as a large value
+    worst, last = 0.0, time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(0.01)
+        now = time.perf_counter()
+        worst = max(worst, now - last - 0.01)
+        last = now
+    return worst
+
+async def one_loop(call, per_loop: int) -> float:
+    stop = asyncio.Event()
+    probe = asyncio.create_task(lag_probe(stop))
+    for _ in range(per_loop):
+        await asyncio.gather(call(), call())  # two overlapping requests from this caller
+    stop.set()
+    return await probe
+
+def run_callers(call, callers: int, per_loop: int):
+    # One thread and loop per caller, like the GUI (loop per command) and the voice thread
+    lags = [0.0] * callers
+
+    def worker(i):
+        lags[i] = asyncio.run(one_loop(call, per_loop))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(callers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, max(lags)
+
+def run(delay: float, callers: int, per_loop: int):
+    total = callers * per_loop * 2
+    print("=== LLM CLIENT: BLOCKING SDK CALL vs POOLED ASYNC CLIENT ===")
+    print(f"{total} requests from {callers} caller loops, stub latency {delay * 1000:.0f} ms\n")
+    server = LLMStubServer(delay=delay).start()
+
+    elapsed, lag = run_callers(lambda: blocking_call(server.url), callers, per_loop)
+    print(f"{'Blocking call in async def':<32} {elapsed:7.2f} s  worst loop stall {lag * 1000:7.1f} ms  "
+          f"peak overlap {server.peak}  connections {server.connections}")
+
+    server.peak, server.connections = 0, 0
+    client = ChatClient("stub-key", server.url, max_concurrency=8)
+    elapsed, lag = run_callers(lambda: client.complete(MESSAGES, "stub"), callers, per_loop)
+    print(f"{'ChatClient (concurrency 8)':<32} {elapsed:7.2f} s  worst loop stall {lag * 1000:7.1f} ms  "
+          f"peak overlap {server.peak}  connections {server.connections}")
+    print(f"\n{'Client stats':<32} {client.stats()}")
+    client.close()
+    server.stop()
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else 0.3, 3, 2)
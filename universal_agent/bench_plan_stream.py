@@ -0,0 +1,38 @@
+import asyncio
+import sys
+import time
+from cognitive.llm_interface import OpenAIProvider
+from cognitive.llm_stub_server import LLMStubServer
+from core.config import Config
+
+COMMAND = "open notepad and type hello and check my email and summarize the news and play lofi music"
+
+async def first_and_last(steps) -> tuple:
+    start = time.perf_counter()
+    first, count = None, 0
+    async for _ in steps:
+        count += 1
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start, count
+
+async def run(delay: float):
+    print("=== PLANNING: WHOLE RESPONSE vs STREAMED STEPS ===")
+    print(f"Command: {COMMAND!r}, stub generation time {delay * 1000:.0f} ms\n")
+    server = LLMStubServer(delay=delay).start()
+    Config.OPENAI_API_KEY, Config.OPENAI_BASE_URL, Config.LLM_STREAM = "stub-key", server.url, True
+    provider = OpenAIProvider()
+
+    async def whole():
+        for task in await provider.analyze_task(COMMAND):
+            yield task
+
+    for label, steps in (("analyze_task (whole response)", whole()),
+                         ("stream_tasks (incremental)", provider.stream_tasks(COMMAND))):
+        first, total, count = await first_and_last(steps)
+        print(f"{label:<32} first task {first * 1000:7.1f} ms  all {count} tasks {total * 1000:7.1f} ms")
+    provider.client.close()
+    server.stop()
+
+if __name__ == "__main__":
+    asyncio.run(run(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0))
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import aiohttp
+from core.config import Config
+from memory.knowledge_graph import KnowledgeGraph
+from integrations.cloud_sync import CloudSync
+from integrations.cloud_sync_server import CloudSyncServer
+from integrations.sync_worker import SyncWorker
+
+class LegacyHandler(BaseHTTPRequestHandler):
+    """The old protocol: GET /download returns the whole graph, POST /upload replaces it."""
+
+    graph = {}
+
+    def do_GET(self):
+        body = json.dumps(LegacyHandler.graph).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        LegacyHandler.graph = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["data"]
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """A sync server that times out once, then answers every pull with a page missing "changes"."""
+
+    hits = 0
+
+    def do_GET(self):
+        FlakyHandler.hits += 1
+        if FlakyHandler.hits == 1:
+            time.sleep(1)  # past the client's timeout
+        body = json.dumps({"cursor": 0}).encode("utf-8")
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except ConnectionError:
+            pass  # the client gave up
+
+    def log_message(self, format, *args):
+        pass
+
+def check_worker_survives():
+    """A timed-out request and a malformed page are failed attempts: the worker stays up and retries."""
+    saved = Config.CLOUD_SYNC_TIMEOUT, Config.CLOUD_SYNC_RETRY_BASE
+    Config.CLOUD_SYNC_TIMEOUT, Config.CLOUD_SYNC_RETRY_BASE = 0.2, 0.05
+    flaky = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    threading.Thread(target=flaky.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            graph = KnowledgeGraph(os.path.join(tmp, "flaky.json"), backend="log")
+            worker = SyncWorker(graph, CloudSync(graph, f"http://127.0.0.1:{flaky.server_address[1]}"), debounce=0)
+            worker.start()
+            deadline = time.monotonic() + 10
+            while FlakyHandler.hits < 4 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            alive, failures = worker._thread.is_alive(), worker.failures
+            worker.stop()
+            graph.close()
+    finally:
+        Config.CLOUD_SYNC_TIMEOUT, Config.CLOUD_SYNC_RETRY_BASE = saved
+        flaky.shutdown()
+        flaky.server_close()
+    assert alive, "sync worker thread died"
+    assert FlakyHandler.hits >= 4 and failures >= 3, f"no retries: {FlakyHandler.hits} request(s), {failures} failure(s)"
+    print(f"Sync worker survived a timeout and malformed pages ({FlakyHandler.hits} attempts)\n")
+
+async def legacy_sync(url: str, local: dict):
+    # What CloudSync.sync used to do: a fresh session per request, full download, full upload
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{url}/download") as response:
+            down = await response.read()
+    merged = {**local, **json.loads(down)}
+    up = json.dumps({"timestamp": time.time(), "data": merged}).encode("utf-8")
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{url}/upload", data=up, headers={"Content-Type": "application/json"}) as response:
+            await response.read()
+    return len(up), len(down)
+
+def make_node(rng: random.Random, i: int) -> dict:
+    words = ["deploy", "invoice", "meeting", "python", "report", "browser", "email", "calendar", "folder", "backup"]
+    return {
+        "type": rng.choice(["fact", "preference", "contact", "task"]),
+        "text": " ".join(rng.choice(words) for _ in range(12)) + f" #{i}",
+        "source": "bench", "confidence": round(rng.random(), 3),
+    }
+
+def row(label: str, seconds: float, up: int, down: int):
+    print(f"{label:<36} {seconds * 1000:9.1f} ms  {up / 1024:9.1f} KiB up  {down / 1024:9.1f} KiB down")
+
+async def run(count: int, edits: int):
+    print("=== CLOUD SYNC: FULL GRAPH vs DELTA ===")
+    print(f"{count} nodes, then {edits} edits between syncs\n")
+    rng = random.Random(5)
+    nodes = {f"node-{i}": make_node(rng, i) for i in range(count)}
+    edited = rng.sample(sorted(nodes), edits)
+
+    legacy = ThreadingHTTPServer(("127.0.0.1", 0), LegacyHandler)
+    threading.Thread(target=legacy.serve_forever, daemon=True).start()
+    legacy_url = f"http://127.0.0.1:{legacy.server_address[1]}"
+    server = CloudSyncServer().start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t = time.perf_counter()
+        up, down = await legacy_sync(legacy_url, nodes)
+        row("Full graph, first sync", time.perf_counter() - t, up, down)
+        for node_id in edited:
+            nodes[node_id] = dict(nodes[node_id], text="edited")
+        t = time.perf_counter()
+        up, down = await legacy_sync(legacy_url, nodes)
+        row(f"Full graph, after {edits} edits", time.perf_counter() - t, up, down)
+
+        graph = KnowledgeGraph(os.path.join(tmp, "a.json"), backend="log")
+        graph.add_nodes(nodes.items())
+        syncer = CloudSync(graph, server.url)
+        t = time.perf_counter()
+        stats = await syncer.sync()
+        row("Delta, first sync", time.perf_counter() - t, stats["bytes_up"], stats["bytes_down"])
+        for node_id in edited:
+            graph.add_node(node_id, dict(nodes[node_id], text="edited again"))
+        t = time.perf_counter()
+        stats = await syncer.sync()
+        row(f"Delta, after {edits} edits", time.perf_counter() - t, stats["bytes_up"], stats["bytes_down"])
+        t = time.perf_counter()
+        stats = await syncer.sync()
+        row("Delta, nothing changed", time.perf_counter() - t, stats["bytes_up"], stats["bytes_down"])
+
+        # A second replica joins, then both edit the same nodes before syncing
+        other = KnowledgeGraph(os.path.join(tmp, "b.json"), backend="log")
+        other_syncer = CloudSync(other, server.url)
+        t = time.perf_counter()
+        stats = await other_syncer.sync()
+        row("Delta, second replica joins", time.perf_counter() - t, stats["bytes_up"], stats["bytes_down"])
+        contested = edited[:10]
+        for node_id in contested:
+            graph.add_node(node_id, {"text": "from a"})
+            other.add_node(node_id, {"text": "from b"})
+        other.remove_node(edited[10])
+        for _ in range(2):
+            await syncer.sync()
+            await other_syncer.sync()
+        same = all(graph.get_node(node_id) == other.get_node(node_id) for node_id in nodes)
+        winners = {graph.get_node(node_id).get("text") for node_id in contested}
+        print(f"\n{'Replicas converged after concurrent edits':<36} {same}  (winners: {sorted(winners)})")
+        await syncer.close()
+        await other_syncer.close()
+        graph.close()
+        other.close()
+
+    server.stop()
+    legacy.shutdown()
+    legacy.server_close()
+
+if __name__ == "__main__":
+    check_worker_survives()
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000, int(sys.argv[2]) if len(sys.argv) > 2 else 50))
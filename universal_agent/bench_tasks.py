@@ -0,0 +1,90 @@
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from core.database import Database, ALL_TASKS_SQL
+from core.types import Task, TaskStatus, STATUS_BY_CODE
+
+@dataclass
+class LegacyTask:
+    # What core.types.Task used to be: a plain dataclass with a __dict__ per instance
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    description: str = ""
+    priority: int = 1
+    status: TaskStatus = TaskStatus.PENDING
+    created_at: datetime = field(default_factory=datetime.now)
+    result: Any = None
+    error: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    scheduled_time: Optional[datetime] = None
+    depends_on: List[str] = field(default_factory=list)
+
+def legacy_row_to_task(row) -> LegacyTask:
+    # What Database._row_to_task used to do: text status lookup and an eager json.loads
+    return LegacyTask(
+        id=row[0],
+        description=row[1],
+        priority=row[2],
+        status=TaskStatus(STATUS_BY_CODE[row[3]].value),
+        created_at=datetime.fromisoformat(row[4]),
+        result=row[5],
+        error=row[6],
+        metadata=json.loads(row[7]),
+        scheduled_time=datetime.fromisoformat(row[8]) if row[8] else None
+    )
+
+def to_api(t) -> dict:
+    # Same fields as the remote API's task listing (metadata is not part of it)
+    return {
+        "id": t.id,
+        "description": t.description,
+        "status": t.status.value,
+        "result": t.result,
+        "error": t.error,
+        "created_at": t.created_at.isoformat()
+    }
+
+def measure(label: str, load):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    tasks = load()
+    payload = [to_api(t) for t in tasks]
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del payload, tasks
+    print(f"{label:<28} {elapsed:6.2f}s  peak {peak / 1024 / 1024:7.1f} MB")
+    return elapsed, peak
+
+def run(count: int):
+    print("=== TASK LISTING COST ===")
+    print(f"Load and serialize {count} tasks (metadata present, not read)\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "tasks.db"))
+        metadata = {"type": "gui_automation", "action": "type", "text": "hello world", "app": "notepad"}
+        db.save_tasks([
+            Task(description=f"Benchmark task {i}", status=TaskStatus.COMPLETED, result="ok", metadata=metadata)
+            for i in range(count)
+        ])
+
+        conn = db._get_conn()
+        before = measure("Before (dataclass, eager):",
+                         lambda: [legacy_row_to_task(row) for row in conn.execute(ALL_TASKS_SQL)])
+        after = measure("After  (slots, lazy):",
+                        lambda: db.get_all_tasks())
+        db.close()
+
+    print(f"\nTime:   {before[0] / after[0]:.1f}x faster")
+    print(f"Memory: {after[1] / before[1]:.0%} of before")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,86 @@
+import os
+import random
+import sys
+import tempfile
+import time
+import numpy as np
+from memory.vector_index import HashingEmbedder, VectorIndex
+
+def make_corpus(count: int, rng: random.Random):
+    # Topic-structured texts: each node draws most words from one of 2000 small vocabularies
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab = ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(40000)]
+    topics = [rng.sample(vocab, 25) for _ in range(2000)]
+    texts = []
+    for _ in range(count):
+        topic = topics[rng.randrange(len(topics))]
+        texts.append(" ".join(rng.choice(topic) for _ in range(10)) + " " + " ".join(rng.choice(vocab) for _ in range(3)))
+    return texts, topics
+
+def percentile(samples, p):
+    return sorted(samples)[int(len(samples) * p / 100)] * 1000
+
+def run(count: int):
+    print("=== KNOWLEDGE VECTOR RECALL ===")
+    print(f"{count} nodes, hashed n-gram embeddings, dim 256\n")
+    rng = random.Random(11)
+    texts, topics = make_corpus(count, rng)
+    embedder = HashingEmbedder(256)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VectorIndex(os.path.join(tmp, "knowledge.vec"), embedder.dim, embedder.tag)
+        start = time.perf_counter()
+        embed_time = 0.0
+        batches = []
+        for i in range(0, count, 10000):
+            t = time.perf_counter()
+            vectors = embedder.embed_many(texts[i:i + 10000])
+            embed_time += time.perf_counter() - t
+            index.add_many([f"node-{j}" for j in range(i, i + len(vectors))], vectors)
+            batches.append(vectors)
+        build = time.perf_counter() - start
+        print(f"{'Embed':<40} {embed_time:9.2f} s  ({count / embed_time:,.0f} texts/s)")
+        print(f"{'Build (embed + append + training)':<40} {build:9.2f} s")
+        print(f"{'Index':<40} {index.stats()}\n")
+
+        queries = [" ".join(rng.sample(topics[rng.randrange(len(topics))], 4)) for _ in range(200)]
+        query_vectors = embedder.embed_many(queries)
+
+        latencies = []
+        for text in queries:
+            t = time.perf_counter()
+            index.search(embedder.embed(text), 10)
+            latencies.append(time.perf_counter() - t)
+        print(f"{'Query (embed + search), p50':<40} {percentile(latencies, 50):9.3f} ms")
+        print(f"{'Query (embed + search), p99':<40} {percentile(latencies, 99):9.3f} ms")
+        t = time.perf_counter()
+        for i in range(0, len(query_vectors), 32):
+            index.search_many(query_vectors[i:i + 32], 10)
+        print(f"{'Batched search, 32 per call, per query':<40} {(time.perf_counter() - t) / len(queries) * 1000:9.3f} ms")
+
+        # Exact scan over a plain in-memory copy (row i is node-i), for latency and recall comparison
+        matrix = np.concatenate(batches)
+        del batches
+        t = time.perf_counter()
+        exact = [np.argpartition(-(matrix @ q), 10)[:10] for q in query_vectors[:50]]
+        print(f"{'Exact full scan, per query':<40} {(time.perf_counter() - t) / 50 * 1000:9.3f} ms")
+        found = index.search_many(query_vectors[:50], 10)
+        recall = np.mean([
+            len({f"node-{r}" for r in rows.tolist()} & {node_id for node_id, _ in hits}) / 10
+            for rows, hits in zip(exact, found)
+        ])
+        print(f"{'Recall@10 vs exact':<40} {recall:9.3f}")
+
+        t = time.perf_counter()
+        index.add_many([f"new-{i}" for i in range(1000)], embedder.embed_many(texts[:1000]))
+        print(f"{'Append 1000 nodes (embed + assign)':<40} {(time.perf_counter() - t) * 1000:9.3f} ms")
+        index.close()
+        del matrix
+
+        t = time.perf_counter()
+        index = VectorIndex(os.path.join(tmp, "knowledge.vec"), embedder.dim, embedder.tag)
+        print(f"{'Reopen (memory-mapped)':<40} {(time.perf_counter() - t) * 1000:9.3f} ms")
+        index.close()
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
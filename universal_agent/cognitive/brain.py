@@ -1,44 +1,162 @@
-from typing import List
+import asyncio
+import copy
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from core.config import Config
 from core.types import Task
-from core.orchestrator import TaskOrchestrator
+from core.orchestrator import TaskOrchestrator, OrchestratorBusyError
+from memory.knowledge_graph import KnowledgeGraph
 from .llm_interface import get_llm_provider
+from .intent_router import IntentRouter
+from .plan_cache import PlanCache
 
 class Brain:
-    def __init__(self, orchestrator: TaskOrchestrator):
+    def __init__(self, orchestrator: TaskOrchestrator, memory: KnowledgeGraph = None, plan_cache: PlanCache = None,
+                 router: IntentRouter = None):
         self.orchestrator = orchestrator
         self.llm = get_llm_provider()
+        self.memory = memory
+        if self.memory is None and Config.MEMORY_RECALL_K > 0:
+            self.memory = KnowledgeGraph()
+        self.plan_cache = plan_cache
+        if self.plan_cache is None and Config.PLAN_CACHE:
+            self.plan_cache = PlanCache()
+        self.router = router
+        if self.router is None and Config.INTENT_ROUTER:
+            self.router = IntentRouter()
 
     async def process_input(self, user_input: str):
         print(f"[BRAIN] Processing: {user_input}")
         print("[BRAIN] NLP Engine: Analyzing intent and context...")
         
-        image_data = None
-        # Capture screen for vision-related commands
-        if any(word in user_input.lower() for word in ["screen", "look", "see", "what", "summarize", "describe", "read"]):
-            print("[BRAIN] Capturing screen for vision analysis...")
-            from integrations.system import SystemIntegration
-            sys_int = SystemIntegration()
-            image_data = await sys_int.capture_screen()
-            if image_data:
-                print(f"[BRAIN] Screen captured successfully ({len(image_data)} bytes)")
-            else:
-                print("[BRAIN] Warning: Screen capture failed")
-            
-        subtasks_data = await self.llm.analyze_task(user_input, image_data)
-        
-        print(f"[BRAIN] Created {len(subtasks_data)} tasks:")
-        for i, task_data in enumerate(subtasks_data):
-            print(f"  Task {i+1}: {task_data['description']} | Type: {task_data['metadata'].get('type')} | Action: {task_data['metadata'].get('action', 'N/A')}")
-            
-            task = Task(
-                description=task_data["description"],
-                metadata=task_data["metadata"]
-            )
-            
-            # Handle scheduling
-            if "scheduled_delay_seconds" in task_data["metadata"]:
-                from datetime import datetime, timedelta
-                delay = task_data["metadata"]["scheduled_delay_seconds"]
-                task.scheduled_time = datetime.now() + timedelta(seconds=delay)
+        image_data, context = None, []
+        # Simple commands are planned locally; only the rest need the screen, memories and the LLM
+        routed = self._route(user_input)
+        if routed is None:
+            # Capture screen for vision-related commands
+            if any(word in user_input.lower() for word in ["screen", "look", "see", "what", "summarize", "describe", "read"]):
+                print("[BRAIN] Capturing screen for vision analysis...")
+                from integrations.system import SystemIntegration
+                sys_int = SystemIntegration()
+                image_data = await sys_int.capture_screen()
+                if image_data:
+                    print(f"[BRAIN] Screen captured successfully ({len(image_data)} bytes)")
+                else:
+                    print("[BRAIN] Warning: Screen capture failed")
+                
+            context = await self._recall(user_input)
+
+        # Each step is submitted as soon as the planner has produced it, so the first
+        # action can start while later steps are still being written. A step only
+        # waits on earlier ones, so independent branches run in parallel and
+        # dependents start as soon as their inputs finish.
+        planned: Dict[int, Task] = {}  # position in the plan ("depends_on" index) -> submitted task
+        steps = self._replay(routed) if routed is not None else self._plan(user_input, image_data, context)
+        try:
+            async for index, task_data in steps:
+                print(f"  Task {index+1}: {task_data['description']} | Type: {task_data['metadata'].get('type')} | Action: {task_data['metadata'].get('action', 'N/A')}")
                 
-            await self.orchestrator.submit_task(task)
+                task = Task(
+                    description=task_data["description"],
+                    metadata=task_data["metadata"]
+                )
+                
+                # Handle scheduling
+                if "scheduled_delay_seconds" in task_data["metadata"]:
+                    from datetime import datetime, timedelta
+                    delay = task_data["metadata"]["scheduled_delay_seconds"]
+                    task.scheduled_time = datetime.now() + timedelta(seconds=delay)
+                
+                task.depends_on = [dep.id for dep in self._dependencies(task_data, index, planned)]
+                try:
+                    await self.orchestrator.submit_task(task)
+                except OrchestratorBusyError as e:
+                    print(f"[BRAIN] Orchestrator busy, dropping task {index+1} and the rest of the plan: {e}")
+                    break
+                planned[index] = task
+        finally:
+            await steps.aclose()  # stops generating a plan we won't use
+        print(f"[BRAIN] Created {len(planned)} tasks")
+
+    def _route(self, user_input: str) -> Optional[List[Dict[str, Any]]]:
+        """Plan for a simple command from the local intent grammar, or None to use the planner."""
+        if self.router is None:
+            return None
+        start = time.perf_counter()
+        plan = self.router.route(user_input)
+        if plan is not None:
+            print(f"[BRAIN] Routed locally in {(time.perf_counter() - start) * 1e6:.0f} us, skipping the LLM")
+        return plan
+
+    @staticmethod
+    async def _replay(plan: List[Dict[str, Any]]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        for step in enumerate(plan):
+            yield step
+
+    async def _plan(self, user_input: str, image_data: str, context: List[Dict[str, Any]]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Plan steps from the cache when this exact request was planned before, else streamed from the LLM."""
+        key = self.plan_cache.key(user_input, self.llm.model_id, context, image_data) if self.plan_cache else None
+        if key:
+            start = time.perf_counter()
+            # Off the loop: a miss in memory reads the SQLite tier
+            plan = await asyncio.to_thread(self.plan_cache.get, key)
+            if plan is not None:
+                print(f"[BRAIN] Plan cache hit in {(time.perf_counter() - start) * 1e6:.0f} us")
+                async for step in self._replay(plan):
+                    yield step
+                return
+        errors = self.llm.errors
+        plan = []
+        async for index, task_data in self.llm.stream_tasks(user_input, image_data, context):
+            plan.append((index, copy.deepcopy(task_data)))  # as planned, before anything downstream touches it
+            yield index, task_data
+        if key and plan and self.llm.errors == errors:
+            await asyncio.to_thread(self.plan_cache.put, key, self._compact(plan))
+
+    async def _recall(self, user_input: str) -> List[Dict[str, Any]]:
+        """Knowledge nodes similar to the request, for the planner prompt."""
+        if self.memory is None or Config.MEMORY_RECALL_K <= 0:
+            return []
+        try:
+            start = time.perf_counter()
+            # Off the loop: the first call may have to embed the whole graph
+            memories = await asyncio.to_thread(
+                self.memory.similar, user_input, Config.MEMORY_RECALL_K, Config.MEMORY_RECALL_MIN_SCORE
+            )
+        except Exception as e:
+            print(f"[BRAIN] Memory recall unavailable, continuing without it: {e}")
+            self.memory = None
+            return []
+        if memories:
+            print(f"[BRAIN] Recalled {len(memories)} memories in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return memories
+
+    @staticmethod
+    def _compact(plan: List[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """The plan without the steps the parser skipped, "depends_on" renumbered to match."""
+        positions = {index: position for position, (index, _) in enumerate(plan)}
+        steps = []
+        for _, task_data in plan:
+            deps = task_data.get("depends_on")
+            if isinstance(deps, list):
+                task_data["depends_on"] = [positions[j] for j in deps if isinstance(j, int) and j in positions]
+            steps.append(task_data)
+        return steps
+
+    def _dependencies(self, task_data: Dict[str, Any], index: int, planned: Dict[int, Task]) -> List[Task]:
+        """Earlier plan steps that the step at position `index` must wait for."""
+        if "depends_on" in task_data:
+            # The planner ordered this step itself
+            deps = task_data["depends_on"] or []
+            valid = [planned[j] for j in deps if isinstance(j, int) and j < index and j in planned]
+            if len(valid) != len(deps):
+                print(f"[BRAIN] Ignoring invalid dependencies {deps} for task {index+1}")
+            return valid
+        
+        # No edges given for this step: GUI input steps follow the previous GUI step
+        metadata = task_data["metadata"]
+        if metadata.get("type") == "gui_automation" and metadata.get("action") in ("type", "press"):
+            for task in reversed(list(planned.values())):
+                if task.metadata.get("type") == "gui_automation":
+                    return [task]
+        return []
@@ -0,0 +1,129 @@
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+_APP = r"[a-z0-9][\w.+-]*"  # one word; "open visual studio code" is left to the planner
+_UNITS = {"s": 1, "sec": 1, "second": 1, "m": 60, "min": 60, "minute": 60, "h": 3600, "hr": 3600, "hour": 3600}
+
+# (intent, pattern) in priority order; slot groups are prefixed with the intent name
+GRAMMAR = [
+    ("open", rf"(?:open|launch)\s+(?P<open_app>{_APP})"),
+    ("close", rf"(?:close|quit)\s+(?P<close_app>{_APP})"),
+    ("install", rf"install\s+(?P<install_app>{_APP})"),
+    ("uninstall", rf"uninstall\s+(?P<uninstall_app>{_APP})"),
+    ("type", r"type\s+(?P<type_text>.+)"),
+    ("press", r"press\s+(?P<press_key>[a-z0-9]+(?:\s*\+\s*[a-z0-9]+)*)"),
+    ("remind", r"remind\s+me\s+(?:to\s+)?(?P<remind_message>.+?)\s+(?:in|after)\s+"
+               r"(?P<remind_amount>\d+|an?|one)\s*(?P<remind_unit>s|secs?|seconds?|m|mins?|minutes?|h|hrs?|hours?)"),
+    ("play", r"play\s+(?P<play_query>.+?)(?:\s+on\s+youtube)?"),
+    ("search", r"(?:search(?:\s+the\s+web)?(?:\s+for)?|google|look\s+up)\s+(?P<search_query>.+)"),
+]
+
+# Clause separators; "type salt and pepper" splits too, and then falls through as a whole
+CLAUSE_RE = re.compile(
+    r"\s*[,;]\s*(?:(?:and\s+then|and|then|also)\s+)?|\s+(?:and\s+then|and|then|also)\s+", re.IGNORECASE
+)
+# Intents whose slot is free text, kept exactly as said ("type hello world!" types the "!")
+FREE_TEXT = {"type", "search"}
+# Sentence punctuation closing a clause, dropped for every other intent ("Open Chrome.")
+_TRAILING_RE = re.compile(r"[\s.!?]+$")
+# Slots that only make sense with the screen, memories or earlier conversation
+_VAGUE = {"it", "this", "that", "these", "those", "them", "here", "there", "my", "the", "something", "app", "apps", "program"}
+
+class IntentRouter:
+    """Plans simple commands locally so they skip the LLM.
+
+    The grammar is compiled once into a single anchored alternation; each
+    clause of the command ("open notepad and type hello" has two) must match
+    it completely with concrete slots, or the whole command goes to the
+    planner. Plans use the same task format as the LLM's. Dependencies are
+    left to Brain's inference, as for a planner that gives no edges.
+    """
+
+    def __init__(self, grammar=None):
+        self.grammar = grammar or GRAMMAR
+        self.intents = [name for name, _ in self.grammar]
+        self.pattern = re.compile(
+            "|".join(f"(?P<{name}>{pattern})" for name, pattern in self.grammar), re.IGNORECASE
+        )
+        # Each intent's group encloses its slots, so it is the last to close and match.lastgroup names it
+        self._slots = {name: [g for g in self.pattern.groupindex if g.startswith(f"{name}_")] for name in self.intents}
+        self._builders: Dict[str, Callable[[Dict[str, str]], Optional[Dict[str, Any]]]] = {
+            "open": lambda s: self._app("open", "Open", s["open_app"]),
+            "close": lambda s: self._app("close", "Close", s["close_app"]),
+            "install": lambda s: self._app("install", "Install", s["install_app"]),
+            "uninstall": lambda s: self._app("uninstall", "Uninstall", s["uninstall_app"]),
+            "type": self._type,
+            "press": self._press,
+            "remind": self._remind,
+            "play": self._play,
+            "search": self._search,
+        }
+        self._lock = threading.Lock()
+        self.routed = 0
+        self.passed = 0
+
+    def route(self, user_input: str) -> Optional[List[Dict[str, Any]]]:
+        """The plan for `user_input`, or None if it needs the planner."""
+        clauses = [c.strip() for c in CLAUSE_RE.split(user_input.strip())]
+        tasks = []
+        for clause in clauses:
+            task = self._match(clause) if clause else None
+            if task is None:
+                with self._lock:
+                    self.passed += 1
+                return None
+            tasks.append(task)
+        with self._lock:
+            self.routed += 1
+        return tasks
+
+    def _match(self, clause: str) -> Optional[Dict[str, Any]]:
+        match = self.pattern.fullmatch(clause)
+        if match is None or match.lastgroup not in FREE_TEXT:
+            match = self.pattern.fullmatch(_TRAILING_RE.sub("", clause))
+        if match is None:
+            return None
+        intent = match.lastgroup
+        slots = {k: match.group(k).strip() for k in self._slots[intent] if match.group(k) is not None}
+        if any(v.lower() in _VAGUE for v in slots.values()):
+            return None
+        return self._builders[intent](slots)
+
+    @staticmethod
+    def _app(action: str, verb: str, app: str) -> Dict[str, Any]:
+        app = app.lower()
+        return {"description": f"{verb} {app}", "metadata": {"type": "gui_automation", "action": action, "app": app}}
+
+    @staticmethod
+    def _type(slots: Dict[str, str]) -> Dict[str, Any]:
+        text = slots["type_text"]
+        return {"description": f"Type '{text}'", "metadata": {"type": "gui_automation", "action": "type", "text": text}}
+
+    @staticmethod
+    def _press(slots: Dict[str, str]) -> Dict[str, Any]:
+        key = re.sub(r"\s+", "", slots["press_key"].lower())
+        return {"description": f"Press {key}", "metadata": {"type": "gui_automation", "action": "press", "key": key}}
+
+    @staticmethod
+    def _remind(slots: Dict[str, str]) -> Dict[str, Any]:
+        amount = slots["remind_amount"].lower()
+        amount = int(amount) if amount.isdigit() else 1
+        unit = slots["remind_unit"].lower().rstrip("s") or "s"
+        message = slots["remind_message"]
+        return {"description": f"Remind: {message}",
+                "metadata": {"type": "reminder", "message": message, "scheduled_delay_seconds": amount * _UNITS[unit]}}
+
+    @staticmethod
+    def _play(slots: Dict[str, str]) -> Dict[str, Any]:
+        query = slots["play_query"]
+        return {"description": f"Play {query}", "metadata": {"type": "web_search", "query": f"{query} song"}}
+
+    @staticmethod
+    def _search(slots: Dict[str, str]) -> Dict[str, Any]:
+        query = slots["search_query"]
+        return {"description": f"Search: {query}", "metadata": {"type": "web_search", "query": query}}
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.routed + self.passed
+        return {"routed": self.routed, "passed": self.passed, "route_rate": self.routed / total if total else 0.0}
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import aiohttp
+from core.config import Config
+
+# Statuses worth another attempt (same set the OpenAI SDK retries)
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+class LLMClientError(Exception):
+    """The chat-completions endpoint answered with an error status."""
+
+    def __init__(self, status: int, body: str):
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+
+class ChatClient:
+    """Non-blocking client for an OpenAI-compatible chat-completions API.
+
+    Requests run on one background event loop that owns a single aiohttp
+    session, so every caller shares the same keep-alive connections whatever
+    loop it runs on (the GUI makes a new loop per command, voice has its own).
+    Callers await their result without blocking their loop. At most
+    `max_concurrency` requests are in flight; the rest queue. Connection
+    errors and RETRY_STATUSES are retried up to `max_retries` times with
+    exponential backoff, honouring Retry-After.
+    """
+
+    def __init__(self, api_key: str, base_url: str = None, max_concurrency: int = None,
+                 timeout: float = None, pool_size: int = None, max_retries: int = None):
+        self.api_key = api_key
+        self.base_url = (base_url or Config.OPENAI_BASE_URL).rstrip("/")
+        self.max_concurrency = max(1, max_concurrency or Config.LLM_MAX_CONCURRENCY)
+        self.timeout = timeout or Config.LLM_TIMEOUT
+        self.pool_size = pool_size or Config.LLM_POOL_SIZE
+        self.max_retries = max(0, max_retries if max_retries is not None else Config.LLM_MAX_RETRIES)
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # Stats (only mutated on the client loop)
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.active = 0
+        self.waiting = 0
+        self._total_latency = 0.0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run_loop, name="nexus-llm-client", daemon=True)
+            self._thread.start()
+            self._ready.wait()
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._open())
+        finally:
+            self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self._session.close())
+            self.loop.close()
+
+    async def _open(self):
+        # aiohttp binds the session and connector to the loop they are created on
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            trust_env=True,  # HTTP(S)_PROXY / NO_PROXY, as the SDK honoured
+        )
+
+    async def create(self, **payload) -> Dict[str, Any]:
+        """POST /chat/completions with `payload` and return the decoded response."""
+        self.start()
+        # Runs on the client loop; cancelling the caller cancels the request
+        future = asyncio.run_coroutine_threadsafe(self._post("/chat/completions", payload), self.loop)
+        return await asyncio.wrap_future(future)
+
+    async def complete(self, messages: List[Dict[str, Any]], model: str, **params) -> str:
+        """Message content of the first choice."""
+        response = await self.create(model=model, messages=messages, **params)
+        return response["choices"][0]["message"]["content"]
+
+    async def stream(self, messages: List[Dict[str, Any]], model: str, **params) -> AsyncIterator[str]:
+        """Yield the first choice's content as the server streams it (server-sent events)."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def emit(item: Tuple[str, Any]):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                pass  # the caller's loop is gone
+
+        payload = dict(params, model=model, messages=messages, stream=True)
+        future = asyncio.run_coroutine_threadsafe(self._stream("/chat/completions", payload, emit), self.loop)
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == "delta":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            future.cancel()  # no-op when finished; frees the connection if the caller stopped early
+
+    @asynccontextmanager
+    async def _slot(self):
+        self.waiting += 1
+        async with self._semaphore:
+            self.waiting -= 1
+            self.active += 1
+            start = time.perf_counter()
+            try:
+                yield
+            except Exception:
+                self.failures += 1
+                raise
+            finally:
+                self.active -= 1
+                self.requests += 1
+                self._total_latency += time.perf_counter() - start
+
+    async def _respond(self, path: str, payload: Dict[str, Any]) -> aiohttp.ClientResponse:
+        """POST until the server accepts; the caller reads (and releases) the body.
+
+        Retries happen only here, before any of the body has been read, so a
+        stream is never replayed once its first byte has been handed out.
+        """
+        attempt = 0
+        while True:
+            try:
+                response = await self._session.post(f"{self.base_url}{path}", json=payload)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                if response.status < 400:
+                    return response
+                async with response:
+                    body = await response.text()
+                if attempt >= self.max_retries or response.status not in RETRY_STATUSES:
+                    raise LLMClientError(response.status, body)
+                delay = self._backoff(attempt, response.headers.get("Retry-After"))
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+        try:
+            return min(max(float(retry_after), 0.0), 60.0)
+        except (TypeError, ValueError):
+            # 0.5s, 1s, 2s, ... capped at 8s, with up to 25% jitter
+            return min(0.5 * 2 ** attempt, 8.0) * (1 - 0.25 * random.random())
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._slot():
+            async with await self._respond(path, payload) as response:
+                return await response.json(content_type=None)
+
+    async def _stream(self, path: str, payload: Dict[str, Any], emit: Callable[[Tuple[str, Any]], None]):
+        try:
+            async with self._slot():
+                async with await self._respond(path, payload) as response:
+                    async for line in response.content:
+                        line = line.strip()
+                        if not line.startswith(b"data:"):
+                            continue  # blank separators and keep-alive comments
+                        data = line[5:].strip()
+                        if data == b"[DONE]":
+                            continue  # read on to the end of the body so the connection can be reused
+                        choices = json.loads(data).get("choices") or [{}]
+                        delta = (choices[0].get("delta") or {}).get("content")
+                        if delta:
+                            emit(("delta", delta))
+            emit(("end", None))
+        except Exception as e:
+            emit(("error", e))
+
+    def close(self):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "retries": self.retries,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "avg_latency_ms": (self._total_latency / self.requests * 1000) if self.requests else 0.0,
+        }
+
+_clients: Dict[Tuple[str, str], ChatClient] = {}
+_clients_lock = threading.Lock()
+
+def shared_client(api_key: str, base_url: str = None) -> ChatClient:
+    """One ChatClient (and connection pool) per endpoint and key, for the whole process."""
+    key = (api_key, (base_url or Config.OPENAI_BASE_URL).rstrip("/"))
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = ChatClient(api_key, key[1])
+        return _clients[key]
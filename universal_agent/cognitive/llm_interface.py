@@ -1,23 +1,35 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any, Tuple
 import json
 import os
 from core.config import Config
+from .plan_stream import PlanStreamParser
 
 class LLMInterface(ABC):
+    model_id = "unknown"  # provider/model, part of PlanCache keys
+    errors = 0  # planning calls that fell back to a degraded plan (those are not cached)
+
     @abstractmethod
     async def generate(self, prompt: str) -> str:
         pass
 
     @abstractmethod
-    async def analyze_task(self, user_input: str, image_data: str = None) -> List[Dict[str, Any]]:
+    async def analyze_task(self, user_input: str, image_data: str = None, context: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         pass
 
+    async def stream_tasks(self, user_input: str, image_data: str = None, context: List[Dict[str, Any]] = None) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Plan steps one at a time, each as soon as it is known, with its position in the plan
+        (what "depends_on" refers to). Providers that can stream override this."""
+        for index, task in enumerate(await self.analyze_task(user_input, image_data, context)):
+            yield index, task
+
 class MockLLM(LLMInterface):
+    model_id = "mock"
+
     async def generate(self, prompt: str) -> str:
         return f"Mock response to: {prompt}"
 
-    async def analyze_task(self, user_input: str, image_data: str = None) -> List[Dict[str, Any]]:
+    async def analyze_task(self, user_input: str, image_data: str = None, context: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         # Enhanced keyword-based parsing
         tasks = []
         user_input_lower = user_input.lower()
@@ -25,6 +37,13 @@ class MockLLM(LLMInterface):
         # Split on common conjunctions for parallel execution
         segments = user_input_lower.replace(" and ", "|").replace(" also ", "|").replace(" while ", "|").split("|")
         
+        def after_last_gui_step() -> List[int]:
+            # Typing must wait for the window opened (or typed into) by the previous GUI step
+            for i in range(len(tasks) - 1, -1, -1):
+                if tasks[i]["metadata"].get("type") == "gui_automation":
+                    return [i]
+            return []
+        
         for segment in segments:
             segment = segment.strip()
             
@@ -64,13 +83,13 @@ class MockLLM(LLMInterface):
                 if "type" in segment:
                     text_to_type = segment.split("type")[-1].strip()
                     if text_to_type:
-                        tasks.append({"description": f"Type '{text_to_type}'", "metadata": {"type": "gui_automation", "action": "type", "text": text_to_type}})
+                        tasks.append({"description": f"Type '{text_to_type}'", "metadata": {"type": "gui_automation", "action": "type", "text": text_to_type}, "depends_on": after_last_gui_step()})
             
             elif "type" in segment and "open" not in segment:
                 # Standalone typing command
                 text_to_type = segment.replace("type", "").strip()
                 if text_to_type:
-                    tasks.append({"description": f"Type '{text_to_type}'", "metadata": {"type": "gui_automation", "action": "type", "text": text_to_type}})
+                    tasks.append({"description": f"Type '{text_to_type}'", "metadata": {"type": "gui_automation", "action": "type", "text": text_to_type}, "depends_on": after_last_gui_step()})
             
             elif "open" in segment:
                 # Generic app opening - extract app name
@@ -152,22 +171,20 @@ class OpenAIProvider(LLMInterface):
         if not self.api_key:
             raise ValueError("OpenAI API Key not found")
         
-        from openai import OpenAI
-        self.client = OpenAI(api_key=self.api_key)
+        from .llm_client import shared_client
+        self.client = shared_client(self.api_key)  # non-blocking, pooled across providers and loops
+        self.model = "gpt-4o-mini"
+        self.model_id = f"openai/{self.model}"
+        self.errors = 0
 
     async def generate(self, prompt: str) -> str:
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.choices[0].message.content
+            return await self.client.complete([{"role": "user", "content": prompt}], self.model)
         except Exception as e:
             return f"[OpenAI Error] {e}"
 
-    async def analyze_task(self, user_input: str, image_data: str = None) -> List[Dict[str, Any]]:
-        # Use GPT to parse the command into actionable tasks
-        system_prompt = """You are a task parser for a digital assistant. Parse user commands into structured tasks.
+    # Used by GPT to parse the command into actionable tasks
+    SYSTEM_PROMPT = """You are a task parser for a digital assistant. Parse user commands into structured tasks.
         
 Available task types:
 1. gui_automation: {action: "open", app: "appname"} - Opens an application
@@ -194,6 +211,13 @@ If the user specifies a time delay (e.g., "in 5 minutes", "after 10 seconds"), a
 Example: "Remind me to call John in 5 minutes" -> 
 [{"description": "Remind to call John", "metadata": {"type": "reminder", "message": "Yo bro, don't forget to call John!", "scheduled_delay_seconds": 300}}]
 
+Ordering:
+Tasks run in parallel unless you add "depends_on": a list of indices (0-based) of EARLIER tasks in the array that must finish first.
+Use it whenever a step needs the result of a previous one, e.g. typing into an app you just opened.
+Example: "Open notepad and type hello" ->
+[{"description": "Open Notepad", "metadata": {"type": "gui_automation", "action": "open", "app": "notepad"}},
+ {"description": "Type hello", "metadata": {"type": "gui_automation", "action": "type", "text": "hello"}, "depends_on": [0]}]
+
 If an image is provided:
 1. Use it to understand context for commands (e.g., "click that button").
 2. If the user asks to "summarize", "describe", or "what is on the screen", analyze the image and return a 'response' task with the description as the 'text'.
@@ -204,26 +228,31 @@ Return JSON array of tasks. Example:
  {"description": "Screen Summary", "metadata": {"type": "response", "text": "Yo bro, I see you have VS Code open with some python code..."}},
  {"description": "Greeting", "metadata": {"type": "response", "text": "Yo bro! What's good? Ready to crush some tasks?"}}]"""
 
+    def _plan_messages(self, user_input: str, image_data: str = None, context: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        user_content = [{"type": "text", "text": f"Parse this command: {user_input}"}]
+        if context:
+            # Recalled from the knowledge graph; lets the plan use names, paths, preferences seen before
+            memories = "\n".join(f"- {m['id']}: {json.dumps(m['data'])}" for m in context)
+            user_content.append({"type": "text", "text": f"Relevant memories:\n{memories}"})
+        
+        if image_data:
+            user_content.append({
+                "type": "image_url", 
+                "image_url": {"url": f"data:image/png;base64,{image_data}"}
+            })
+        return [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": user_content}
+        ]
+
+    async def analyze_task(self, user_input: str, image_data: str = None, context: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         try:
-            user_content = [{"type": "text", "text": f"Parse this command: {user_input}"}]
-            
-            if image_data:
-                user_content.append({
-                    "type": "image_url", 
-                    "image_url": {"url": f"data:image/png;base64,{image_data}"}
-                })
-
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content}
-                ],
+            raw_response = await self.client.complete(
+                self._plan_messages(user_input, image_data, context),
+                self.model,
                 response_format={"type": "json_object"}
             )
             
-            import json
-            raw_response = response.choices[0].message.content
             print(f"[OpenAI] Raw response: {raw_response}")
             
             result = json.loads(raw_response)
@@ -246,13 +275,46 @@ Return JSON array of tasks. Example:
                 
         except Exception as e:
             print(f"[OpenAI] Error parsing task: {e}")
+            self.errors += 1
             import traceback
             traceback.print_exc()
             # Fallback to MockLLM parsing
             mock = MockLLM()
-            return await mock.analyze_task(user_input, image_data)
+            return await mock.analyze_task(user_input, image_data, context)
+
+    async def stream_tasks(self, user_input: str, image_data: str = None, context: List[Dict[str, Any]] = None) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        if not Config.LLM_STREAM:
+            async for step in super().stream_tasks(user_input, image_data, context):
+                yield step
+            return
+        parser = PlanStreamParser()
+        streamed = 0
+        deltas = self.client.stream(
+            self._plan_messages(user_input, image_data, context),
+            self.model,
+            response_format={"type": "json_object"}
+        )
+        try:
+            async for delta in deltas:
+                for index, task in parser.feed(delta):
+                    streamed += 1
+                    yield index, task
+            print(f"[OpenAI] Streamed {streamed} tasks")
+            if not parser.done and not streamed:
+                # Same fallback as analyze_task when the reply holds no task array
+                yield 0, {"description": user_input, "metadata": {"type": "general", "duration": 2}}
+        except Exception as e:
+            print(f"[OpenAI] Error streaming plan after {streamed} task(s): {e}")
+            self.errors += 1
+            if not streamed:
+                for index, task in enumerate(await MockLLM().analyze_task(user_input, image_data, context)):
+                    yield index, task
+        finally:
+            await deltas.aclose()  # stops the request if the caller stopped reading early
 
 class GeminiProvider(LLMInterface):
+    model_id = "gemini"
+
     def __init__(self):
         self.api_key = Config.GOOGLE_API_KEY
         if not self.api_key:
@@ -261,7 +323,7 @@ class GeminiProvider(LLMInterface):
     async def generate(self, prompt: str) -> str:
         return f"[Gemini] Generated response for: {prompt}"
 
-    async def analyze_task(self, user_input: str, image_data: str = None) -> List[Dict[str, Any]]:
+    async def analyze_task(self, user_input: str, image_data: str = None, context: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         return [
             {"description": f"Analyzed: {user_input}", "metadata": {"source": "gemini"}}
         ]
@@ -271,6 +333,12 @@ class HybridProvider(LLMInterface):
         print("Initializing Hybrid Provider (OpenAI for Reasoning, Gemini for Content)...")
         self.openai = OpenAIProvider()
         self.gemini = GeminiProvider()
+        self.model_id = f"hybrid/{self.openai.model_id}"
+        self._fallbacks = 0
+
+    @property
+    def errors(self) -> int:
+        return self.openai.errors + self._fallbacks
 
     async def generate(self, prompt: str) -> str:
         # Use Gemini for generation (faster, cheaper, larger context)
@@ -280,13 +348,28 @@ class HybridProvider(LLMInterface):
             print(f"Hybrid: Gemini failed, falling back to OpenAI. Error: {e}")
             return await self.openai.generate(prompt)
 
-    async def analyze_task(self, user_input: str, image_data: str = None) -> List[Dict[str, Any]]:
+    async def analyze_task(self, user_input: str, image_data: str = None, context: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         # Use OpenAI for complex task analysis and planning
         try:
-            return await self.openai.analyze_task(user_input, image_data)
+            return await self.openai.analyze_task(user_input, image_data, context)
+        except Exception as e:
+            print(f"Hybrid: OpenAI failed, falling back to Gemini. Error: {e}")
+            self._fallbacks += 1
+            return await self.gemini.analyze_task(user_input, image_data, context)
+
+    async def stream_tasks(self, user_input: str, image_data: str = None, context: List[Dict[str, Any]] = None) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        streamed = 0
+        try:
+            async for step in self.openai.stream_tasks(user_input, image_data, context):
+                streamed += 1
+                yield step
         except Exception as e:
+            if streamed:
+                raise
             print(f"Hybrid: OpenAI failed, falling back to Gemini. Error: {e}")
-            return await self.gemini.analyze_task(user_input, image_data)
+            self._fallbacks += 1
+            async for step in self.gemini.stream_tasks(user_input, image_data, context):
+                yield step
 
 def get_llm_provider() -> LLMInterface:
     provider = Config.LLM_PROVIDER.lower()
@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from .llm_interface import MockLLM
+
+class LLMStubServer:
+    """Local stand-in for an OpenAI-compatible /chat/completions endpoint.
+
+    Waits `delay` seconds per request to mimic model latency, then answers
+    JSON-mode requests with MockLLM's plan for the command and anything else
+    with an echo. With "stream": true the same reply is sent as server-sent
+    events a few characters at a time, the delay spread across them the way a
+    model generates tokens. Point OPENAI_BASE_URL at `url` to run the real
+    providers against it. Tracks peak concurrency so tests can see requests
+    overlap.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.0):
+        self.delay = delay
+        self.requests = 0
+        self.active = 0
+        self.peak = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread: threading.Thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="nexus-llm-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    CHUNK_CHARS = 4  # roughly one token per streamed event
+
+    def reply(self, payload: Dict[str, Any]) -> str:
+        messages: List[Dict[str, Any]] = payload.get("messages") or [{}]
+        content = messages[-1].get("content", "")
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if part.get("type") == "text")
+        if (payload.get("response_format") or {}).get("type") == "json_object":
+            command = content.split("Parse this command:", 1)[-1].split("\n", 1)[0].strip()
+            reply = json.dumps({"tasks": asyncio.run(MockLLM().analyze_task(command))})
+        else:
+            reply = f"Stub response to: {content}"
+        return reply
+
+    def complete(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": f"stub-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": self.reply(payload)}, "finish_reason": "stop"}],
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            wbufsize = 1 << 16
+
+            def setup(self):
+                super().setup()
+                with server.lock:
+                    server.connections += 1  # one per TCP connection; a pooled client keeps this low
+
+            def _reply(self, payload: Dict[str, Any], status: int = 200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, payload: Dict[str, Any]):
+                reply = server.reply(payload)
+                chunks = [reply[i:i + server.CHUNK_CHARS] for i in range(0, len(reply), server.CHUNK_CHARS)]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for text in chunks:
+                        time.sleep(server.delay / len(chunks))
+                        event = {"object": "chat.completion.chunk", "model": payload.get("model", "stub"),
+                                 "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]}
+                        self._chunk(f"data: {json.dumps(event)}\n\n")
+                    self._chunk("data: [DONE]\n\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                except ConnectionError:
+                    self.close_connection = True
+
+            # A cancelled stream drops the connection mid-response; that is not an error here
+            def handle(self):
+                try:
+                    super().handle()
+                except ConnectionError:
+                    self.close_connection = True
+
+            def finish(self):
+                try:
+                    super().finish()
+                except ConnectionError:
+                    pass
+
+            def _chunk(self, text: str):
+                data = text.encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()  # wbufsize would otherwise hold events back
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not self.path.endswith("/chat/completions"):
+                    return self._reply({"error": {"message": "not found"}}, 404)
+                try:
+                    payload = json.loads(body)
+                except ValueError as e:
+                    return self._reply({"error": {"message": f"bad request: {e}"}}, 400)
+                with server.lock:
+                    server.requests += 1
+                    server.active += 1
+                    server.peak = max(server.peak, server.active)
+                try:
+                    if payload.get("stream"):
+                        self._stream(payload)
+                    else:
+                        time.sleep(server.delay)
+                        self._reply(server.complete(payload))
+                finally:
+                    with server.lock:
+                        server.active -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for an OpenAI-compatible chat-completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--delay", type=float, default=0.5, help="Seconds of simulated model latency per request")
+    args = parser.parse_args()
+    server = LLMStubServer(args.host, args.port, args.delay)
+    print(f"[LLM STUB] Listening on {server.url} (set OPENAI_BASE_URL to this)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from core.config import Config
+from core.database import Database
+
+# Requests whose right plan depends on when they are made, or on what is current
+TIME_SENSITIVE_RE = re.compile(
+    r"\b(now|today|tonight|tomorrow|yesterday|time|date|clock|weather|forecast|news|latest|current|"
+    r"stocks?|prices?|scores?|remind|reminder|timer|alarm|schedule|seconds?|minutes?|hours?|days?|"
+    r"weeks?|am|pm|morning|afternoon|evening)\b|\d+\s*[:h]\d*"
+)
+_SPACE_RE = re.compile(r"\s+")
+
+class PlanCache:
+    """Caches analyze_task plans so repeated commands skip the LLM.
+
+    Keys combine the normalized request, the provider/model that planned it
+    and a fingerprint of the recalled memories sent with it. Entries live in
+    an in-memory LRU of `size` plans backed by the plan_cache table, so hits
+    survive restarts; both tiers expire entries after `ttl` seconds. Requests
+    with a screenshot or with time-dependent wording are never cached.
+    """
+
+    # Bump when the plan format or planner prompt changes, to orphan old entries
+    VERSION = 1
+    PURGE_EVERY = 256  # puts between sweeps of the SQLite tier
+
+    def __init__(self, db: Database = None, size: int = None, ttl: float = None):
+        self.db = db or Database()
+        self.size = size or Config.PLAN_CACHE_SIZE
+        self.ttl = ttl if ttl is not None else Config.PLAN_CACHE_TTL
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (plan JSON, expires_at)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.db.purge_plans(time.time(), Config.PLAN_CACHE_DISK_MAX)
+
+    @staticmethod
+    def normalize(user_input: str) -> str:
+        text = unicodedata.normalize("NFKC", user_input).casefold()
+        return _SPACE_RE.sub(" ", text).strip(" .,!?;:'\"")
+
+    @staticmethod
+    def fingerprint(context: List[Dict[str, Any]] = None) -> str:
+        """Identifies the recalled memories; plans made with different memories don't share entries."""
+        if not context:
+            return ""
+        payload = json.dumps([(m.get("id"), m.get("data")) for m in context], sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+    def key(self, user_input: str, model_id: str, context: List[Dict[str, Any]] = None,
+            image_data: str = None) -> Optional[str]:
+        """Cache key for a request, or None if it must always go to the planner."""
+        text = self.normalize(user_input)
+        if image_data or not text or TIME_SENSITIVE_RE.search(text):
+            with self._lock:
+                self.bypassed += 1
+            return None
+        raw = f"{self.VERSION}\x1f{model_id}\x1f{text}\x1f{self.fingerprint(context)}"
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """A fresh copy of the cached plan, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(entry[0])
+                del self._memory[key]
+        entry = self.db.get_plan(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, entry)
+        return json.loads(entry[0])
+
+    def put(self, key: str, plan: List[Dict[str, Any]]):
+        entry = (json.dumps(plan), time.time() + self.ttl)
+        with self._lock:
+            self._remember(key, entry)
+            self._puts += 1
+            purge = self._puts % self.PURGE_EVERY == 0
+        self.db.put_plan(key, *entry)
+        if purge:
+            self.db.purge_plans(time.time(), Config.PLAN_CACHE_DISK_MAX)
+
+    def _remember(self, key: str, entry: Tuple[str, float]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        self.db.clear_plans()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
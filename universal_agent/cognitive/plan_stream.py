@@ -0,0 +1,78 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+class PlanStreamParser:
+    """Pulls task objects out of a planner's JSON while it is still arriving.
+
+    The planner answers with a task array, bare or under a key such as
+    {"tasks": [...]}. feed() takes the next piece of text and returns the
+    array elements whose closing brace it contained, as (position in the
+    array, task), so each task can be scheduled before the rest of the plan
+    has been generated. Positions count skipped elements too, so they match
+    the planner's "depends_on" indices. Only string,
+    escape and nesting state is tracked; each finished element goes through
+    json.loads whole.
+    """
+
+    def __init__(self):
+        self._buffer = ""  # text of the element being read (empty between elements)
+        self._depth = 0  # bracket depth of the whole document
+        self._array_depth: Optional[int] = None  # depth inside the task array, once found
+        self._in_string = False
+        self._escaped = False
+        self.done = False  # the task array has closed
+        self.elements = 0  # array elements finished so far, valid or not
+        self.skipped = 0  # elements that were not valid task objects
+        self.text: List[str] = []  # everything fed so far, for logging
+
+    def feed(self, chunk: str) -> List[Tuple[int, Dict[str, Any]]]:
+        self.text.append(chunk)
+        tasks = []
+        start = 0 if self._buffer else None  # where the current element began in this chunk
+        for i, char in enumerate(chunk):
+            if self.done:
+                break
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._depth += 1
+                if self._array_depth is None and char == "[":
+                    self._array_depth = self._depth
+                elif self._array_depth is not None and self._depth == self._array_depth + 1:
+                    start = i
+            elif char in "]}":
+                if self._array_depth is not None and self._depth == self._array_depth + 1 and start is not None:
+                    task = self._finish(self._buffer + chunk[start:i + 1])
+                    if task is not None:
+                        tasks.append((self.elements, task))
+                    self.elements += 1
+                    self._buffer, start = "", None
+                elif self._array_depth is not None and self._depth == self._array_depth:
+                    self.done = True
+                self._depth -= 1
+        if start is not None and not self.done:
+            self._buffer += chunk[start:]  # element continues in the next chunk
+        return tasks
+
+    def _finish(self, text: str) -> Optional[Dict[str, Any]]:
+        try:
+            task = json.loads(text)
+        except ValueError:
+            task = None
+        if not isinstance(task, dict) or "metadata" not in task:
+            self.skipped += 1
+            return None
+        task.setdefault("description", task["metadata"].get("type", "Task"))
+        return task
+
+    def result(self) -> Any:
+        """The whole response as parsed JSON (for callers that need more than the tasks)."""
+        return json.loads("".join(self.text))
@@ -0,0 +1,142 @@
+import asyncio
+import atexit
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .config import Config
+from .database import Database
+from .types import Task, TaskStatus
+
+_STOP = object()
+
+class AsyncDatabase:
+    """Awaitable front end for Database, for use inside coroutines.
+
+    Every call is handed to one dedicated thread through a request queue, so
+    the event loop never waits on disk and all access from this process is
+    serialized (no `database is locked` between our own writers). Saves that
+    pile up while the thread is busy are written together in one transaction.
+    """
+
+    def __init__(self, db: Database = None, batch_size: int = None):
+        self.db = db or Database()
+        self.batch_size = batch_size or Config.DB_WRITER_BATCH
+        self._requests: "queue.Queue" = queue.Queue()
+        self.requests = 0
+        self.batches = 0
+        self._thread = threading.Thread(target=self._run, name="nexus-db-thread", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _call(self, kind: str, fn: Callable, *args) -> "asyncio.Future":
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._requests.put((kind, fn, args, loop, future))
+        return future
+
+    # Writes
+
+    async def save_task(self, task: Task):
+        await self._call("save", self.db.save_task, task)
+
+    async def save_tasks(self, tasks: List[Task]):
+        await self._call("call", self.db.save_tasks, list(tasks))
+
+    async def save_knowledge(self, node_id: str, data: Dict[str, Any]):
+        await self._call("call", self.db.save_knowledge, node_id, data)
+
+    async def flush(self):
+        await self._call("call", self.db.flush)
+
+    # Reads
+
+    async def get_task(self, task_id: str) -> Optional[Task]:
+        return await self._call("call", self.db.get_task, task_id)
+
+    async def get_all_tasks(self) -> List[Task]:
+        return await self._call("call", self.db.get_all_tasks)
+
+    async def get_tasks(self, limit: int = 20, before_cursor: Optional[str] = None,
+                        status: Optional[TaskStatus] = None) -> Tuple[List[Task], Optional[str]]:
+        return await self._call("call", self.db.get_tasks, limit, before_cursor, status)
+
+    async def changes_since(self, rev: int, limit: int = None) -> Tuple[List[Task], int]:
+        return await self._call("call", self.db.changes_since, rev, limit)
+
+    async def count_by_status(self) -> Dict[str, int]:
+        return await self._call("call", self.db.count_by_status)
+
+    async def get_scheduled_tasks(self) -> List[Task]:
+        return await self._call("call", self.db.get_scheduled_tasks)
+
+    def _run(self):
+        while True:
+            batch = [self._requests.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._requests.get_nowait())
+                except queue.Empty:
+                    break
+            self.batches += 1
+
+            stop = False
+            saves = []
+            for request in batch:
+                if request is _STOP:
+                    stop = True
+                    continue
+                self.requests += 1
+                if request[0] == "save":
+                    saves.append(request)
+                    continue
+                # Keep ordering: queued saves land before any other request runs
+                self._write_saves(saves)
+                saves = []
+                kind, fn, args, loop, future = request
+                try:
+                    self._resolve(loop, future, fn(*args), None)
+                except Exception as e:
+                    self._resolve(loop, future, None, e)
+            self._write_saves(saves)
+
+            if stop:
+                self.db.close()
+                return
+
+    def _write_saves(self, saves: list):
+        if not saves:
+            return
+        try:
+            self.db.save_tasks([args[0] for _, _, args, _, _ in saves])
+            error = None
+        except Exception as e:
+            error = e
+        for _, _, _, loop, future in saves:
+            self._resolve(loop, future, None, error)
+
+    @staticmethod
+    def _resolve(loop: asyncio.AbstractEventLoop, future: "asyncio.Future", result: Any, error: Optional[Exception]):
+        def settle():
+            if future.cancelled():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        try:
+            loop.call_soon_threadsafe(settle)
+        except RuntimeError:
+            pass  # the caller's loop is already closed
+
+    def close(self, timeout: float = 5.0):
+        """Finish queued requests, then close the database thread's connection."""
+        if self._thread.is_alive():
+            self._requests.put(_STOP)
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._requests.qsize(),
+            "requests": self.requests,
+            "batches": self.batches,
+        }
@@ -11,11 +11,87 @@ class Config:
     
     # Database
     DB_PATH = os.getenv("DB_PATH", "universal_agent.db")
+    DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "5"))  # seconds to wait on a locked database
+    DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))  # prepared statements per connection
+    DB_CACHE_KB = int(os.getenv("DB_CACHE_KB", "8192"))
+    DB_MMAP_BYTES = int(os.getenv("DB_MMAP_BYTES", str(64 * 1024 * 1024)))
+    DB_WRITE_BEHIND = os.getenv("DB_WRITE_BEHIND", "True").lower() == "true"  # batch orchestrator status writes
+    DB_FLUSH_INTERVAL = float(os.getenv("DB_FLUSH_INTERVAL", "0.25"))  # seconds between write-behind flushes
+    DB_WRITER_BATCH = int(os.getenv("DB_WRITER_BATCH", "256"))  # requests handled per AsyncDatabase round
+    DB_MAX_PAGE_SIZE = int(os.getenv("DB_MAX_PAGE_SIZE", "200"))  # cap for Database.get_tasks
+
+    # Task history retention (see core/retention.py)
+    ARCHIVE_DB_PATH = os.getenv("ARCHIVE_DB_PATH", "universal_agent_archive.db")
+    RETENTION_DAYS = float(os.getenv("RETENTION_DAYS", "30"))  # 0 keeps finished tasks regardless of age
+    RETENTION_MAX_ROWS = int(os.getenv("RETENTION_MAX_ROWS", "10000"))  # 0 disables the row cap
+    RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))  # seconds between runs
+    RETENTION_BATCH = int(os.getenv("RETENTION_BATCH", "1000"))  # rows moved per transaction
+    RETENTION_VACUUM_PAGES = int(os.getenv("RETENTION_VACUUM_PAGES", "2000"))  # pages freed per run
+
+    # Knowledge graph storage
+    KNOWLEDGE_BACKEND = os.getenv("KNOWLEDGE_BACKEND", "sqlite")  # sqlite (knowledge table + FTS5) or log (knowledge.json + log)
+    # log backend (see memory/log_store.py)
+    KNOWLEDGE_FSYNC_INTERVAL = float(os.getenv("KNOWLEDGE_FSYNC_INTERVAL", "0.5"))  # max seconds a change waits for fsync
+    KNOWLEDGE_FSYNC_BATCH = int(os.getenv("KNOWLEDGE_FSYNC_BATCH", "1000"))  # or fsync after this many records
+    KNOWLEDGE_COMPACT_RATIO = float(os.getenv("KNOWLEDGE_COMPACT_RATIO", "2.0"))  # log records per live node before compacting
+    KNOWLEDGE_COMPACT_MIN = int(os.getenv("KNOWLEDGE_COMPACT_MIN", "10000"))
+    # Similarity search over nodes (see memory/vector_index.py)
+    KNOWLEDGE_VECTORS = os.getenv("KNOWLEDGE_VECTORS", "True").lower() == "true"  # keep a vector index beside the graph
+    VECTOR_DIM = int(os.getenv("VECTOR_DIM", "256"))  # hashed embedding width
+    VECTOR_TRAIN_MIN = int(os.getenv("VECTOR_TRAIN_MIN", "50000"))  # exact scan below this many vectors, clustered above
+    VECTOR_NPROBE = int(os.getenv("VECTOR_NPROBE", "32"))  # clusters scored per search
+    MEMORY_RECALL_K = int(os.getenv("MEMORY_RECALL_K", "5"))  # memories added to each plan prompt, 0 disables
+    MEMORY_RECALL_MIN_SCORE = float(os.getenv("MEMORY_RECALL_MIN_SCORE", "0.3"))  # cosine cut-off for recall
+    
+    # Cloud sync of the knowledge graph (see integrations/cloud_sync.py)
+    CLOUD_SYNC_URL = os.getenv("CLOUD_SYNC_URL")  # unset disables sync
+    CLOUD_SYNC_BATCH = int(os.getenv("CLOUD_SYNC_BATCH", "500"))  # changes per request
+    CLOUD_SYNC_TIMEOUT = float(os.getenv("CLOUD_SYNC_TIMEOUT", "30"))  # seconds per request
+    CLOUD_SYNC_DEBOUNCE = float(os.getenv("CLOUD_SYNC_DEBOUNCE", "2"))  # quiet seconds after an edit before syncing
+    CLOUD_SYNC_MAX_DELAY = float(os.getenv("CLOUD_SYNC_MAX_DELAY", "30"))  # sync at least this soon after an edit, even mid-burst
+    CLOUD_SYNC_INTERVAL = float(os.getenv("CLOUD_SYNC_INTERVAL", "300"))  # seconds between syncs with no local edits (pulls)
+    CLOUD_SYNC_RETRY_BASE = float(os.getenv("CLOUD_SYNC_RETRY_BASE", "2"))  # first retry delay cap, doubled per failure
+    CLOUD_SYNC_RETRY_MAX = float(os.getenv("CLOUD_SYNC_RETRY_MAX", "300"))  # longest retry delay
     
     # LLM Provider
     LLM_PROVIDER = os.getenv("LLM_PROVIDER", "mock")  # mock, openai, gemini
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")  # any chat-completions compatible endpoint
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))  # LLM requests in flight at once
+    LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "8"))  # keep-alive connections to the LLM endpoint
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))  # seconds per LLM request
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))  # retries on 429/5xx/connection errors, with backoff
+    LLM_STREAM = os.getenv("LLM_STREAM", "True").lower() == "true"  # start plan steps while the model is still writing
+    
+    # Local intent router for simple commands (see cognitive/intent_router.py)
+    INTENT_ROUTER = os.getenv("INTENT_ROUTER", "True").lower() == "true"
+    
+    # Plan cache (see cognitive/plan_cache.py)
+    PLAN_CACHE = os.getenv("PLAN_CACHE", "True").lower() == "true"
+    PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "512"))  # plans kept in memory
+    PLAN_CACHE_DISK_MAX = int(os.getenv("PLAN_CACHE_DISK_MAX", "5000"))  # plans kept in SQLite
+    PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", "86400"))  # seconds a cached plan stays valid
+    
+    # Orchestrator
+    ORCHESTRATOR_WORKERS = int(os.getenv("ORCHESTRATOR_WORKERS", "8"))
+    TASK_TIMEOUT = float(os.getenv("TASK_TIMEOUT", "300"))  # seconds, per task unless overridden
+    MAX_INFLIGHT_TASKS = int(os.getenv("MAX_INFLIGHT_TASKS", "500"))  # queued + running
+    BACKPRESSURE_POLICY = os.getenv("BACKPRESSURE_POLICY", "defer")  # defer or reject
+    BACKPRESSURE_DEFER_TIMEOUT = float(os.getenv("BACKPRESSURE_DEFER_TIMEOUT", "10"))
+    
+    # Shell session pool (warm PowerShell/bash processes for run_command)
+    SHELL_POOL_SIZE = int(os.getenv("SHELL_POOL_SIZE", "2"))  # 0 disables the pool
+    SHELL_POOL_MAX_COMMANDS = int(os.getenv("SHELL_POOL_MAX_COMMANDS", "200"))  # recycle after N commands
+    SHELL_POOL_HEALTH_INTERVAL = float(os.getenv("SHELL_POOL_HEALTH_INTERVAL", "60"))  # ping sessions idle this long
+    
+    # Streaming task output
+    TASK_OUTPUT_DIR = os.getenv("TASK_OUTPUT_DIR", "task_output")  # full output of large commands
+    TASK_OUTPUT_TAIL_BYTES = int(os.getenv("TASK_OUTPUT_TAIL_BYTES", "16384"))  # kept in memory per stream
+    
+    # Remote API hosted by the agent process (see remote_api.py)
+    REMOTE_API_HOST = os.getenv("REMOTE_API_HOST", "127.0.0.1")  # 0.0.0.0 to reach it from other devices
+    REMOTE_API_PORT = int(os.getenv("REMOTE_API_PORT", "8080"))  # 0 disables it
     
     # Security
     SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-key-change-in-prod")
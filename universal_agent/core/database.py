@@ -1,116 +1,649 @@
 import sqlite3
 import json
+import re
+import threading
+import atexit
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from .config import Config
-from .types import Task, TaskStatus
+from .types import Task, TaskStatus, STATUS_CODES, STATUS_BY_CODE
+
+TASK_COLUMNS = "id, description, priority, status, created_at, result, error, metadata, scheduled_time"
+
+# Statements are kept as constants so each pooled connection's statement cache reuses them
+# Every write stamps the row with the next revision. Writers are serialized by
+# SQLite, so revisions commit in increasing order and a reader that has seen
+# rev N has seen every change up to N. MAX(rev) is a single idx_tasks_rev probe.
+NEXT_REV_SQL = '(SELECT COALESCE(MAX(rev), 0) + 1 FROM tasks)'
+SAVE_TASK_SQL = f'''
+    INSERT OR REPLACE INTO tasks ({TASK_COLUMNS}, rev)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, {NEXT_REV_SQL})
+'''
+GET_TASK_SQL = f'SELECT {TASK_COLUMNS} FROM tasks WHERE id = ?'
+ALL_TASKS_SQL = f'SELECT {TASK_COLUMNS} FROM tasks ORDER BY created_at DESC'
+# Keyset pagination: newest first, (created_at, id) breaks ties, served by the indexes below
+PAGE_TASKS_SQL = f'SELECT {TASK_COLUMNS} FROM tasks ORDER BY created_at DESC, id DESC LIMIT ?'
+PAGE_TASKS_BEFORE_SQL = f'SELECT {TASK_COLUMNS} FROM tasks WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?'
+PAGE_STATUS_SQL = f'SELECT {TASK_COLUMNS} FROM tasks WHERE status = ? ORDER BY created_at DESC, id DESC LIMIT ?'
+PAGE_STATUS_BEFORE_SQL = f'SELECT {TASK_COLUMNS} FROM tasks WHERE status = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?'
+CHANGES_SINCE_SQL = f'SELECT {TASK_COLUMNS}, rev FROM tasks WHERE rev > ? ORDER BY rev LIMIT ?'
+CURRENT_REV_SQL = 'SELECT COALESCE(MAX(rev), 0) FROM tasks'
+COUNT_BY_STATUS_SQL = 'SELECT status, COUNT(*) FROM tasks GROUP BY status'
+SCHEDULED_TASKS_SQL = f'SELECT {TASK_COLUMNS} FROM tasks WHERE status = ? AND scheduled_time IS NOT NULL ORDER BY scheduled_time'
+TASK_FIELDS = [c.strip() for c in TASK_COLUMNS.split(",")]
+TERMINAL_STATUSES = {STATUS_CODES[s] for s in (TaskStatus.COMPLETED, TaskStatus.FAILED,
+                                                TaskStatus.CANCELLED, TaskStatus.TIMED_OUT)}
+# Bumped whenever the on-disk layout changes; stored in PRAGMA user_version
+SCHEMA_VERSION = 1
+TASKS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id TEXT PRIMARY KEY,
+        description TEXT,
+        priority INTEGER,
+        status INTEGER,
+        created_at TEXT,
+        result TEXT,
+        error TEXT,
+        metadata TEXT,
+        scheduled_time TEXT,
+        rev INTEGER
+    )
+'''
+# Upsert rather than REPLACE: the row keeps its rowid, which keys its FTS rows
+SAVE_KNOWLEDGE_SQL = '''
+    INSERT INTO knowledge (id, data, updated_at) VALUES (?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+'''
+GET_KNOWLEDGE_SQL = 'SELECT data FROM knowledge WHERE id = ?'
+DELETE_KNOWLEDGE_SQL = 'DELETE FROM knowledge WHERE id = ?'
+# knowledge_fts holds one row per leaf field of a node, at rowid (node rowid << 20) + n,
+# so a node's rows are one rowid range. Triggers keep it in step with `knowledge`,
+# whoever writes the table. json_tree flattens nested objects to dotted field names.
+KNOWLEDGE_FTS_SHIFT = 20
+KNOWLEDGE_FTS_SQL = [
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(field UNINDEXED, body)''',
+    f'''CREATE TRIGGER IF NOT EXISTS knowledge_fts_insert AFTER INSERT ON knowledge BEGIN
+        INSERT INTO knowledge_fts (rowid, field, body)
+        SELECT (new.rowid << {KNOWLEDGE_FTS_SHIFT}) + ROW_NUMBER() OVER (),
+               CASE WHEN typeof(key) = 'integer' THEN substr(path, 3) ELSE substr(fullkey, 3) END,
+               value
+        FROM json_tree(new.data) WHERE type NOT IN ('object', 'array', 'null');
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS knowledge_fts_delete AFTER DELETE ON knowledge BEGIN
+        DELETE FROM knowledge_fts WHERE rowid BETWEEN (old.rowid << {KNOWLEDGE_FTS_SHIFT})
+            AND (old.rowid << {KNOWLEDGE_FTS_SHIFT}) + {(1 << KNOWLEDGE_FTS_SHIFT) - 1};
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS knowledge_fts_update AFTER UPDATE OF data ON knowledge BEGIN
+        DELETE FROM knowledge_fts WHERE rowid BETWEEN (old.rowid << {KNOWLEDGE_FTS_SHIFT})
+            AND (old.rowid << {KNOWLEDGE_FTS_SHIFT}) + {(1 << KNOWLEDGE_FTS_SHIFT) - 1};
+        INSERT INTO knowledge_fts (rowid, field, body)
+        SELECT (new.rowid << {KNOWLEDGE_FTS_SHIFT}) + ROW_NUMBER() OVER (),
+               CASE WHEN typeof(key) = 'integer' THEN substr(path, 3) ELSE substr(fullkey, 3) END,
+               value
+        FROM json_tree(new.data) WHERE type NOT IN ('object', 'array', 'null');
+    END''',
+]
+# Sync journal: the version stamp of every node (deleted ones too, as tombstones), with a
+# revision bumped on each change so changes can be read back in order, like tasks.rev
+KNOWLEDGE_NEXT_REV_SQL = '(SELECT COALESCE(MAX(rev), 0) + 1 FROM knowledge_versions)'
+STAMP_KNOWLEDGE_SQL = f'''
+    INSERT INTO knowledge_versions (id, version, deleted, rev) VALUES (?, ?, ?, {KNOWLEDGE_NEXT_REV_SQL})
+    ON CONFLICT(id) DO UPDATE SET version = excluded.version, deleted = excluded.deleted, rev = excluded.rev
+'''
+STAMP_UNVERSIONED_SQL = '''
+    INSERT INTO knowledge_versions (id, version, deleted, rev)
+    SELECT k.id, ?, 0, (SELECT COALESCE(MAX(rev), 0) FROM knowledge_versions) + ROW_NUMBER() OVER ()
+    FROM knowledge k WHERE NOT EXISTS (SELECT 1 FROM knowledge_versions v WHERE v.id = k.id)
+'''
+IMPORT_VERSION_SQL = 'INSERT OR REPLACE INTO knowledge_versions (id, version, deleted, rev) VALUES (?, ?, ?, ?)'
+KNOWLEDGE_CHANGES_SQL = '''
+    SELECT v.id, k.data, v.version, v.deleted, v.rev FROM knowledge_versions v
+    LEFT JOIN knowledge k ON k.id = v.id WHERE v.rev > ? ORDER BY v.rev LIMIT ?
+'''
+SAVE_EDGE_SQL = 'INSERT OR IGNORE INTO knowledge_edges (src, type, dst) VALUES (?, ?, ?)'
+DELETE_EDGE_SQL = 'DELETE FROM knowledge_edges WHERE src = ? AND type = ? AND dst = ?'
+KNOWLEDGE_TERM_RE = re.compile(r"[^\W_]+")
 
 class Database:
-    def __init__(self):
-        self.db_path = Config.DB_PATH
+    """SQLite storage for tasks and knowledge.
+
+    Each thread gets one long-lived connection (per Database instance) in WAL
+    mode, so status updates don't pay connect/close on every call and readers
+    (GUI, dashboard, remote API) don't block the orchestrator's writes.
+
+    Every insert or update bumps the row's `rev` to a new table-wide maximum,
+    so pollers can ask for changes_since(rev) instead of re-reading the table.
+
+    With `write_behind`, save_task only queues the change: updates are
+    coalesced per task id and written by a background thread in one
+    transaction per DB_FLUSH_INTERVAL, touching only the columns that changed.
+    Reads through this instance flush first, so they always see their own writes.
+    """
+
+    def __init__(self, db_path: str = None, write_behind: bool = False):
+        self.db_path = db_path or Config.DB_PATH
+        self._local = threading.local()
         self._init_db()
+        self._enable_incremental_vacuum()
+
+        self.write_behind = write_behind
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}  # task id -> columns to write
+        self._inserts: set = set()  # ids whose pending write is a full row
+        self._known: Dict[str, Dict[str, Any]] = {}  # last queued row per live task
+        if write_behind:
+            threading.Thread(target=self._flush_loop, name="nexus-db-writer", daemon=True).start()
+            atexit.register(self.flush)
+
+    def _get_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=Config.DB_BUSY_TIMEOUT,
+                cached_statements=Config.DB_STATEMENT_CACHE
+            )
+            self._configure(conn)
+            self._local.conn = conn
+        return conn
 
-    def _get_conn(self):
-        return sqlite3.connect(self.db_path)
+    def _configure(self, conn: sqlite3.Connection):
+        # Only takes effect on a new file (and must precede WAL); lets retention
+        # hand freed pages back incrementally
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('PRAGMA journal_mode=WAL')
+        # NORMAL is durable across application crashes in WAL mode and skips
+        # an fsync per commit; only an OS crash can lose the last transactions
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute(f'PRAGMA cache_size=-{Config.DB_CACHE_KB}')
+        conn.execute(f'PRAGMA mmap_size={Config.DB_MMAP_BYTES}')
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._get_conn()
+        with conn:  # commits on success, rolls back on error
+            yield conn
+
+    def close(self):
+        """Flush queued writes and close the calling thread's connection."""
+        self.flush()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
 
     def _init_db(self):
+        with self._transaction() as conn:
+            # One transaction, so a migration is all-or-nothing and concurrent openers wait
+            conn.execute('BEGIN IMMEDIATE')
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            existed = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks'"
+            ).fetchone() is not None
+
+            # Tasks Table
+            conn.execute(TASKS_TABLE_SQL.format(name="tasks"))
+            if existed and version < SCHEMA_VERSION:
+                self._ensure_column(conn, "tasks", "scheduled_time", "TEXT")
+                if self._ensure_column(conn, "tasks", "rev", "INTEGER"):
+                    conn.execute('UPDATE tasks SET rev = rowid')
+                self._migrate_status_codes(conn)
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_rev ON tasks (rev)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks (created_at, id)')
+            # Also covers per-status pages and GROUP BY status counts
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, created_at, id)')
+
+            # Knowledge Table
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS knowledge (
+                    id TEXT PRIMARY KEY,
+                    data TEXT,
+                    updated_at TEXT
+                )
+            ''')
+            # Typed edges between knowledge nodes; the PK serves outgoing lookups, the index incoming ones
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS knowledge_edges (
+                    src TEXT,
+                    type TEXT,
+                    dst TEXT,
+                    PRIMARY KEY (src, type, dst)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_edges_dst ON knowledge_edges (dst, type, src)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS knowledge_versions (
+                    id TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    deleted INTEGER NOT NULL DEFAULT 0,
+                    rev INTEGER
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_knowledge_versions_rev ON knowledge_versions (rev)')
+            # Small key/value store for sync cursors and the replica id
+            conn.execute('CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)')
+            # Planner output cached by cognitive/plan_cache.py (plan is JSON)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS plan_cache (
+                    key TEXT PRIMARY KEY,
+                    plan TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_plan_cache_expires ON plan_cache (expires_at)')
+            self.has_fts = self._init_knowledge_fts(conn)
+
+    def _enable_incremental_vacuum(self):
+        # Files created before auto_vacuum was set need one full VACUUM to switch
+        # modes. Done here at startup, not by retention, since it locks the whole file.
         conn = self._get_conn()
-        cursor = conn.cursor()
-        
-        # Tasks Table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id TEXT PRIMARY KEY,
-                description TEXT,
-                priority INTEGER,
-                status TEXT,
-                created_at TEXT,
-                result TEXT,
-                error TEXT,
-                metadata TEXT
-            )
-        ''')
-        
-        # Knowledge Table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS knowledge (
-                id TEXT PRIMARY KEY,
-                data TEXT,
-                updated_at TEXT
-            )
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            return
+        print("[DATABASE] Converting to incremental auto-vacuum (one-time VACUUM)...")
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('VACUUM')
+
+    def _init_knowledge_fts(self, conn) -> bool:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'knowledge_fts'"
+        ).fetchone() is not None
+        try:
+            for statement in KNOWLEDGE_FTS_SQL:
+                conn.execute(statement)
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5; search_knowledge falls back to LIKE
+            print(f"[DATABASE] Full-text search unavailable: {e}")
+            return False
+        if not exists:
+            # Index rows written before the FTS table existed
+            conn.execute("UPDATE knowledge SET data = data")
+        return True
+
+    def _migrate_status_codes(self, conn):
+        # Status used to be stored as its text value; rebuild the table with integer codes
+        codes = " ".join(f"WHEN '{status.value}' THEN {code}" for status, code in STATUS_CODES.items())
+        conn.execute('DROP TABLE IF EXISTS tasks_migrating')
+        conn.execute(TASKS_TABLE_SQL.format(name="tasks_migrating"))
+        conn.execute(f'''
+            INSERT INTO tasks_migrating ({TASK_COLUMNS}, rev)
+            SELECT id, description, priority, CASE status {codes} ELSE {STATUS_CODES[TaskStatus.FAILED]} END,
+                   created_at, result, error, metadata, scheduled_time, rev
+            FROM tasks
         ''')
-        
-        conn.commit()
-        conn.close()
+        conn.execute('DROP TABLE tasks')  # also drops its indexes; recreated by _init_db
+        conn.execute('ALTER TABLE tasks_migrating RENAME TO tasks')
 
-    def save_task(self, task: Task):
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO tasks (id, description, priority, status, created_at, result, error, metadata)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+    def _ensure_column(self, conn, table: str, column: str, decl: str) -> bool:
+        # Databases created by older versions lack newer columns
+        columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+        if column not in columns:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {decl}')
+            return True
+        return False
+
+    def _row_to_task(self, row) -> Task:
+        return Task(
+            id=row[0],
+            description=row[1],
+            priority=row[2],
+            status=STATUS_BY_CODE[row[3]],
+            created_at=datetime.fromisoformat(row[4]),
+            result=row[5],
+            error=row[6],
+            metadata_json=row[7],  # parsed on first access
+            scheduled_time=datetime.fromisoformat(row[8]) if row[8] else None
+        )
+
+    def _task_params(self, task: Task) -> tuple:
+        return (
             task.id,
             task.description,
             task.priority,
-            task.status.value,
+            STATUS_CODES[task.status],
             task.created_at.isoformat(),
             str(task.result) if task.result else None,
             task.error,
-            json.dumps(task.metadata)
-        ))
-        
-        conn.commit()
-        conn.close()
+            task.metadata_json(),
+            task.scheduled_time.isoformat() if task.scheduled_time else None
+        )
+
+    def save_task(self, task: Task):
+        if self.write_behind:
+            self._queue_write(task)
+            return
+        with self._transaction() as conn:
+            conn.execute(SAVE_TASK_SQL, self._task_params(task))
+
+    def save_tasks(self, tasks: List[Task]):
+        """Save several tasks in one transaction."""
+        if self.write_behind:
+            for task in tasks:
+                self._queue_write(task)
+            return
+        with self._transaction() as conn:
+            conn.executemany(SAVE_TASK_SQL, [self._task_params(t) for t in tasks])
+
+    def _queue_write(self, task: Task):
+        row = dict(zip(TASK_FIELDS, self._task_params(task)))
+        with self._pending_lock:
+            known = self._known.get(task.id)
+            if known is None:
+                # First sighting in this process: write the full row
+                self._pending[task.id] = row
+                self._inserts.add(task.id)
+            else:
+                changed = {col: value for col, value in row.items() if known[col] != value}
+                if not changed:
+                    return
+                self._pending.setdefault(task.id, {}).update(changed)
+            self._known[task.id] = row
+
+    def flush(self):
+        """Write all queued task changes now, in a single transaction."""
+        if not self.write_behind:
+            return
+        with self._flush_lock:
+            with self._pending_lock:
+                if not self._pending:
+                    return
+                pending, self._pending = self._pending, {}
+                inserts, self._inserts = self._inserts, set()
+                # Finished tasks rarely change again; stop tracking them
+                for task_id, row in pending.items():
+                    if row.get("status") in TERMINAL_STATUSES:
+                        self._known.pop(task_id, None)
+
+            full_rows = []
+            updates: Dict[tuple, list] = {}
+            for task_id, changes in pending.items():
+                if task_id in inserts:
+                    full_rows.append(tuple(changes[col] for col in TASK_FIELDS))
+                else:
+                    cols = tuple(sorted(changes))
+                    updates.setdefault(cols, []).append(tuple(changes[c] for c in cols) + (task_id,))
+
+            try:
+                with self._transaction() as conn:
+                    if full_rows:
+                        conn.executemany(SAVE_TASK_SQL, full_rows)
+                    for cols, params in updates.items():
+                        assignments = ", ".join(f"{c} = ?" for c in cols) + f", rev = {NEXT_REV_SQL}"
+                        conn.executemany(f'UPDATE tasks SET {assignments} WHERE id = ?', params)
+            except sqlite3.Error:
+                # Put the batch back underneath anything queued since, for the next flush
+                with self._pending_lock:
+                    for task_id, changes in pending.items():
+                        self._pending[task_id] = {**changes, **self._pending.get(task_id, {})}
+                    self._inserts |= inserts
+                raise
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(Config.DB_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"[DATABASE] Write-behind flush failed, will retry: {e}")
 
     def get_task(self, task_id: str) -> Optional[Task]:
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))
-        row = cursor.fetchone()
-        conn.close()
-        
+        self.flush()
+        row = self._get_conn().execute(GET_TASK_SQL, (task_id,)).fetchone()
         if row:
-            return Task(
-                id=row[0],
-                description=row[1],
-                priority=row[2],
-                status=TaskStatus(row[3]),
-                created_at=datetime.fromisoformat(row[4]),
-                result=row[5],
-                error=row[6],
-                metadata=json.loads(row[7])
-            )
+            return self._row_to_task(row)
         return None
 
     def get_all_tasks(self) -> List[Task]:
+        self.flush()
+        rows = self._get_conn().execute(ALL_TASKS_SQL).fetchall()
+        return [self._row_to_task(row) for row in rows]
+
+    def get_tasks(self, limit: int = 20, before_cursor: Optional[str] = None,
+                  status: Optional[TaskStatus] = None) -> Tuple[List[Task], Optional[str]]:
+        """One page of tasks, newest first.
+
+        Returns (tasks, next_cursor); pass next_cursor back as before_cursor to
+        get the following page. next_cursor is None on the last page. Cost
+        depends on the page size, not on how many tasks are stored.
+        """
+        self.flush()
+        limit = self.page_size(limit)
+        status_value = STATUS_CODES[TaskStatus(status)] if status else None
         conn = self._get_conn()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM tasks ORDER BY created_at DESC')
-        rows = cursor.fetchall()
-        conn.close()
-        
-        tasks = []
-        for row in rows:
-            tasks.append(Task(
-                id=row[0],
-                description=row[1],
-                priority=row[2],
-                status=TaskStatus(row[3]),
-                created_at=datetime.fromisoformat(row[4]),
-                result=row[5],
-                error=row[6],
-                metadata=json.loads(row[7])
-            ))
-        return tasks
-
-    def save_knowledge(self, node_id: str, data: Dict[str, Any]):
+
+        if before_cursor:
+            created_at, _, task_id = before_cursor.partition("|")
+            if status_value is not None:
+                rows = conn.execute(PAGE_STATUS_BEFORE_SQL, (status_value, created_at, task_id, limit)).fetchall()
+            else:
+                rows = conn.execute(PAGE_TASKS_BEFORE_SQL, (created_at, task_id, limit)).fetchall()
+        elif status_value is not None:
+            rows = conn.execute(PAGE_STATUS_SQL, (status_value, limit)).fetchall()
+        else:
+            rows = conn.execute(PAGE_TASKS_SQL, (limit,)).fetchall()
+
+        next_cursor = f"{rows[-1][4]}|{rows[-1][0]}" if len(rows) == limit else None
+        return [self._row_to_task(row) for row in rows], next_cursor
+
+    @staticmethod
+    def page_size(limit: int = None) -> int:
+        """The page size actually used for a requested `limit` (clamped to DB_MAX_PAGE_SIZE)."""
+        return max(1, min(int(limit or Config.DB_MAX_PAGE_SIZE), Config.DB_MAX_PAGE_SIZE))
+
+    def current_rev(self) -> int:
+        """The latest task revision; pass it to changes_since() to start following changes."""
+        self.flush()
+        return self._get_conn().execute(CURRENT_REV_SQL).fetchone()[0]
+
+    def changes_since(self, rev: int, limit: int = None) -> Tuple[List[Task], int]:
+        """Tasks created or modified after revision `rev`, oldest change first.
+
+        Returns (tasks, new_rev). Pass new_rev back on the next call; if the
+        result was cut off at page_size(limit) the remaining changes follow from there.
+        """
+        self.flush()
+        limit = self.page_size(limit)
+        rows = self._get_conn().execute(CHANGES_SINCE_SQL, (int(rev), limit)).fetchall()
+        if not rows:
+            return [], int(rev)
+        return [self._row_to_task(row) for row in rows], rows[-1][-1]
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Task counts per status value (statuses with no tasks are omitted)."""
+        self.flush()
+        rows = self._get_conn().execute(COUNT_BY_STATUS_SQL).fetchall()
+        return {STATUS_BY_CODE[code].value: count for code, count in rows}
+
+    def get_scheduled_tasks(self) -> List[Task]:
+        """Pending tasks that are waiting on a scheduled_time."""
+        self.flush()
+        rows = self._get_conn().execute(SCHEDULED_TASKS_SQL, (STATUS_CODES[TaskStatus.PENDING],)).fetchall()
+        return [self._row_to_task(row) for row in rows]
+
+    def save_knowledge(self, node_id: str, data: Dict[str, Any], version: str = None):
+        self.save_knowledge_many([(node_id, data)], [version] if version else None)
+
+    def save_knowledge_many(self, nodes: List[Tuple[str, Dict[str, Any]]], versions: List[str] = None):
+        """Save many knowledge nodes in one transaction, stamping them with `versions` if given."""
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.executemany(SAVE_KNOWLEDGE_SQL, [(node_id, json.dumps(data), now) for node_id, data in nodes])
+            if versions:
+                conn.executemany(STAMP_KNOWLEDGE_SQL, [(node_id, version, 0) for (node_id, _), version in zip(nodes, versions)])
+
+    def get_knowledge(self, node_id: str) -> Optional[Dict[str, Any]]:
+        row = self._get_conn().execute(GET_KNOWLEDGE_SQL, (node_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete_knowledge(self, node_id: str, version: str = None) -> bool:
+        """Delete a node; with a version, leave a tombstone in the sync journal."""
+        with self._transaction() as conn:
+            if version:
+                conn.execute(STAMP_KNOWLEDGE_SQL, (node_id, version, 1))
+            return conn.execute(DELETE_KNOWLEDGE_SQL, (node_id,)).rowcount > 0
+
+    def knowledge_versions(self, node_ids: List[str]) -> Dict[str, str]:
+        """Current version stamp of each given node that has one (tombstones included)."""
         conn = self._get_conn()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO knowledge (id, data, updated_at)
-            VALUES (?, ?, ?)
-        ''', (node_id, json.dumps(data), datetime.now().isoformat()))
-        conn.commit()
-        conn.close()
+        versions = {}
+        for i in range(0, len(node_ids), 500):
+            chunk = node_ids[i:i + 500]
+            marks = ", ".join("?" * len(chunk))
+            versions.update(conn.execute(f'SELECT id, version FROM knowledge_versions WHERE id IN ({marks})', chunk))
+        return versions
+
+    def latest_knowledge_version(self) -> Optional[str]:
+        """The newest version stamp in the sync journal (stamps sort by time)."""
+        return self._get_conn().execute('SELECT MAX(version) FROM knowledge_versions').fetchone()[0]
+
+    def import_knowledge_versions(self, records: List[Tuple[str, str, bool, int]]) -> int:
+        """Copy (node_id, version, deleted, rev) journal entries in, keeping their revs
+        but placed after any already here. Returns the offset added to each rev."""
+        with self._transaction() as conn:
+            base = conn.execute('SELECT COALESCE(MAX(rev), 0) FROM knowledge_versions').fetchone()[0]
+            conn.executemany(IMPORT_VERSION_SQL, [
+                (node_id, version, int(deleted), base + rev) for node_id, version, deleted, rev in records
+            ])
+        return base
+
+    def knowledge_changes_since(self, rev: int, limit: int = 500) -> Tuple[List[Tuple[str, Optional[Dict[str, Any]], str, bool]], int]:
+        """(node_id, data or None, version, deleted) for nodes changed after `rev`, oldest first, and the new rev."""
+        rows = self._get_conn().execute(KNOWLEDGE_CHANGES_SQL, (int(rev), int(limit))).fetchall()
+        if not rows:
+            return [], int(rev)
+        changes = [(node_id, json.loads(data) if data is not None else None, version, bool(deleted))
+                   for node_id, data, version, deleted, _ in rows]
+        return changes, rows[-1][-1]
+
+    def stamp_unversioned_knowledge(self, version: str) -> int:
+        """Give nodes written without a version (e.g. migrated ones) a stamp, so they get synced."""
+        with self._transaction() as conn:
+            return conn.execute(STAMP_UNVERSIONED_SQL, (version,)).rowcount
+
+    def get_sync_state(self, key: str) -> Optional[str]:
+        row = self._get_conn().execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_sync_state(self, key: str, value: str):
+        with self._transaction() as conn:
+            conn.execute('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def get_plan(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        """(plan JSON, expires_at) for an unexpired cache entry."""
+        row = self._get_conn().execute(
+            'SELECT plan, expires_at FROM plan_cache WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def put_plan(self, key: str, plan: str, expires_at: float):
+        with self._transaction() as conn:
+            conn.execute('INSERT OR REPLACE INTO plan_cache (key, plan, expires_at) VALUES (?, ?, ?)',
+                         (key, plan, expires_at))
+
+    def purge_plans(self, now: float, keep: int) -> int:
+        """Drop expired entries, then the soonest-expiring ones beyond `keep`."""
+        with self._transaction() as conn:
+            removed = conn.execute('DELETE FROM plan_cache WHERE expires_at <= ?', (now,)).rowcount
+            removed += conn.execute('''
+                DELETE FROM plan_cache WHERE key IN (
+                    SELECT key FROM plan_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)
+            ''', (keep,)).rowcount
+        return removed
+
+    def clear_plans(self):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM plan_cache')
+
+    def count_knowledge(self) -> int:
+        return self._get_conn().execute('SELECT COUNT(*) FROM knowledge').fetchone()[0]
+
+    def iter_knowledge(self, batch: int = 1000):
+        """Yield (node_id, data) for every node, reading `batch` rows at a time."""
+        cursor = self._get_conn().execute('SELECT id, data FROM knowledge')
+        while True:
+            rows = cursor.fetchmany(batch)
+            if not rows:
+                return
+            for node_id, data in rows:
+                yield node_id, json.loads(data)
+
+    def save_edges(self, edges: List[Tuple[str, str, str]]) -> List[Tuple[str, str, str]]:
+        """Insert (src, type, dst) edges in one transaction. Returns the ones that were new."""
+        added = []
+        with self._transaction() as conn:
+            for edge in edges:
+                if conn.execute(SAVE_EDGE_SQL, edge).rowcount:
+                    added.append(edge)
+        return added
+
+    def delete_edges(self, edges: List[Tuple[str, str, str]]) -> List[Tuple[str, str, str]]:
+        """Delete (src, type, dst) edges. Returns the ones that existed."""
+        removed = []
+        with self._transaction() as conn:
+            for edge in edges:
+                if conn.execute(DELETE_EDGE_SQL, edge).rowcount:
+                    removed.append(edge)
+        return removed
+
+    def iter_edges(self, batch: int = 10000):
+        cursor = self._get_conn().execute('SELECT src, type, dst FROM knowledge_edges')
+        while True:
+            rows = cursor.fetchmany(batch)
+            if not rows:
+                return
+            yield from rows
+
+    def search_knowledge(self, query: str, limit: int = 10) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Ranked full-text search over knowledge. Returns (node_id, data, score), best first.
+
+        Terms are OR'ed; `field:term` matches only that (dotted) field. A node's
+        score is the sum of the bm25 scores of its matching fields.
+        """
+        groups: Dict[Optional[str], List[str]] = {}
+        for part in query.split():
+            field = None
+            if ":" in part:
+                field, _, part = part.partition(":")
+                field = field.lower() or None  # field names match case-insensitively, like InvertedIndex
+            groups.setdefault(field, []).extend(KNOWLEDGE_TERM_RE.findall(part.lower()))
+        groups = {field: terms for field, terms in groups.items() if terms}
+        if not groups:
+            return []
+        if not self.has_fts:
+            return self._search_knowledge_like(groups, limit)
+
+        # Each group is materialized on its own: bm25() only works directly on its MATCH scan
+        ctes, params = [], []
+        for i, (field, terms) in enumerate(groups.items()):
+            sql = (f'g{i} AS MATERIALIZED (SELECT rowid >> {KNOWLEDGE_FTS_SHIFT} AS node, '
+                   'bm25(knowledge_fts) AS rank FROM knowledge_fts WHERE knowledge_fts MATCH ?')
+            params.append(" OR ".join(f'"{term}"' for term in terms))
+            if field is not None:
+                sql += ' AND lower(field) = ?'
+                params.append(field)
+            ctes.append(sql + ')')
+        hits = " UNION ALL ".join(f"SELECT node, rank FROM g{i}" for i in range(len(ctes)))
+        rows = self._get_conn().execute(f'''
+            WITH {", ".join(ctes)}
+            SELECT k.id, k.data, -SUM(hits.rank) AS score
+            FROM ({hits}) AS hits
+            JOIN knowledge k ON k.rowid = hits.node
+            GROUP BY hits.node
+            ORDER BY score DESC
+            LIMIT ?
+        ''', params + [limit]).fetchall()
+        return [(node_id, json.loads(data), score) for node_id, data, score in rows]
+
+    def _search_knowledge_like(self, groups: Dict[Optional[str], List[str]], limit: int):
+        # Unranked fallback: nodes whose JSON contains any of the terms
+        terms = [term for group in groups.values() for term in group]
+        where = " OR ".join("lower(data) LIKE ?" for _ in terms)
+        rows = self._get_conn().execute(
+            f'SELECT id, data FROM knowledge WHERE {where} LIMIT ?',
+            [f"%{term}%" for term in terms] + [limit]
+        ).fetchall()
+        return [(node_id, json.loads(data), 0.0) for node_id, data in rows]
@@ -0,0 +1,399 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from .config import Config
+from .event_bus import EventBus
+from .types import Event, Task
+
+class DeadlineExceeded(Exception):
+    """Raised by HandlerRegistry.dispatch when a task outlives its own deadline.
+
+    Timeouts raised inside a handler (a request or subprocess timing out)
+    propagate unchanged, so they fail the task with the real error instead.
+    """
+
+class Integrations:
+    """Lazily constructed, shared integration clients.
+
+    Imports are deferred so the core package stays importable on machines
+    without the desktop automation dependencies.
+    """
+
+    def __init__(self):
+        self._system = None
+        self._web_search = None
+        self._web_automation = None
+
+    @property
+    def system(self):
+        if self._system is None:
+            from integrations.system import SystemIntegration
+            self._system = SystemIntegration()
+        return self._system
+
+    @property
+    def web_search(self):
+        if self._web_search is None:
+            from integrations.web_search import WebSearch
+            self._web_search = WebSearch()
+        return self._web_search
+
+    @property
+    def web_automation(self):
+        if self._web_automation is None:
+            from integrations.web_automation import WebAutomation
+            self._web_automation = WebAutomation()
+        return self._web_automation
+
+class TaskHandler:
+    """Executes one task type. Subclasses set task_type, max_concurrency and timeout."""
+    task_type: str = ""
+    max_concurrency: int = 4
+    timeout: Optional[float] = None  # seconds; None uses Config.TASK_TIMEOUT
+
+    def __init__(self, integrations: Integrations, event_bus: Optional[EventBus] = None):
+        self.integrations = integrations
+        self.event_bus = event_bus
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def lane(self, task: Task) -> str:
+        """Name of the concurrency cap the task counts against; usually this handler's own."""
+        return self.task_type
+
+    async def handle(self, task: Task) -> Any:
+        raise NotImplementedError
+
+    def deadline_for(self, task: Task) -> Optional[float]:
+        # Per-task override wins over the per-type default; 0 disables the deadline
+        timeout = task.metadata.get("timeout", self.timeout)
+        if timeout is None:
+            timeout = Config.TASK_TIMEOUT
+        return float(timeout) or None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "avg_ms": self.total_ms / self.calls if self.calls else 0.0,
+            "max_ms": self.max_ms,
+        }
+
+class Lane:
+    """Concurrency cap shared by the tasks of one lane, plus the tasks parked waiting for it."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_use = 0
+        self._parked: List[Tuple[int, int, Task]] = []  # (-priority, seq, task)
+        self._seq = itertools.count()
+
+    def park(self, task: Task):
+        heapq.heappush(self._parked, (-task.priority, next(self._seq), task))
+
+    def unpark(self, task_id: str) -> Optional[Task]:
+        for i, (_, _, task) in enumerate(self._parked):
+            if task.id == task_id:
+                self._parked.pop(i)
+                heapq.heapify(self._parked)
+                return task
+        return None
+
+    def next_parked(self) -> Optional[Task]:
+        return heapq.heappop(self._parked)[2] if self._parked else None
+
+    def parked_count(self) -> int:
+        return len(self._parked)
+
+class HandlerRegistry:
+    """Table of task handlers keyed by metadata["type"].
+
+    Each handler's max_concurrency is enforced by a lane slot that a task
+    claims before it starts (claim/release), not inside a worker: a task whose
+    lane is full is parked and the worker moves on, so a long GUI plan can't
+    hold every worker while web, shell and reminder tasks wait behind it.
+    Only called on the orchestrator loop.
+    """
+
+    def __init__(self, default: TaskHandler):
+        self.default = default
+        self._handlers: Dict[str, TaskHandler] = {}
+        self._lanes: Dict[str, Lane] = {default.task_type: Lane(default.max_concurrency)}
+        self._holders: Dict[str, str] = {}  # task id -> lane whose slot it holds
+
+    def register(self, handler: TaskHandler):
+        self._handlers[handler.task_type] = handler
+        self._lanes[handler.task_type] = Lane(handler.max_concurrency)
+
+    def get(self, task_type: Optional[str]) -> TaskHandler:
+        return self._handlers.get(task_type, self.default)
+
+    def _lane_name(self, task: Task) -> str:
+        name = self.get(task.metadata.get("type")).lane(task)
+        return name if name in self._lanes else self.default.task_type
+
+    def claim(self, task: Task) -> bool:
+        """Take a slot in the task's lane. If the lane is full, park the task and return False."""
+        if task.id in self._holders:
+            return True  # handed over by release()
+        name = self._lane_name(task)
+        lane = self._lanes[name]
+        if lane.in_use < lane.limit:
+            lane.in_use += 1
+            self._holders[task.id] = name
+            return True
+        lane.park(task)
+        return False
+
+    def release(self, task: Task) -> Optional[Task]:
+        """Free the task's slot. Returns the parked task the slot was handed to, which must be requeued."""
+        name = self._holders.pop(task.id, None)
+        if name is None:
+            return None
+        lane = self._lanes[name]
+        successor = lane.next_parked()
+        if successor is None:
+            lane.in_use -= 1
+        else:
+            self._holders[successor.id] = name
+        return successor
+
+    def unpark(self, task_id: str) -> Optional[Task]:
+        """Remove a parked task, e.g. when it is cancelled while waiting for its lane."""
+        for lane in self._lanes.values():
+            task = lane.unpark(task_id)
+            if task:
+                return task
+        return None
+
+    async def dispatch(self, task: Task) -> Any:
+        """Run a task through its handler. Raises DeadlineExceeded past the deadline."""
+        handler = self.get(task.metadata.get("type"))
+        handler.in_flight += 1
+        start = time.perf_counter()
+        try:
+            return await self._run_until_deadline(handler, task)
+        except DeadlineExceeded:
+            handler.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            raise  # stopped by the user or shutdown, not a handler failure
+        except Exception:
+            handler.errors += 1
+            raise
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            handler.in_flight -= 1
+            handler.calls += 1
+            handler.total_ms += elapsed
+            handler.max_ms = max(handler.max_ms, elapsed)
+
+    @staticmethod
+    async def _run_until_deadline(handler: TaskHandler, task: Task) -> Any:
+        # Like wait_for, but our deadline is told apart from timeouts inside the handler
+        deadline = handler.deadline_for(task)
+        job = asyncio.ensure_future(handler.handle(task))
+        try:
+            done, _ = await asyncio.wait({job}, timeout=deadline)
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+        if not done:
+            job.cancel()
+            await asyncio.wait({job})  # let it clean up (e.g. kill its process)
+            raise DeadlineExceeded(f"Exceeded its {deadline:g}s deadline")
+        return job.result()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        stats = {name: h.stats() for name, h in self._handlers.items()}
+        stats[self.default.task_type] = self.default.stats()
+        for name, lane in self._lanes.items():
+            stats[name]["lane_in_use"] = lane.in_use
+            stats[name]["parked"] = lane.parked_count()
+        return stats
+
+class GuiAutomationHandler(TaskHandler):
+    task_type = "gui_automation"
+    max_concurrency = 1  # keyboard/mouse are a single shared resource
+    timeout = 600  # winget installs can be slow
+
+    def __init__(self, integrations: Integrations, event_bus: Optional[EventBus] = None):
+        super().__init__(integrations, event_bus)
+        self.actions = {
+            "open": self._open,
+            "type": self._type,
+            "press": self._press,
+            "close": self._close,
+            "install": self._install,
+            "uninstall": self._uninstall,
+        }
+
+    async def handle(self, task: Task) -> Any:
+        action = self.actions.get(task.metadata.get("action"))
+        if action is None:
+            return "Unknown GUI action"
+        return await action(task)
+
+    async def _open(self, task: Task) -> Any:
+        sys_int = self.integrations.system
+        app_name = task.metadata.get("app")
+        result = await sys_int.open_application(app_name)
+
+        # Fallback: If app not found, open website
+        if "FAILED_TO_OPEN" in result:
+            print(f"[ORCHESTRATOR] App '{app_name}' not found. Falling back to web search.")
+
+            # Notify user
+            await sys_int.show_notification("Nexus", f"Could not find {app_name}, opening website instead.")
+
+            # Search for "appname official site"
+            query = f"{app_name} official website"
+            results = await self.integrations.web_search.search(query)
+
+            if results:
+                # Open the first result
+                url = results[0]['url']
+                # Explicit PowerShell: pooled sessions are PowerShell, one-off commands cmd.exe,
+                # and the two parse "start <url>" (and & in a query string) differently
+                quoted = url.replace("'", "''")
+                await sys_int.run_powershell(f"Start-Process '{quoted}'")
+                result = f"App not found. Opened website: {url}"
+            else:
+                result = f"App not found and could not find website for {app_name}"
+        return result
+
+    async def _type(self, task: Task) -> Any:
+        text_to_type = task.metadata.get("text")
+        print(f"[ORCHESTRATOR] Typing text: '{text_to_type}'")
+        return await self.integrations.system.type_text(text_to_type)
+
+    async def _press(self, task: Task) -> Any:
+        return await self.integrations.system.press_key(task.metadata.get("key"))
+
+    async def _close(self, task: Task) -> Any:
+        return await self.integrations.system.close_application(task.metadata.get("app"))
+
+    async def _install(self, task: Task) -> Any:
+        return await self.integrations.system.install_app(task.metadata.get("app"))
+
+    async def _uninstall(self, task: Task) -> Any:
+        return await self.integrations.system.uninstall_app(task.metadata.get("app"))
+
+class WebSearchHandler(TaskHandler):
+    task_type = "web_search"
+    max_concurrency = 8
+    timeout = 30
+
+    @staticmethod
+    def _plays(task: Task) -> bool:
+        query = task.metadata.get("query", "").lower()
+        return "song" in query or "music" in query or "play" in task.description.lower()
+
+    def lane(self, task: Task) -> str:
+        # Playback drives the browser with pyautogui, so it shares the single GUI slot
+        return GuiAutomationHandler.task_type if self._plays(task) else self.task_type
+
+    async def handle(self, task: Task) -> Any:
+        query = task.metadata.get("query", "")
+
+        # If it's a YouTube/music search, use web automation
+        if self._plays(task):
+            return await self.integrations.web_automation.search_and_play(query)
+
+        results = await self.integrations.web_search.search(query)
+        return f"Search results for '{query}': {len(results)} found"
+
+class ReminderHandler(TaskHandler):
+    task_type = "reminder"
+    max_concurrency = 4
+    timeout = 15
+
+    async def handle(self, task: Task) -> Any:
+        message = task.metadata.get("message", task.description)
+        await self.integrations.system.show_notification("Nexus Reminder", message)
+        return f"Reminder sent: {message}"
+
+class ShellHandler(TaskHandler):
+    task_type = "shell"
+    max_concurrency = 4
+    timeout = 120
+
+    async def handle(self, task: Task) -> Any:
+        cmd = task.metadata.get("command")
+        if not task.metadata.get("stream", True):
+            stdout, stderr = await self.integrations.system.run_command(cmd)
+            result = f"Command executed. Output: {stdout}"
+            if stderr:
+                result += f" Error: {stderr}"
+            return result
+
+        # Stream output as task_output events; keep only a tail in memory and
+        # spill anything larger to TASK_OUTPUT_DIR
+        from integrations.output_capture import OutputCapture
+        stdout = OutputCapture(os.path.join(Config.TASK_OUTPUT_DIR, f"{task.id}.out"))
+        stderr = OutputCapture(os.path.join(Config.TASK_OUTPUT_DIR, f"{task.id}.err"))
+
+        def forward(capture, stream_name: str):
+            async def on_data(data: bytes):
+                lines = capture.write(data)
+                if lines:
+                    await self._publish_output(task, stream_name, lines)
+            return on_data
+
+        try:
+            await self.integrations.system.stream_command(cmd, forward(stdout, "stdout"), forward(stderr, "stderr"))
+            for capture, stream_name in ((stdout, "stdout"), (stderr, "stderr")):
+                last = capture.flush_partial()
+                if last is not None:
+                    await self._publish_output(task, stream_name, [last])
+        finally:
+            stdout.close()
+            stderr.close()
+
+        result = f"Command executed. Output: {stdout.tail()}"
+        if stderr.total_bytes:
+            result += f" Error: {stderr.tail()}"
+        spilled = [c.spill_path for c in (stdout, stderr) if c.spilled]
+        if spilled:
+            result += f" (full output: {', '.join(spilled)})"
+        return result
+
+    async def _publish_output(self, task: Task, stream_name: str, lines: List[str]):
+        if self.event_bus:
+            await self.event_bus.publish(Event("task_output", {"task_id": task.id, "stream": stream_name, "lines": lines}))
+
+class ResponseHandler(TaskHandler):
+    task_type = "response"
+    max_concurrency = 32
+    timeout = 5
+
+    async def handle(self, task: Task) -> Any:
+        # Just return the text so it can be spoken
+        return task.metadata.get("text", task.description)
+
+class GeneralHandler(TaskHandler):
+    task_type = "general"
+    max_concurrency = 16
+
+    async def handle(self, task: Task) -> Any:
+        # Simulate work for task types without a dedicated handler
+        duration = task.metadata.get("duration", 2)
+        await asyncio.sleep(duration)
+        return f"Executed: {task.description}"
+
+def build_default_registry(event_bus: Optional[EventBus] = None) -> HandlerRegistry:
+    integrations = Integrations()
+    registry = HandlerRegistry(default=GeneralHandler(integrations, event_bus))
+    for handler_cls in (GuiAutomationHandler, WebSearchHandler, ReminderHandler, ShellHandler, ResponseHandler):
+        registry.register(handler_cls(integrations, event_bus))
+    return registry
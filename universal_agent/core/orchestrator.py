@@ -1,152 +1,240 @@
 import asyncio
-from typing import Dict, List, Optional
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+from .config import Config
 from .types import Task, TaskStatus, Event
 from .event_bus import EventBus
 
 from .database import Database
+from .async_database import AsyncDatabase
+from .worker_pool import WorkerPool
+from .scheduler import TaskScheduler
+from .task_graph import TaskGraph
+from .handlers import DeadlineExceeded, build_default_registry
+
+class OrchestratorBusyError(Exception):
+    """Raised by submit_task when the in-flight queue is over its limit."""
 
 class TaskOrchestrator:
-    def __init__(self, event_bus: EventBus):
+    def __init__(self, event_bus: EventBus, workers: int = None):
         self.event_bus = event_bus
-        self.db = Database()
+        # Status transitions are coalesced and flushed in batches (see Database),
+        # and awaited through AsyncDatabase so disk I/O never runs on an event loop
+        self.db = AsyncDatabase(Database(write_behind=Config.DB_WRITE_BEHIND))
+        # All tasks share one long-lived event loop instead of a thread + loop each
+        self.pool = WorkerPool(self._execute_task, workers=workers)
+        # Handlers are built once and dispatched by task type
+        self.handlers = build_default_registry(event_bus)
+        self.pool.start()
+        self.scheduler = TaskScheduler(self.pool, self._fire_scheduled)
+        self.graph = TaskGraph(self._lookup_status)
+
+        # Queued/running bookkeeping for cancellation and backpressure
+        self._lock = threading.Lock()
+        self._queued: Dict[str, Task] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancel_requested: Set[str] = set()
+        self._restore_scheduled()
 
     async def submit_task(self, task: Task):
-        if task.scheduled_time:
-            from datetime import datetime
+        await self._apply_backpressure(task)
+        ready, failed_dep = self.graph.add(task)
+        await self.db.save_task(task)
+
+        if failed_dep:
+            await self._end_task(task, TaskStatus.FAILED, f"Dependency {failed_dep} did not complete")
+            return
+        if not ready:
+            print(f"[ORCHESTRATOR] Waiting on {len(task.depends_on)} dependency(ies): {task.description}")
+            await self.event_bus.publish(Event("task_submitted", {"task_id": task.id}))
+            return
+        if self._is_future(task):
             delay = (task.scheduled_time - datetime.now()).total_seconds()
-            if delay > 0:
-                print(f"[ORCHESTRATOR] Scheduling task for {task.scheduled_time} (in {delay:.1f}s): {task.description}")
-                self.db.save_task(task)
-                
-                # Run in background thread that waits
-                import threading
-                def wait_and_run():
-                    import time
-                    time.sleep(delay)
-                    
-                    # Create new loop for execution
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    loop.run_until_complete(self._execute_task(task))
-                    loop.close()
-                
-                threading.Thread(target=wait_and_run, daemon=True).start()
-                return
-
-        print(f"[ORCHESTRATOR] Executing task immediately: {task.description}")
-        self.db.save_task(task)
+            print(f"[ORCHESTRATOR] Scheduling task for {task.scheduled_time} (in {delay:.1f}s): {task.description}")
+            self.scheduler.schedule(task)
+            return
+
+        print(f"[ORCHESTRATOR] Queueing task (priority {task.priority}): {task.description}")
         await self.event_bus.publish(Event("task_submitted", {"task_id": task.id}))
-        
-        # Execute in a new thread with its own event loop
-        import threading
-        def run_task():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(self._execute_task(task))
-            loop.close()
-        
-        threading.Thread(target=run_task, daemon=True).start()
+        self._enqueue(task)
+
+    def inflight_count(self) -> int:
+        with self._lock:
+            return len(self._queued) + len(self._running)
+
+    async def _apply_backpressure(self, task: Task):
+        if self.inflight_count() < Config.MAX_INFLIGHT_TASKS:
+            return
+        if Config.BACKPRESSURE_POLICY == "defer":
+            # Poll rather than wait on a pool-loop primitive: callers live on other loops
+            deadline = time.monotonic() + Config.BACKPRESSURE_DEFER_TIMEOUT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                if self.inflight_count() < Config.MAX_INFLIGHT_TASKS:
+                    return
+        print(f"[ORCHESTRATOR] Rejecting task, {self.inflight_count()} tasks in flight: {task.description}")
+        raise OrchestratorBusyError(f"Too many tasks in flight (limit {Config.MAX_INFLIGHT_TASKS})")
+
+    def _enqueue(self, task: Task):
+        with self._lock:
+            self._queued[task.id] = task
+        self.pool.submit(task)
+
+    def _fire_scheduled(self, task: Task):
+        # A timer came due: announce it like any other task entering the queue
+        print(f"[ORCHESTRATOR] Scheduled task due: {task.description}")
+        self.pool.run_coroutine(self.event_bus.publish(Event("task_submitted", {"task_id": task.id})))
+        self._enqueue(task)
+
+    def _is_future(self, task: Task) -> bool:
+        return bool(task.scheduled_time) and task.scheduled_time > datetime.now()
+
+    def _dispatch(self, task: Task):
+        if self._is_future(task):
+            self.scheduler.schedule(task)
+        else:
+            self._enqueue(task)
+
+    def _lookup_status(self, task_id: str) -> Optional[TaskStatus]:
+        # Called synchronously by the graph, only for ids it has never seen
+        task = self.db.db.get_task(task_id)
+        return task.status if task else None
+
+    async def _finish(self, task: Task):
+        # Release dependents the moment this task reaches a terminal state
+        ready, failed = self.graph.finish(task)
+        for child in ready:
+            self._dispatch(child)
+        for child in failed:
+            await self._end_task(child, TaskStatus.FAILED, f"Dependency {task.id} did not complete")
+
+    async def _end_task(self, task: Task, status: TaskStatus, error: str):
+        task.error = error
+        task.status = status
+        await self.db.save_task(task)
+        event_name = {
+            TaskStatus.CANCELLED: "task_cancelled",
+            TaskStatus.TIMED_OUT: "task_timed_out",
+        }.get(status, "task_failed")
+        await self.event_bus.publish(Event(event_name, {"task_id": task.id, "error": error}))
+        await self._finish(task)
+
+    def _restore_scheduled(self):
+        # Scheduled tasks are persisted as PENDING; pick them back up after a restart
+        tasks = self.db.db.get_scheduled_tasks()
+        if tasks:
+            print(f"[ORCHESTRATOR] Restoring {len(tasks)} scheduled task(s)")
+            for task in tasks:
+                self.graph.track(task)
+            self.scheduler.schedule_many(tasks)
+
+    def cancel_task(self, task_id: str) -> bool:
+        """Cancel a scheduled, blocked, queued or running task. Safe to call from any thread."""
+        task = self.scheduler.cancel(task_id) or self.graph.remove_waiting(task_id)
+        if task:
+            self.pool.run_coroutine(self._end_task(task, TaskStatus.CANCELLED, "Cancelled"))
+            return True
+
+        with self._lock:
+            if task_id in self._queued:
+                # Dropped by the worker when it is dequeued, or right away if parked
+                self._cancel_requested.add(task_id)
+                self.pool.loop.call_soon_threadsafe(self._drop_parked, task_id)
+                return True
+            job = self._running.get(task_id)
+            if job is None:
+                return False
+            self._cancel_requested.add(task_id)
+        self.pool.loop.call_soon_threadsafe(job.cancel)
+        return True
+
+    def cancel_all(self) -> int:
+        """Cancel every task this orchestrator is tracking. Returns how many were cancelled."""
+        with self._lock:
+            task_ids = list(self._queued) + list(self._running)
+        task_ids += self.graph.waiting_ids()
+        return sum(1 for task_id in task_ids if self.cancel_task(task_id))
+
+    def reschedule_task(self, task_id: str, when: datetime) -> bool:
+        task = self.scheduler.reschedule(task_id, when)
+        if not task:
+            return False
+        self.pool.run_coroutine(self.db.save_task(task))
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, wait times, timers, blocked tasks and per-handler latency."""
+        stats = self.pool.stats()
+        stats["inflight"] = self.inflight_count()
+        stats["scheduled"] = self.scheduler.pending_count()
+        stats["waiting_on_dependencies"] = self.graph.waiting_count()
+        stats["handlers"] = self.handlers.stats()
+        stats["database"] = self.db.stats()
+        return stats
 
     async def _execute_task(self, task: Task):
+        with self._lock:
+            cancelled = task.id in self._cancel_requested
+            if cancelled:
+                self._queued.pop(task.id, None)
+                self._cancel_requested.discard(task.id)
+        if cancelled:
+            self._release_slot(task)  # it may have been handed one while parked
+            await self._end_task(task, TaskStatus.CANCELLED, "Cancelled before it started")
+            return
+        if not self.handlers.claim(task):
+            # Its type is at its concurrency cap: parked (still queued) until a slot
+            # frees, and this worker moves on to tasks of other types
+            return
+
+        with self._lock:
+            self._queued.pop(task.id, None)
+            job = asyncio.ensure_future(self.handlers.dispatch(task))
+            self._running[task.id] = job
+        # Free the slot the moment the handler is done, not after the result is saved
+        job.add_done_callback(lambda _: self._release_slot(task))
+
         task.status = TaskStatus.RUNNING
-        self.db.save_task(task)
+        await self.db.save_task(task)
         await self.event_bus.publish(Event("task_started", {"task_id": task.id}))
         
         try:
-            # Check for GUI Automation
-            if task.metadata.get("type") == "gui_automation":
-                from integrations.system import SystemIntegration
-                sys_int = SystemIntegration()
-                
-                action = task.metadata.get("action")
-                if action == "open":
-                    app_name = task.metadata.get("app")
-                    result = await sys_int.open_application(app_name)
-                    
-                    # Fallback: If app not found, open website
-                    if "FAILED_TO_OPEN" in result:
-                        print(f"[ORCHESTRATOR] App '{app_name}' not found. Falling back to web search.")
-                        
-                        # Notify user
-                        await sys_int.show_notification("Nexus", f"Could not find {app_name}, opening website instead.")
-                        
-                        # Create web search task
-                        from integrations.web_search import WebSearch
-                        search = WebSearch()
-                        # Search for "appname official site"
-                        query = f"{app_name} official website"
-                        results = await search.search(query)
-                        
-                        if results:
-                            # Open the first result
-                            url = results[0]['url']
-                            await sys_int.run_command(f"start {url}")
-                            result = f"App not found. Opened website: {url}"
-                        else:
-                            result = f"App not found and could not find website for {app_name}"
-
-                elif action == "type":
-                    text_to_type = task.metadata.get("text")
-                    print(f"[ORCHESTRATOR] Typing text: '{text_to_type}'")
-                    result = await sys_int.type_text(text_to_type)
-                elif action == "press":
-                    result = await sys_int.press_key(task.metadata.get("key"))
-                elif action == "close":
-                    result = await sys_int.close_application(task.metadata.get("app"))
-                elif action == "install":
-                    result = await sys_int.install_app(task.metadata.get("app"))
-                elif action == "uninstall":
-                    result = await sys_int.uninstall_app(task.metadata.get("app"))
-                else:
-                    result = "Unknown GUI action"
-            
-            elif task.metadata.get("type") == "web_search":
-                from integrations.web_search import WebSearch
-                from integrations.web_automation import WebAutomation
-                
-                query = task.metadata.get("query", "")
-                
-                # If it's a YouTube/music search, use web automation
-                if "song" in query.lower() or "music" in query.lower() or "play" in task.description.lower():
-                    web_auto = WebAutomation()
-                    result = await web_auto.search_and_play(query)
-                else:
-                    search = WebSearch()
-                    results = await search.search(query)
-                    result = f"Search results for '{query}': {len(results)} found"
-
-            elif task.metadata.get("type") == "reminder":
-                from integrations.system import SystemIntegration
-                sys_int = SystemIntegration()
-                message = task.metadata.get("message", task.description)
-                await sys_int.show_notification("Nexus Reminder", message)
-                result = f"Reminder sent: {message}"
-
-            elif task.metadata.get("type") == "shell":
-                from integrations.system import SystemIntegration
-                sys_int = SystemIntegration()
-                cmd = task.metadata.get("command")
-                stdout, stderr = await sys_int.run_command(cmd)
-                result = f"Command executed. Output: {stdout}"
-                if stderr:
-                    result += f" Error: {stderr}"
-
-            elif task.metadata.get("type") == "response":
-                # Just return the text so it can be spoken
-                result = task.metadata.get("text", task.description)
-            
-            else:
-                # Simulate work or delegate to specific handlers
-                duration = task.metadata.get("duration", 2)
-                await asyncio.sleep(duration)
-                result = f"Executed: {task.description}"
+            result = await job
             
             task.result = result
             task.status = TaskStatus.COMPLETED
-            self.db.save_task(task)
+            await self.db.save_task(task)
             await self.event_bus.publish(Event("task_completed", {"task_id": task.id, "result": task.result}))
+            await self._finish(task)
+        except DeadlineExceeded as e:
+            await self._end_task(task, TaskStatus.TIMED_OUT, str(e))
+        except asyncio.CancelledError:
+            with self._lock:
+                requested = task.id in self._cancel_requested
+                self._cancel_requested.discard(task.id)
+            if not requested:
+                raise  # the pool itself is shutting down
+            await self._end_task(task, TaskStatus.CANCELLED, "Cancelled")
         except Exception as e:
-            task.error = str(e)
-            task.status = TaskStatus.FAILED
-            self.db.save_task(task)
-            await self.event_bus.publish(Event("task_failed", {"task_id": task.id, "error": str(e)}))
+            # str() is empty for some (e.g. a bare TimeoutError from inside the handler)
+            await self._end_task(task, TaskStatus.FAILED, str(e) or type(e).__name__)
+        finally:
+            with self._lock:
+                self._running.pop(task.id, None)
+
+    def _release_slot(self, task: Task):
+        successor = self.handlers.release(task)
+        if successor is not None:
+            self.pool.submit(successor)  # already holds the slot; runs on the next free worker
+
+    def _drop_parked(self, task_id: str):
+        # On the pool loop: a task cancelled while parked ends now rather than when its lane frees
+        task = self.handlers.unpark(task_id)
+        if task is None:
+            return  # already back in the pool queue; the worker drops it
+        with self._lock:
+            self._queued.pop(task_id, None)
+            self._cancel_requested.discard(task_id)
+        self.pool.loop.create_task(self._end_task(task, TaskStatus.CANCELLED, "Cancelled before it started"))
@@ -0,0 +1,209 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from .config import Config
+from .database import Database, TASK_COLUMNS, TASK_FIELDS
+from .types import Task, TaskStatus, STATUS_CODES, STATUS_BY_CODE
+
+ARCHIVE_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED, TaskStatus.TIMED_OUT)
+_STATUS_LIST = ", ".join(str(STATUS_CODES[s]) for s in ARCHIVE_STATUSES)
+
+# Finished tasks that are too old or beyond the newest `max_rows`. The row
+# holding the highest rev is always kept so the change feed's rev never goes
+# backwards after a purge.
+CANDIDATES_SQL = f'''
+    SELECT {TASK_COLUMNS}, rev FROM tasks
+    WHERE status IN ({_STATUS_LIST})
+      AND (created_at < ? OR created_at < (
+            SELECT created_at FROM tasks ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?))
+      AND rev < (SELECT MAX(rev) FROM tasks)
+    ORDER BY created_at
+    LIMIT ?
+'''
+ARCHIVE_INSERT_SQL = '''
+    INSERT OR REPLACE INTO archive.archived_tasks (id, status, created_at, archived_at, data)
+    VALUES (?, ?, ?, ?, ?)
+'''
+ARCHIVE_PAGE_SQL = 'SELECT data FROM archived_tasks {where} ORDER BY created_at DESC, id DESC LIMIT ?'
+ARCHIVE_GET_SQL = 'SELECT data FROM archived_tasks WHERE id = ?'
+
+class RetentionManager:
+    """Keeps the hot `tasks` table small.
+
+    Finished tasks older than `keep_days`, or beyond the newest `keep_rows`,
+    are moved (zlib-compressed JSON per row) into a separate archive database
+    in the same transaction that deletes them, and freed pages are handed back
+    with incremental VACUUM. Spilled command output of archived tasks is
+    deleted. Archived history stays queryable through
+    query_archive() / get_archived_task().
+    """
+
+    def __init__(self, db_path: str = None, archive_path: str = None,
+                 keep_days: float = None, keep_rows: int = None):
+        self.db = Database(db_path)
+        self.archive_path = archive_path or Config.ARCHIVE_DB_PATH
+        self.keep_days = keep_days if keep_days is not None else Config.RETENTION_DAYS
+        self.keep_rows = keep_rows if keep_rows is not None else Config.RETENTION_MAX_ROWS
+        self._local = threading.local()
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.archived = 0
+        self.runs = 0
+        self.last_run: Optional[str] = None
+
+        with self._archive_conn() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS archived_tasks (
+                    id TEXT PRIMARY KEY,
+                    status TEXT,
+                    created_at TEXT,
+                    archived_at TEXT,
+                    data BLOB
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_archived_created ON archived_tasks (created_at, id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_archived_status ON archived_tasks (status, created_at, id)')
+
+    def _archive_conn(self) -> sqlite3.Connection:
+        # Read side: a plain per-thread connection to the archive file
+        conn = getattr(self._local, "archive", None)
+        if conn is None:
+            conn = sqlite3.connect(self.archive_path, timeout=Config.DB_BUSY_TIMEOUT)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.archive = conn
+        return conn
+
+    def _attached_conn(self) -> sqlite3.Connection:
+        # Write side: the task DB connection with the archive ATTACHed, so a
+        # move is one atomic transaction across both files
+        conn = self.db._get_conn()
+        names = [row[1] for row in conn.execute('PRAGMA database_list')]
+        if "archive" not in names:
+            conn.execute('ATTACH DATABASE ? AS archive', (self.archive_path,))
+        return conn
+
+    def run_once(self) -> int:
+        """Archive everything the policy allows. Returns how many tasks were moved."""
+        with self._run_lock:
+            conn = self._attached_conn()
+            cutoff = (datetime.now() - timedelta(days=self.keep_days)).isoformat() if self.keep_days > 0 else ""
+            # OFFSET past the newest rows; a huge offset disables the row limit
+            offset = self.keep_rows - 1 if self.keep_rows > 0 else 2 ** 62
+            moved = 0
+            while True:
+                with conn:
+                    rows = conn.execute(CANDIDATES_SQL, (cutoff, offset, Config.RETENTION_BATCH)).fetchall()
+                    if not rows:
+                        break
+                    archived_at = datetime.now().isoformat()
+                    conn.executemany(ARCHIVE_INSERT_SQL, [
+                        (row[0], STATUS_BY_CODE[row[3]].value, row[4], archived_at, self._pack(row)) for row in rows
+                    ])
+                    conn.executemany('DELETE FROM tasks WHERE id = ?', [(row[0],) for row in rows])
+                # After the commit, so a rolled-back move keeps its files
+                self._remove_output([row[0] for row in rows])
+                moved += len(rows)
+                if len(rows) < Config.RETENTION_BATCH:
+                    break
+
+            if moved:
+                self._reclaim(conn)
+            self.archived += moved
+            self.runs += 1
+            self.last_run = datetime.now().isoformat()
+            if moved:
+                print(f"[RETENTION] Archived {moved} task(s)")
+            return moved
+
+    def _reclaim(self, conn: sqlite3.Connection):
+        if conn.execute('PRAGMA main.auto_vacuum').fetchone()[0] != 2:
+            # Not converted yet (Database does that at startup); never VACUUM from here
+            return
+        conn.execute(f'PRAGMA main.incremental_vacuum({Config.RETENTION_VACUUM_PAGES})').fetchall()
+
+    @staticmethod
+    def _remove_output(task_ids: List[str]):
+        # Full output that ShellHandler spilled to disk goes with the hot row
+        for task_id in task_ids:
+            for ext in (".out", ".err"):
+                try:
+                    os.remove(os.path.join(Config.TASK_OUTPUT_DIR, f"{task_id}{ext}"))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"[RETENTION] Could not remove output of {task_id}: {e}")
+
+    @staticmethod
+    def _pack(row: tuple) -> bytes:
+        record = dict(zip(TASK_FIELDS + ["rev"], row))
+        return zlib.compress(json.dumps(record).encode("utf-8"))
+
+    @staticmethod
+    def _unpack(blob: bytes) -> Dict[str, Any]:
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+    def _to_task(self, blob: bytes) -> Task:
+        record = self._unpack(blob)
+        if isinstance(record["status"], str):
+            # Archived before status was stored as an integer code
+            record["status"] = STATUS_CODES[TaskStatus(record["status"])]
+        return self.db._row_to_task(tuple(record[field] for field in TASK_FIELDS))
+
+    def query_archive(self, limit: int = 50, before_cursor: Optional[str] = None,
+                      status: Optional[str] = None) -> Tuple[List[Task], Optional[str]]:
+        """Page through archived tasks, newest first (same cursor format as Database.get_tasks)."""
+        limit = Database.page_size(limit)
+        status_value = status.value if isinstance(status, TaskStatus) else status
+        clauses, params = [], []
+        if status_value:
+            clauses.append('status = ?')
+            params.append(status_value)
+        if before_cursor:
+            created_at, _, task_id = before_cursor.partition("|")
+            clauses.append('(created_at, id) < (?, ?)')
+            params += [created_at, task_id]
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._archive_conn().execute(ARCHIVE_PAGE_SQL.format(where=where), params + [limit]).fetchall()
+        tasks = [self._to_task(row[0]) for row in rows]
+        next_cursor = None
+        if len(tasks) == limit:
+            next_cursor = f"{tasks[-1].created_at.isoformat()}|{tasks[-1].id}"
+        return tasks, next_cursor
+
+    def get_archived_task(self, task_id: str) -> Optional[Task]:
+        row = self._archive_conn().execute(ARCHIVE_GET_SQL, (task_id,)).fetchone()
+        return self._to_task(row[0]) if row else None
+
+    def start(self, interval: float = None):
+        """Run the policy in a background thread every `interval` seconds."""
+        if self._thread:
+            return
+        interval = interval or Config.RETENTION_INTERVAL
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.run_once()
+                except sqlite3.Error as e:
+                    print(f"[RETENTION] Run failed, will retry: {e}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name="nexus-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "archived": self.archived,
+            "runs": self.runs,
+            "last_run": self.last_run,
+            "archive_rows": self._archive_conn().execute('SELECT COUNT(*) FROM archived_tasks').fetchone()[0],
+        }
@@ -0,0 +1,115 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from .types import Task
+from .worker_pool import WorkerPool
+
+class TaskScheduler:
+    """Single timer heap that fires scheduled tasks on the worker pool loop.
+
+    One coroutine sleeps until the earliest deadline, so any number of pending
+    reminders costs one heap entry each rather than one parked thread each.
+    Cancelled and rescheduled entries are dropped lazily when they reach the top.
+    """
+
+    def __init__(self, pool: WorkerPool, fire: Callable[[Task], None]):
+        self.pool = pool
+        self.fire = fire
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[float, int, str]] = []
+        self._entries: Dict[str, Tuple[float, int, Task]] = {}
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self.pool.run_coroutine(self._run())
+
+    def schedule(self, task: Task):
+        """Add or replace the timer for a task. Safe to call from any thread."""
+        when = task.scheduled_time.timestamp() if task.scheduled_time else time.time()
+        with self._lock:
+            self._push(when, task)
+        self._wake()
+
+    def schedule_many(self, tasks: Iterable[Task]):
+        with self._lock:
+            for task in tasks:
+                when = task.scheduled_time.timestamp() if task.scheduled_time else time.time()
+                self._push(when, task)
+        self._wake()
+
+    def cancel(self, task_id: str) -> Optional[Task]:
+        """Drop a pending timer. Returns the task if it had not fired yet."""
+        with self._lock:
+            entry = self._entries.pop(task_id, None)
+            self._maybe_compact()
+        return entry[2] if entry else None
+
+    def reschedule(self, task_id: str, when: datetime) -> Optional[Task]:
+        with self._lock:
+            entry = self._entries.get(task_id)
+            if not entry:
+                return None
+            task = entry[2]
+            task.scheduled_time = when
+            self._push(when.timestamp(), task)
+        self._wake()
+        return task
+
+    def is_scheduled(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._entries
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _push(self, when: float, task: Task):
+        seq = next(self._seq)
+        self._entries[task.id] = (when, seq, task)
+        heapq.heappush(self._heap, (when, seq, task.id))
+
+    def _maybe_compact(self):
+        # Rebuild once stale entries dominate so memory tracks live timers
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+            self._heap = [(when, seq, task_id) for task_id, (when, seq, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self.pool.loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _pop_due(self, now: float) -> Tuple[List[Task], Optional[float]]:
+        due = []
+        with self._lock:
+            while self._heap:
+                when, seq, task_id = self._heap[0]
+                entry = self._entries.get(task_id)
+                if entry is None or entry[1] != seq:
+                    heapq.heappop(self._heap)  # cancelled or rescheduled
+                    continue
+                if when > now:
+                    return due, when
+                heapq.heappop(self._heap)
+                del self._entries[task_id]
+                due.append(entry[2])
+        return due, None
+
+    async def _run(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            due, next_at = self._pop_due(time.time())
+            for task in due:
+                try:
+                    self.fire(task)
+                except Exception as e:
+                    print(f"[SCHEDULER] Failed to fire task {task.id}: {e}")
+
+            self._wakeup.clear()
+            timeout = None if next_at is None else max(0.0, next_at - time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
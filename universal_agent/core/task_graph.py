@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from .types import Task, TaskStatus
+
+class TaskGraph:
+    """Dependency bookkeeping for tasks submitted to the orchestrator.
+
+    A task whose `depends_on` ids have not all completed is parked here and
+    released the moment its last predecessor finishes. If a predecessor fails,
+    its dependents are handed back as failed so the failure cascades.
+    """
+
+    def __init__(self, lookup_status: Callable[[str], Optional[TaskStatus]], history: int = 10000):
+        self.lookup_status = lookup_status
+        self.history = history
+        self._lock = threading.Lock()
+        self._inflight: Set[str] = set()
+        self._waiting: Dict[str, Task] = {}
+        self._remaining: Dict[str, Set[str]] = {}
+        self._dependents: Dict[str, List[str]] = {}
+        self._finished: "OrderedDict[str, TaskStatus]" = OrderedDict()
+
+    def add(self, task: Task) -> Tuple[bool, Optional[str]]:
+        """Register a task. Returns (ready, failed_dependency_id)."""
+        with self._lock:
+            self._inflight.add(task.id)
+            remaining = set()
+            for dep_id in task.depends_on:
+                status = self._status_of(dep_id)
+                if status == TaskStatus.COMPLETED:
+                    continue
+                if status is None:
+                    remaining.add(dep_id)
+                    continue
+                return False, dep_id
+
+            if not remaining:
+                return True, None
+
+            self._waiting[task.id] = task
+            self._remaining[task.id] = remaining
+            for dep_id in remaining:
+                self._dependents.setdefault(dep_id, []).append(task.id)
+            return False, None
+
+    def track(self, task: Task):
+        """Mark a task as in flight without dependency checks (e.g. restored timers)."""
+        with self._lock:
+            self._inflight.add(task.id)
+
+    def finish(self, task: Task) -> Tuple[List[Task], List[Task]]:
+        """Record a terminal task. Returns (now_ready, must_fail) dependents."""
+        ready, failed = [], []
+        with self._lock:
+            self._inflight.discard(task.id)
+            self._finished[task.id] = task.status
+            while len(self._finished) > self.history:
+                self._finished.popitem(last=False)
+
+            for child_id in self._dependents.pop(task.id, []):
+                child = self._waiting.get(child_id)
+                if child is None:
+                    continue
+                if task.status != TaskStatus.COMPLETED:
+                    self._drop_waiting(child_id)
+                    failed.append(child)
+                    continue
+                remaining = self._remaining[child_id]
+                remaining.discard(task.id)
+                if not remaining:
+                    self._drop_waiting(child_id)
+                    ready.append(child)
+        return ready, failed
+
+    def remove_waiting(self, task_id: str) -> Optional[Task]:
+        """Detach a blocked task (e.g. on cancel). Returns it if it was waiting."""
+        with self._lock:
+            task = self._waiting.get(task_id)
+            if task:
+                self._drop_waiting(task_id)
+            return task
+
+    def waiting_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._waiting)
+
+    def waiting_count(self) -> int:
+        with self._lock:
+            return len(self._waiting)
+
+    def _drop_waiting(self, task_id: str):
+        self._waiting.pop(task_id, None)
+        for dep_id in self._remaining.pop(task_id, ()):
+            children = self._dependents.get(dep_id)
+            if children and task_id in children:
+                children.remove(task_id)
+                if not children:
+                    del self._dependents[dep_id]
+
+    def _status_of(self, task_id: str) -> Optional[TaskStatus]:
+        # None means "not finished yet"; unknown ids count as failed
+        if task_id in self._finished:
+            return self._finished[task_id]
+        if task_id in self._inflight:
+            return None
+        status = self.lookup_status(task_id)
+        if status in (None, TaskStatus.PENDING, TaskStatus.RUNNING):
+            return TaskStatus.FAILED
+        return status
@@ -1,6 +1,7 @@
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 from enum import Enum
+import json
 import uuid
 from datetime import datetime
 
@@ -9,18 +10,72 @@ class TaskStatus(Enum):
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
+    TIMED_OUT = "timed_out"
+
+# Compact integer codes used for the tasks.status column (append only: stored on disk)
+STATUS_CODES: Dict[TaskStatus, int] = {
+    TaskStatus.PENDING: 0,
+    TaskStatus.RUNNING: 1,
+    TaskStatus.COMPLETED: 2,
+    TaskStatus.FAILED: 3,
+    TaskStatus.CANCELLED: 4,
+    TaskStatus.TIMED_OUT: 5,
+}
+STATUS_BY_CODE: List[TaskStatus] = sorted(STATUS_CODES, key=STATUS_CODES.get)
 
-@dataclass
 class Task:
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
-    description: str = ""
-    priority: int = 1  # 1 (low) to 10 (high)
-    status: TaskStatus = TaskStatus.PENDING
-    created_at: datetime = field(default_factory=datetime.now)
-    result: Any = None
-    error: Optional[str] = None
-    metadata: Dict[str, Any] = field(default_factory=dict)
-    scheduled_time: Optional[datetime] = None
+    """A unit of work. Slotted (no per-instance __dict__) to keep large listings small.
+
+    `metadata` may be handed in as its JSON text (`metadata_json`, as loaded from
+    the database); it is only parsed the first time it is accessed.
+    """
+
+    __slots__ = ("id", "description", "priority", "status", "created_at", "result",
+                 "error", "scheduled_time", "depends_on", "_metadata", "_metadata_json")
+
+    def __init__(self, id: str = None, description: str = "", priority: int = 1,
+                 status: TaskStatus = TaskStatus.PENDING, created_at: datetime = None,
+                 result: Any = None, error: Optional[str] = None,
+                 metadata: Dict[str, Any] = None, scheduled_time: Optional[datetime] = None,
+                 depends_on: Sequence[str] = (), metadata_json: Optional[str] = None):
+        self.id = id or uuid.uuid4().hex
+        self.description = description
+        self.priority = priority  # 1 (low) to 10 (high)
+        self.status = status
+        self.created_at = created_at or datetime.now()
+        self.result = result
+        self.error = error
+        self.scheduled_time = scheduled_time
+        self.depends_on = depends_on  # ids that must complete first
+        if metadata is None and metadata_json is not None:
+            self._metadata = None
+            self._metadata_json = metadata_json
+        else:
+            self._metadata = metadata if metadata is not None else {}
+            self._metadata_json = None
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        if self._metadata is None:
+            self._metadata = json.loads(self._metadata_json) if self._metadata_json else {}
+            self._metadata_json = None
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, value: Dict[str, Any]):
+        self._metadata = value
+        self._metadata_json = None
+
+    def metadata_json(self) -> str:
+        """Metadata as JSON, without a parse/serialize round trip if it was never touched."""
+        if self._metadata is None:
+            return self._metadata_json
+        return json.dumps(self._metadata)
+
+    def __repr__(self) -> str:
+        return (f"Task(id={self.id!r}, description={self.description!r}, "
+                f"priority={self.priority!r}, status={self.status})")
 
 @dataclass
 class Event:
@@ -0,0 +1,101 @@
+import asyncio
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Optional
+from .config import Config
+from .types import Task
+
+class WorkerPool:
+    """Runs tasks from a priority queue on a single long-lived event loop thread."""
+
+    def __init__(self, handler: Callable[[Task], Awaitable[None]], workers: int = None, name: str = "nexus-orchestrator"):
+        self.handler = handler
+        self.workers = max(1, workers or Config.ORCHESTRATOR_WORKERS)
+        self.name = name
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._seq = itertools.count()
+
+        # Stats (only mutated on the pool loop)
+        self._submitted = 0
+        self._completed = 0
+        self._active = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run_loop, name=self.name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._queue = asyncio.PriorityQueue()
+        for i in range(self.workers):
+            self.loop.create_task(self._worker(i))
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            pending = asyncio.all_tasks(self.loop)
+            for t in pending:
+                t.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.close()
+
+    async def _worker(self, index: int):
+        while True:
+            _, _, enqueued_at, task = await self._queue.get()
+            wait = time.monotonic() - enqueued_at
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._active += 1
+            try:
+                await self.handler(task)
+            except Exception as e:
+                print(f"[WORKER {index}] Unhandled error in task {task.id}: {e}")
+            finally:
+                self._active -= 1
+                self._completed += 1
+                self._queue.task_done()
+
+    def _put(self, task: Task):
+        self._submitted += 1
+        # Higher Task.priority runs first; seq keeps FIFO order within a priority
+        self._queue.put_nowait((-task.priority, next(self._seq), time.monotonic(), task))
+
+    def submit(self, task: Task):
+        """Queue a task for execution. Safe to call from any thread."""
+        self.start()
+        self.loop.call_soon_threadsafe(self._put, task)
+
+    def run_coroutine(self, coro: Coroutine[Any, Any, Any]) -> Future:
+        """Schedule a coroutine on the pool loop from any thread."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stats(self) -> Dict[str, Any]:
+        started = self._completed + self._active
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "active": self._active,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "avg_wait_ms": (self._total_wait / started * 1000) if started else 0.0,
+            "max_wait_ms": self._max_wait * 1000,
+        }
+
+    def stop(self):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
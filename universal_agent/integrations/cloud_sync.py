@@ -1,57 +1,121 @@
 import asyncio
+import gzip
 import json
-import os
-from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
 import aiohttp
+from core.config import Config
+from memory.knowledge_graph import KnowledgeGraph
 
 class CloudSync:
-    def __init__(self, sync_url: str = None):
-        self.sync_url = sync_url or os.getenv("CLOUD_SYNC_URL")
+    """Delta sync of the knowledge graph with a sync server.
+
+    Every local write carries a version stamp and a journal revision (see
+    KnowledgeGraph.changes_since). A sync pulls the server's changes after
+    our last pull cursor, merges them last-writer-wins, then pushes local
+    changes after our last push cursor. Both cursors are stored with the
+    graph, so each run moves only what changed since the previous one.
+    Requests and responses are gzip-compressed JSON, over one pooled session.
+
+    Protocol (served by integrations/cloud_sync_server.py for local use):
+      GET  /changes?since=<cursor>&limit=<n>&exclude=<replica>
+           -> {"changes": [...], "cursor": int, "more": bool}
+      POST /changes {"replica": str, "changes": [...]} -> {"applied": int, "cursor": int}
+    where a change is {"id", "data", "version", "deleted"}.
+    """
+
+    def __init__(self, graph: KnowledgeGraph = None, sync_url: str = None, batch: int = None):
+        self.sync_url = (sync_url or Config.CLOUD_SYNC_URL or "").rstrip("/")
         self.enabled = bool(self.sync_url)
-        
-    async def upload_knowledge(self, knowledge_data: Dict[str, Any]) -> bool:
-        """Upload knowledge graph to cloud"""
+        self.graph = graph
+        self.batch = batch or Config.CLOUD_SYNC_BATCH
+        self._session: aiohttp.ClientSession = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # One session (and its keep-alive connections) for the life of the syncer
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=Config.CLOUD_SYNC_TIMEOUT),
+                headers={"Accept-Encoding": "gzip"},
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _post(self, path: str, payload: Dict[str, Any], stats: Dict[str, int]) -> Dict[str, Any]:
+        body = gzip.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"), compresslevel=6)
+        stats["bytes_up"] += len(body)
+        session = await self._get_session()
+        async with session.post(f"{self.sync_url}{path}", data=body, headers={
+            "Content-Type": "application/json", "Content-Encoding": "gzip"
+        }) as response:
+            response.raise_for_status()
+            stats["bytes_down"] += response.content_length or 0
+            return await response.json()
+
+    async def _get(self, path: str, params: Dict[str, Any], stats: Dict[str, int]) -> Dict[str, Any]:
+        session = await self._get_session()
+        async with session.get(f"{self.sync_url}{path}", params=params) as response:
+            response.raise_for_status()
+            stats["bytes_down"] += response.content_length or 0  # compressed size; the body is inflated for us
+            return await response.json()
+
+    async def pull(self, stats: Dict[str, int]):
+        """Fetch and merge server changes since the last pull."""
+        cursor = int(self.graph.sync_state("pull_cursor", 0))
+        while True:
+            page = await self._get("/changes", {
+                "since": cursor, "limit": self.batch, "exclude": self.graph.replica
+            }, stats)
+            changes: List[Dict[str, Any]] = page["changes"]
+            stats["pulled"] += len(changes)
+            stats["applied"] += self.graph.apply_changes(changes)
+            cursor = page["cursor"]
+            self.graph.set_sync_state("pull_cursor", cursor)
+            if not page.get("more"):
+                return
+
+    async def push(self, stats: Dict[str, int]):
+        """Send local changes since the last push."""
+        rev = int(self.graph.sync_state("push_rev", 0))
+        suffix = "." + self.graph.replica
+        while True:
+            changes, new_rev = self.graph.changes_since(rev, self.batch)
+            if not changes:
+                return
+            # Changes merged in from other replicas carry their stamps; the server has them already
+            mine = [change for change in changes if change["version"].endswith(suffix)]
+            if mine:
+                await self._post("/changes", {"replica": self.graph.replica, "changes": mine}, stats)
+                stats["pushed"] += len(mine)
+            rev = new_rev
+            self.graph.set_sync_state("push_rev", rev)
+            if len(changes) < self.batch:
+                return
+
+    async def sync(self) -> Dict[str, int]:
+        """Pull, merge, push. Returns counts and (compressed) bytes moved."""
         if not self.enabled:
             print("[CLOUD SYNC] Not configured. Set CLOUD_SYNC_URL in .env")
-            return False
-            
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.sync_url}/upload",
-                    json={
-                        "timestamp": datetime.now().isoformat(),
-                        "data": knowledge_data
-                    }
-                ) as response:
-                    return response.status == 200
-        except Exception as e:
-            print(f"[CLOUD SYNC] Upload failed: {e}")
-            return False
-    
-    async def download_knowledge(self) -> Dict[str, Any]:
-        """Download knowledge graph from cloud"""
-        if not self.enabled:
             return {}
-            
+        if self.graph is None:
+            self.graph = KnowledgeGraph()
+        stats = {"pulled": 0, "applied": 0, "pushed": 0, "bytes_up": 0, "bytes_down": 0}
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.sync_url}/download") as response:
-                    if response.status == 200:
-                        return await response.json()
-                    return {}
-        except Exception as e:
-            print(f"[CLOUD SYNC] Download failed: {e}")
-            return {}
-    
-    async def sync(self, local_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Bidirectional sync - merge local and cloud data"""
-        if not self.enabled:
-            return local_data
-            
-        cloud_data = await self.download_knowledge()
-        # Simple merge strategy - cloud takes precedence for conflicts
-        merged = {**local_data, **cloud_data}
-        await self.upload_knowledge(merged)
-        return merged
+            if self.graph.sync_state("seeded") is None:
+                # First sync from this graph: nodes written before versioning need a stamp
+                stamped = self.graph.stamp_unversioned()
+                if stamped:
+                    print(f"[CLOUD SYNC] Versioned {stamped} existing node(s) for the first sync")
+                self.graph.set_sync_state("seeded", 1)
+            await self.pull(stats)
+            await self.push(stats)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError, KeyError, TypeError) as e:
+            # Network errors, timeouts (not OSError before 3.11) and malformed pages.
+            # Cursors only move past batches that went through; the next sync resumes there
+            error = f"{type(e).__name__}: {e}"
+            print(f"[CLOUD SYNC] Sync failed: {error}")
+            stats["error"] = error
+        return stats
@@ -0,0 +1,163 @@
+import argparse
+import gzip
+import json
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# Newest version of every node the server has seen, with a sequence number per accepted change
+NODES_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS nodes (
+        id TEXT PRIMARY KEY,
+        version TEXT NOT NULL,
+        data TEXT,
+        deleted INTEGER NOT NULL,
+        origin TEXT,
+        seq INTEGER
+    )
+'''
+# Last writer wins: an existing row is replaced only by a larger version stamp
+UPSERT_NODE_SQL = '''
+    INSERT INTO nodes (id, version, data, deleted, origin, seq)
+    VALUES (?, ?, ?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM nodes))
+    ON CONFLICT(id) DO UPDATE SET version = excluded.version, data = excluded.data,
+        deleted = excluded.deleted, origin = excluded.origin, seq = excluded.seq
+    WHERE excluded.version > nodes.version
+'''
+CHANGES_SQL = 'SELECT id, version, data, deleted, seq FROM nodes WHERE seq > ? AND origin IS NOT ? ORDER BY seq LIMIT ?'
+
+class CloudSyncServer:
+    """Stand-in for the cloud sync service, speaking CloudSync's protocol.
+
+    Runs in-process on a background thread (or standalone via __main__), so
+    sync can be exercised and benchmarked without the real service. State is
+    one SQLite table, in memory unless `db_path` is given.
+    """
+
+    MAX_LIMIT = 5000
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, db_path: str = ":memory:"):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(NODES_TABLE_SQL)
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_nodes_seq ON nodes (seq)')
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread: threading.Thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="nexus-sync-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        with self.lock:  # keep-alive handler threads may still be mid-request
+            self.conn.close()
+
+    def apply(self, changes: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """Store changes that are newer than what we have. Returns (applied, latest seq)."""
+        rows = [(
+            change["id"], change["version"],
+            None if change.get("deleted") else json.dumps(change["data"]),
+            int(bool(change.get("deleted"))), change["version"].rsplit(".", 1)[-1],
+        ) for change in changes]
+        with self.lock, self.conn:
+            applied = self.conn.executemany(UPSERT_NODE_SQL, rows).rowcount
+            cursor = self.conn.execute('SELECT COALESCE(MAX(seq), 0) FROM nodes').fetchone()[0]
+        return applied, cursor
+
+    def changes_since(self, since: int, limit: int, exclude: str = None) -> Dict[str, Any]:
+        """Changes after `since`, skipping ones that came from replica `exclude`."""
+        limit = max(1, min(limit, self.MAX_LIMIT))
+        with self.lock:
+            rows = self.conn.execute(CHANGES_SQL, (since, exclude, limit)).fetchall()
+            more = len(rows) == limit
+            # A short page means everything up to the head was scanned, including the excluded rows
+            cursor = rows[-1][-1] if more else self.conn.execute('SELECT COALESCE(MAX(seq), ?) FROM nodes', (since,)).fetchone()[0]
+        changes = [
+            {"id": node_id, "data": json.loads(data) if data is not None else None,
+             "version": version, "deleted": bool(deleted)}
+            for node_id, version, data, deleted, _ in rows
+        ]
+        return {"changes": changes, "cursor": cursor, "more": more}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so the client's pooled connections get reused
+            wbufsize = 1 << 16  # headers and body leave in one write instead of stalling on delayed ACKs
+
+            def _reply(self, payload: Dict[str, Any], status: int = 200):
+                body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+                gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+                if gzipped:
+                    body = gzip.compress(body, compresslevel=6)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                if gzipped:
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != "/changes":
+                    return self._reply({"error": "not found"}, 404)
+                query = parse_qs(url.query)
+                try:
+                    since = int(query.get("since", ["0"])[0])
+                    limit = int(query.get("limit", ["500"])[0])
+                except ValueError:
+                    return self._reply({"error": "since and limit must be integers"}, 400)
+                try:
+                    self._reply(server.changes_since(since, limit, query.get("exclude", [None])[0]))
+                except sqlite3.Error as e:
+                    self._reply({"error": f"unavailable: {e}"}, 503)
+
+            def do_POST(self):
+                if urlparse(self.path).path != "/changes":
+                    return self._reply({"error": "not found"}, 404)
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                try:
+                    if self.headers.get("Content-Encoding") == "gzip":
+                        body = gzip.decompress(body)
+                    payload = json.loads(body)
+                    applied, cursor = server.apply(payload["changes"])
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    return self._reply({"error": f"bad request: {e}"}, 400)
+                except sqlite3.Error as e:
+                    return self._reply({"error": f"unavailable: {e}"}, 503)
+                self._reply({"applied": applied, "cursor": cursor})
+
+            def log_message(self, format, *args):
+                pass  # one line per request would drown the agent's own logging
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Nexus cloud sync service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default=":memory:", help="SQLite file to keep synced nodes in")
+    args = parser.parse_args()
+    server = CloudSyncServer(args.host, args.port, args.db)
+    print(f"[CLOUD SYNC] Stand-in server listening on {server.url} (set CLOUD_SYNC_URL to this)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import os
+from collections import deque
+from typing import List, Optional
+from core.config import Config
+
+class OutputCapture:
+    """Bounded capture of one output stream.
+
+    Keeps only the last `tail_bytes` in memory. Once the stream outgrows that,
+    everything (from the first byte) is spilled to `spill_path` on disk.
+    """
+
+    def __init__(self, spill_path: str, tail_bytes: int = None):
+        self.spill_path = spill_path
+        self.tail_bytes = tail_bytes or Config.TASK_OUTPUT_TAIL_BYTES
+        self.total_bytes = 0
+        self._chunks = deque()
+        self._buffered = 0
+        self._file = None
+        self._partial = b""
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    def write(self, data: bytes) -> List[str]:
+        """Record a chunk. Returns the lines it completed."""
+        if not data:
+            return []
+        self.total_bytes += len(data)
+
+        if self._file is None and self._buffered + len(data) > self.tail_bytes:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            self._file = open(self.spill_path, "wb")
+            for chunk in self._chunks:
+                self._file.write(chunk)
+        if self._file is not None:
+            self._file.write(data)
+
+        self._chunks.append(data)
+        self._buffered += len(data)
+        while self._buffered - len(self._chunks[0]) >= self.tail_bytes:
+            self._buffered -= len(self._chunks.popleft())
+
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        if len(self._partial) > self.tail_bytes:
+            # No newline in sight (progress bars, binary); don't let it grow unbounded
+            lines.append(self._partial)
+            self._partial = b""
+        return [line.decode(errors="replace").rstrip("\r") for line in lines]
+
+    def flush_partial(self) -> Optional[str]:
+        """Return the trailing line that had no newline, if any."""
+        if not self._partial:
+            return None
+        line, self._partial = self._partial, b""
+        return line.decode(errors="replace").rstrip("\r")
+
+    def tail(self) -> str:
+        data = b"".join(self._chunks)[-self.tail_bytes:]
+        return data.decode(errors="replace").strip()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
@@ -0,0 +1,293 @@
+import asyncio
+import base64
+import os
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from typing import Awaitable, Callable, List, Optional, Tuple
+from core.config import Config
+
+IS_WINDOWS = sys.platform == "win32"
+
+OutputCallback = Callable[[bytes], Awaitable[None]]
+
+class ShellSessionError(Exception):
+    """The shell process died or stopped answering; the session is unusable."""
+
+class ShellSession:
+    """A long-lived shell process that runs commands sent over stdin.
+
+    After each command the shell prints a per-session sentinel (plus the exit
+    code) on stdout and stderr, which marks where that command's output ends.
+    Each command runs in a child scope (a bash subshell, a PowerShell script
+    block with the location and environment restored after it), so one task's
+    `cd` or variables never leak into the next. A command that exits the shell
+    itself completes with that exit code and the session is retired.
+    """
+
+    def __init__(self, argv: List[str], flavor: str):
+        self.argv = argv
+        self.flavor = flavor  # "posix" or "powershell"
+        self.marker = f"__NEXUS_END_{uuid.uuid4().hex}__".encode()
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.commands_run = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        kwargs = {}
+        if IS_WINDOWS:
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True  # so kill() can take child processes with it
+        self.process = await asyncio.create_subprocess_exec(
+            *self.argv,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            **kwargs
+        )
+
+    def _wrap(self, command: str) -> bytes:
+        marker = self.marker.decode()
+        if self.flavor == "powershell":
+            # Send the command base64-encoded so quoting and newlines survive the one-line protocol
+            encoded = base64.b64encode(command.encode("utf-8")).decode()
+            script = (
+                "$nexusDir = Get-Location; $nexusEnv = [Environment]::GetEnvironmentVariables('Process'); "
+                "$global:LASTEXITCODE = 0; $nexusOk = $true; "
+                f"try {{ & {{ Invoke-Expression ([Text.Encoding]::UTF8.GetString([Convert]::FromBase64String('{encoded}'))) }} | Out-String -Stream }} "
+                "catch { $nexusOk = $false; [Console]::Error.WriteLine($_.ToString()) } "
+                "finally { Set-Location $nexusDir; "
+                "foreach ($k in @([Environment]::GetEnvironmentVariables('Process').Keys)) { "
+                "if (-not $nexusEnv.Contains($k)) { [Environment]::SetEnvironmentVariable($k, $null) } }; "
+                "foreach ($k in $nexusEnv.Keys) { [Environment]::SetEnvironmentVariable($k, $nexusEnv[$k]) } }; "
+                "$nexusCode = if (-not $nexusOk) { 1 } else { $LASTEXITCODE }; "
+                f"[Console]::Out.WriteLine(\"`n{marker} $nexusCode\"); [Console]::Out.Flush(); "
+                f"[Console]::Error.WriteLine(\"`n{marker}\"); [Console]::Error.Flush()\n"
+            )
+        else:
+            # A subshell keeps cd, exports and exit local to the command; stdin is
+            # detached so it can't eat the protocol
+            script = (
+                f"( eval {shlex.quote(command)} ) < /dev/null\n"
+                f"printf '\\n{marker} %s\\n' \"$?\"\n"
+                f"printf '\\n{marker}\\n' >&2\n"
+            )
+        return script.encode("utf-8")
+
+    async def _read_until_marker(self, stream: asyncio.StreamReader,
+                                 on_data: Optional[OutputCallback] = None) -> Tuple[bytes, Optional[bytes]]:
+        """Read one command's output. Returns (output, rest_of_marker_line).
+
+        With `on_data`, output is handed over chunk by chunk as it arrives and
+        the returned output is empty. The marker part is None if the shell
+        exited before printing it (the command ran `exit`).
+        """
+        collected = bytearray()
+        pending = bytearray()
+        # Enough to hold a partially received marker plus the newline before it
+        keep = len(self.marker) + 2
+
+        async def emit(data: bytes):
+            if not data:
+                return
+            if on_data:
+                await on_data(data)
+            else:
+                collected.extend(data)
+
+        while True:
+            idx = pending.find(self.marker)
+            if idx != -1:
+                nl = pending.find(b"\n", idx)
+                if nl != -1:
+                    # The protocol prefixes the marker with a newline; drop it
+                    output = bytes(pending[:idx])
+                    if output.endswith(b"\n"):
+                        output = output[:-1]
+                    if output.endswith(b"\r"):
+                        output = output[:-1]
+                    await emit(output)
+                    return bytes(collected), bytes(pending[idx + len(self.marker):nl]).strip()
+            elif len(pending) > keep:
+                await emit(bytes(pending[:-keep]))
+                del pending[:-keep]
+            chunk = await stream.read(65536)
+            if not chunk:
+                output = bytes(pending)
+                await emit(output[:-1] if output.endswith(b"\n") else output)
+                return bytes(collected), None
+            pending.extend(chunk)
+
+    async def run(self, command: str, on_stdout: Optional[OutputCallback] = None,
+                  on_stderr: Optional[OutputCallback] = None) -> Tuple[str, str, int]:
+        if not self.alive:
+            raise ShellSessionError("Shell session is not running")
+        self.last_used = time.monotonic()
+        self.commands_run += 1
+        try:
+            self.process.stdin.write(self._wrap(command))
+            await self.process.stdin.drain()
+            (stdout, code), (stderr, _) = await asyncio.gather(
+                self._read_until_marker(self.process.stdout, on_stdout),
+                self._read_until_marker(self.process.stderr, on_stderr),
+            )
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise ShellSessionError(f"Shell pipe closed: {e}")
+        if code is None:
+            # The command exited the shell itself: that is its exit code, and this session is done
+            returncode = await self.process.wait()
+        else:
+            try:
+                returncode = int(code or 0)
+            except ValueError:
+                returncode = 0
+        return (
+            stdout.decode(errors="replace").strip(),
+            stderr.decode(errors="replace").strip(),
+            returncode,
+        )
+
+    async def ping(self, timeout: float = 5.0) -> bool:
+        try:
+            await asyncio.wait_for(self.run("$null" if self.flavor == "powershell" else ":"), timeout)
+            return True
+        except (asyncio.TimeoutError, ShellSessionError):
+            return False
+
+    async def close(self):
+        if not self.alive:
+            return
+        try:
+            if IS_WINDOWS:
+                # Kill the whole tree; the shell may have spawned long-running children
+                subprocess.run(["taskkill", "/T", "/F", "/PID", str(self.process.pid)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            else:
+                os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, OSError):
+            pass
+        try:
+            self.process.kill()
+        except ProcessLookupError:
+            pass
+        await self.process.wait()
+
+class ShellPool:
+    """Pool of warm shell sessions so short commands skip interpreter startup.
+
+    Sessions are recycled after `max_commands` commands, health-checked when
+    idle for longer than `health_interval`, and discarded if a command is
+    cancelled or times out (their state is unknown at that point).
+    """
+
+    def __init__(self, size: int = None, max_commands: int = None, health_interval: float = None):
+        self.size = max(1, size or Config.SHELL_POOL_SIZE)
+        self.max_commands = max_commands or Config.SHELL_POOL_MAX_COMMANDS
+        self.health_interval = health_interval if health_interval is not None else Config.SHELL_POOL_HEALTH_INTERVAL
+        self.argv, self.flavor = self._shell_command()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._created = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self.commands = 0
+        self.recycled = 0
+
+    @staticmethod
+    def _shell_command() -> Tuple[List[str], str]:
+        if IS_WINDOWS:
+            return ["powershell", "-NoLogo", "-NoProfile", "-NonInteractive", "-Command", "-"], "powershell"
+        bash = shutil.which("bash")
+        if bash:
+            return [bash, "--noprofile", "--norc"], "posix"
+        return ["/bin/sh"], "posix"
+
+    def usable_here(self) -> bool:
+        """Sessions are bound to the event loop that created them."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return self.loop is None or self.loop is loop
+
+    async def _acquire(self) -> ShellSession:
+        if self._idle is None:
+            self.loop = asyncio.get_running_loop()
+            self._idle = asyncio.Queue()
+            self._lock = asyncio.Lock()
+
+        while True:
+            if self._idle.empty():
+                async with self._lock:
+                    if self._created < self.size:
+                        session = ShellSession(self.argv, self.flavor)
+                        self._created += 1
+                        try:
+                            await session.start()
+                        except Exception:
+                            self._created -= 1
+                            raise
+                        return session
+            session = await self._idle.get()
+            if not session.alive:
+                await self._discard(session)
+                continue
+            if time.monotonic() - session.last_used > self.health_interval and not await session.ping():
+                await self._discard(session)
+                continue
+            return session
+
+    async def _release(self, session: ShellSession):
+        if not session.alive:
+            await self._discard(session)
+            return
+        if session.commands_run >= self.max_commands:
+            self.recycled += 1
+            await self._discard(session)
+            return
+        self._idle.put_nowait(session)
+
+    async def _discard(self, session: ShellSession):
+        self._created -= 1
+        await session.close()
+
+    async def run(self, command: str, on_stdout: Optional[OutputCallback] = None,
+                  on_stderr: Optional[OutputCallback] = None) -> Tuple[str, str, int]:
+        """Run a command on a warm session. Returns (stdout, stderr, returncode).
+
+        Pass `on_stdout`/`on_stderr` to stream output chunks as they arrive.
+        """
+        session = await self._acquire()
+        self.commands += 1
+        try:
+            result = await session.run(command, on_stdout, on_stderr)
+        except BaseException:
+            # Cancelled, timed out or broken mid-command: never reuse this shell
+            await asyncio.shield(self._discard(session))
+            raise
+        await self._release(session)
+        return result
+
+    async def close(self):
+        if self._idle is None:
+            return
+        while not self._idle.empty():
+            await self._discard(self._idle.get_nowait())
+
+    def stats(self):
+        return {
+            "shell": self.flavor,
+            "size": self.size,
+            "sessions": self._created,
+            "idle": self._idle.qsize() if self._idle else 0,
+            "commands": self.commands,
+            "recycled": self.recycled,
+        }
@@ -0,0 +1,170 @@
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+from core.config import Config
+from memory.knowledge_graph import KnowledgeGraph
+from integrations.cloud_sync import CloudSync
+
+class SyncWorker:
+    """Keeps a KnowledgeGraph synced with the cloud from a background thread.
+
+    Local writes only call notify(), which flags the graph dirty and returns.
+    The worker waits until edits have been quiet for `debounce` seconds, or
+    `max_delay` seconds have passed since the first unsynced edit, then runs
+    one CloudSync.sync(), so a burst of edits becomes one delta.
+
+    The outbox is the graph's own version journal: CloudSync pushes whatever
+    is newer than the stored push cursor, and moves the cursor only after the
+    server accepts a batch. Nothing unsent is lost on failure or restart. The
+    journal holds one entry per node, so repeated edits coalesce there too.
+    Failed syncs are retried with exponential backoff and full jitter. With
+    no local edits the worker still syncs every `interval` seconds to pull
+    remote changes.
+    """
+
+    def __init__(self, graph: KnowledgeGraph, syncer: CloudSync = None, debounce: float = None,
+                 max_delay: float = None, interval: float = None):
+        self.graph = graph
+        self.syncer = syncer or CloudSync(graph)
+        self.debounce = debounce if debounce is not None else Config.CLOUD_SYNC_DEBOUNCE
+        self.max_delay = max_delay if max_delay is not None else Config.CLOUD_SYNC_MAX_DELAY
+        self.interval = interval if interval is not None else Config.CLOUD_SYNC_INTERVAL
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._wake: Optional[asyncio.Event] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._sync_lock: Optional[asyncio.Lock] = None
+        # Monotonic time of the oldest unsynced local edit; None when clean
+        self._dirty_since: Optional[float] = time.monotonic()  # a restart may have left changes unsent
+
+        # Stats (only mutated on the worker loop)
+        self.syncs = 0
+        self.failures = 0  # consecutive
+        self.last_sync: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.retry_at: Optional[str] = None
+        self.totals = {"pulled": 0, "applied": 0, "pushed": 0, "bytes_up": 0, "bytes_down": 0}
+
+        graph.on_change(self.notify)
+
+    def start(self):
+        if not self.syncer.enabled:
+            print("[CLOUD SYNC] Not configured. Set CLOUD_SYNC_URL in .env")
+            return
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run_loop, name="nexus-cloud-sync", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._wake = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._sync_lock = asyncio.Lock()
+        self._ready.set()
+        try:
+            self.loop.run_until_complete(self._run())
+        finally:
+            self.loop.run_until_complete(self.syncer.close())
+            self.loop.close()
+
+    def notify(self):
+        """Record that the graph changed. Never blocks; safe to call from any thread."""
+        if self._dirty_since is None:
+            self._dirty_since = time.monotonic()
+        if self.loop is not None:
+            try:
+                self.loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                pass  # worker stopped; the journal keeps the change for the next start
+
+    @staticmethod
+    async def _wait(event: asyncio.Event, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return event.is_set()
+
+    async def _run(self):
+        while not self._stop.is_set():
+            if self._dirty_since is None:
+                # Clean: sleep until an edit arrives, or pull when the interval runs out
+                await self._wait(self._wake, self.interval)
+            # Debounce: each edit restarts the quiet period, up to max_delay after the first one
+            while self._dirty_since is not None and not self._stop.is_set():
+                remaining = self._dirty_since + self.max_delay - time.monotonic()
+                self._wake.clear()
+                if remaining <= 0 or not await self._wait(self._wake, min(self.debounce, remaining)):
+                    break
+            if self._stop.is_set():
+                break
+            if not await self.sync_now():
+                # Full jitter, so replicas that failed together don't retry together
+                delay = random.uniform(0, min(Config.CLOUD_SYNC_RETRY_MAX, Config.CLOUD_SYNC_RETRY_BASE * 2 ** (self.failures - 1)))
+                self.retry_at = datetime.fromtimestamp(time.time() + delay).isoformat()
+                print(f"[CLOUD SYNC] Attempt {self.failures} failed, retrying in {delay:.1f}s")
+                await self._wait(self._stop, delay)
+                self.retry_at = None
+        if self._dirty_since is not None:
+            await self.sync_now()  # last chance to flush; anything still unsent goes out next start
+
+    async def sync_now(self) -> bool:
+        """Run one sync on the worker loop. Returns False if it failed."""
+        async with self._sync_lock:
+            dirty_since = self._dirty_since
+            self._dirty_since = None  # edits made during the sync mark it dirty again
+            self._wake.clear()
+            try:
+                stats = await self.syncer.sync()
+            except Exception as e:
+                # Anything sync() did not expect still counts as a failed attempt, never ends the worker
+                print(f"[CLOUD SYNC] Sync failed: {type(e).__name__}: {e}")
+                stats = {"error": f"{type(e).__name__}: {e}"}
+            if "error" in stats:
+                self.failures += 1
+                self.last_error = stats["error"]
+                if self._dirty_since is None:
+                    self._dirty_since = dirty_since if dirty_since is not None else time.monotonic()
+                return False
+            self.failures = 0
+            self.syncs += 1
+            self.last_sync = datetime.now().isoformat()
+            for key in self.totals:
+                self.totals[key] += stats.get(key, 0)
+            return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """Sync now from another thread and wait for it (e.g. before shutdown)."""
+        if self.loop is None:
+            return False
+        return asyncio.run_coroutine_threadsafe(self.sync_now(), self.loop).result(timeout)
+
+    def stop(self, timeout: float = 10):
+        """Stop the worker after one final sync attempt."""
+        if self.loop is None or not self._thread:
+            return
+        self.loop.call_soon_threadsafe(self._request_stop)
+        self._thread.join(timeout)
+
+    def _request_stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "syncs": self.syncs,
+            "failures": self.failures,
+            "dirty": self._dirty_since is not None,
+            "last_sync": self.last_sync,
+            "last_error": self.last_error,
+            "retry_at": self.retry_at,
+            **self.totals,
+        }
@@ -1,45 +1,160 @@
 import subprocess
 import asyncio
-from typing import Tuple
+from typing import Optional, Set, Tuple
 import pyautogui
 import time
+from core.config import Config
+from .shell_pool import ShellPool, ShellSessionError, OutputCallback
 
 class SystemIntegration:
     def __init__(self):
         # Fail-safe: moving mouse to upper-left corner will abort
         pyautogui.FAILSAFE = True
+        # Warm PowerShell (Windows) / bash sessions shared by all shell commands
+        self.shell_pool = ShellPool() if Config.SHELL_POOL_SIZE > 0 else None
         
     async def run_command(self, command: str) -> Tuple[str, str]:
+        if self.shell_pool and self.shell_pool.usable_here():
+            try:
+                stdout, stderr, _ = await self.shell_pool.run(command)
+                return stdout, stderr
+            except ShellSessionError as e:
+                # Raised only when the command could not be handed to the session
+                print(f"[SYSTEM] Shell session unavailable, running in a new process: {e}")
+        
         process = await asyncio.create_subprocess_shell(
             command,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE
         )
-        stdout, stderr = await process.communicate()
+        try:
+            stdout, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            # Task was cancelled or hit its deadline - don't leave the process running
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
         return stdout.decode().strip(), stderr.decode().strip()
 
+    async def stream_command(self, command: str, on_stdout: OutputCallback, on_stderr: OutputCallback) -> int:
+        """Run a command, handing output chunks to the callbacks as they arrive.
+
+        Nothing is buffered here, so long or chatty commands report progress
+        immediately and their output never has to fit in memory. Returns the exit code.
+        """
+        if self.shell_pool and self.shell_pool.usable_here():
+            try:
+                _, _, returncode = await self.shell_pool.run(command, on_stdout, on_stderr)
+                return returncode
+            except ShellSessionError as e:
+                print(f"[SYSTEM] Shell session unavailable, running in a new process: {e}")
+        
+        process = await asyncio.create_subprocess_shell(
+            command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        
+        async def pump(stream: asyncio.StreamReader, callback: OutputCallback):
+            while True:
+                chunk = await stream.read(65536)
+                if not chunk:
+                    return
+                await callback(chunk)
+        
+        try:
+            await asyncio.gather(pump(process.stdout, on_stdout), pump(process.stderr, on_stderr))
+            return await process.wait()
+        except asyncio.CancelledError:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+
+    async def run_powershell(self, script: str) -> Tuple[str, str]:
+        # Pooled sessions already are PowerShell on Windows; skip the nested interpreter
+        if self.shell_pool and self.shell_pool.flavor == "powershell" and self.shell_pool.usable_here():
+            return await self.run_command(script)
+        return await self.run_command(f'powershell -Command "{script}"')
+
     async def open_application(self, app_name: str):
         try:
+            # Windows that already match (the app open before, an Explorer folder or
+            # browser tab named after it) must not count as the one we launch
+            existing = await self.window_handles(app_name)
             # Use PowerShell Start-Process to get better error handling
             # -ErrorAction Stop ensures it throws an error if app not found
-            cmd = f'powershell -Command "Start-Process \'{app_name}\' -ErrorAction Stop"'
-            stdout, stderr = await self.run_command(cmd)
+            stdout, stderr = await self.run_powershell(f"Start-Process '{app_name}' -ErrorAction Stop")
             
             if stderr:
                 # If PowerShell returns error text, it failed
                 raise Exception(stderr)
                 
-            # Wait for app to open
-            await asyncio.sleep(2) 
+            # Report completion only once the window exists, so dependent
+            # steps (e.g. typing) can start immediately instead of guessing
+            await self.wait_for_window(app_name, exclude=existing)
             return f"Opened {app_name}"
         except Exception as e:
             # Return a specific failure marker that Orchestrator can catch
             return f"FAILED_TO_OPEN: {e}"
 
+    @staticmethod
+    def _handle(window):
+        # pygetwindow's Win32Window keeps the HWND, which is stable across lookups
+        return getattr(window, "_hWnd", None) or id(window)
+
+    async def window_handles(self, title: str) -> Set:
+        """Handles of the windows whose title contains `title` right now."""
+        get_windows = getattr(pyautogui, "getWindowsWithTitle", None)
+        if get_windows is None:
+            return set()
+        try:
+            return {self._handle(w) for w in await asyncio.to_thread(get_windows, title)}
+        except Exception:
+            return set()
+
+    async def wait_for_window(self, title: str, timeout: float = 10.0, poll_interval: float = 0.1,
+                              exclude: Optional[Set] = None) -> bool:
+        """Poll until a window whose title contains `title`, and is not in `exclude`, exists and has focus.
+
+        Pass the handles from window_handles() taken before launching, so a
+        window that was already open is never mistaken for the new one.
+        """
+        get_windows = getattr(pyautogui, "getWindowsWithTitle", None)
+        if get_windows is None:
+            # Window lookup is only available on Windows; fall back to a fixed wait
+            await asyncio.sleep(2)
+            return False
+        
+        exclude = exclude or set()
+        activated = set()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                windows = await asyncio.to_thread(get_windows, title)
+            except Exception:
+                windows = []
+            for window in windows:
+                handle = self._handle(window)
+                if handle in exclude:
+                    continue
+                if getattr(window, "isActive", True):
+                    return True
+                if handle not in activated:
+                    # New but behind another window: bring it forward once, then keep polling
+                    activated.add(handle)
+                    try:
+                        await asyncio.to_thread(window.activate)
+                    except Exception:
+                        pass
+            await asyncio.sleep(poll_interval)
+        return False
+
     async def type_text(self, text: str):
         try:
-            # Small delay to ensure window is focused
-            await asyncio.sleep(0.5)
+            # Ordering is handled by task dependencies (see Brain/TaskGraph),
+            # so the target window is already open when this runs
             
             # Run pyautogui in thread pool since it's blocking
             def _type():
@@ -52,7 +167,8 @@ class SystemIntegration:
 
     async def press_key(self, key: str):
         try:
-            pyautogui.press(key)
+            # Blocking call - keep it off the shared orchestrator loop
+            await asyncio.to_thread(pyautogui.press, key)
             return f"Pressed: {key}"
         except Exception as e:
             return f"Failed to press key: {e}"
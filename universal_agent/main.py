@@ -27,13 +27,42 @@ def main():
         event_bus.subscribe("task_started", log_event)
         event_bus.subscribe("task_completed", log_event)
         event_bus.subscribe("task_failed", log_event)
+        event_bus.subscribe("task_cancelled", log_event)
+        event_bus.subscribe("task_timed_out", log_event)
 
-        print("[INIT] Orchestrator initialized (immediate execution mode)")
+        print(f"[INIT] Orchestrator initialized ({orchestrator.pool.workers} workers)")
+
+        # Move old finished tasks out of the hot table in the background
+        from core.retention import RetentionManager
+        retention = RetentionManager()
+        retention.start()
+
+        # Remote API in-process, so cancels reach the tasks this orchestrator is running
+        from core.config import Config
+        if Config.REMOTE_API_PORT:
+            def remote_api_thread():
+                try:
+                    from remote_api import run_remote_api
+                    run_remote_api(Config.REMOTE_API_HOST, Config.REMOTE_API_PORT,
+                                   task_orchestrator=orchestrator, retention_manager=retention)
+                except Exception as e:
+                    print(f"[REMOTE API ERROR] {e}")
+
+            threading.Thread(target=remote_api_thread, name="nexus-remote-api", daemon=True).start()
 
         # Initialize Cognitive Layer
         print("[INIT] Initializing Brain...")
         brain = Brain(orchestrator)
 
+        # Sync knowledge graph edits with the cloud in the background
+        sync_worker = None
+        if Config.CLOUD_SYNC_URL:
+            from integrations.sync_worker import SyncWorker
+            from memory.knowledge_graph import KnowledgeGraph
+            sync_worker = SyncWorker(brain.memory or KnowledgeGraph())
+            sync_worker.start()
+            print(f"[INIT] Cloud sync enabled ({Config.CLOUD_SYNC_URL})")
+
         # Initialize Voice Interface
         print("[INIT] Initializing Voice Interface...")
         from integrations.voice import VoiceInterface
@@ -51,12 +80,15 @@ def main():
             elif event.name == "task_failed":
                 error = event.payload.get("error", "")
                 voice.speak(f"I encountered an error: {error}")
+            elif event.name == "task_timed_out":
+                voice.speak("That one took too long, so I stopped it.")
             elif event.name == "task_started":
                 # Optional: speak when starting? Might be too chatty.
                 pass
 
         event_bus.subscribe("task_completed", voice_feedback)
         event_bus.subscribe("task_failed", voice_feedback)
+        event_bus.subscribe("task_timed_out", voice_feedback)
 
         # Initialize Desktop GUI
         print("[INIT] Launching Desktop GUI...")
@@ -79,6 +111,8 @@ def main():
 
         # Run GUI (blocking)
         gui.run()
+        if sync_worker:
+            sync_worker.stop()  # one last push before exit
         
     except Exception as e:
         print(f"\n[FATAL ERROR] {e}")
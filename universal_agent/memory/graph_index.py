@@ -0,0 +1,273 @@
+from array import array
+from collections import Counter
+from itertools import accumulate, chain, repeat
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+Edge = Tuple[str, str, str]  # (src, edge_type, dst)
+
+class _CSR:
+    """Compressed sparse rows: the neighbours of node u are targets[offsets[u]:offsets[u + 1]].
+
+    Three flat integer arrays instead of a list/dict per node, so millions of
+    edges cost ~20 bytes each. Built with C-level sort/map/accumulate rather
+    than per-edge Python loops.
+    """
+
+    def __init__(self, node_count: int, keys: array, types: array, values: array):
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.targets = array("q", map(values.__getitem__, order))
+        self.types = array("i", map(types.__getitem__, order))
+        counts = [0] * (node_count + 1)
+        for node, count in Counter(keys).items():
+            counts[node + 1] = count
+        self.offsets = array("q", accumulate(counts))
+
+    def row(self, node: int) -> Iterable[Tuple[int, int]]:
+        if node + 1 >= len(self.offsets):
+            return ()
+        start, end = self.offsets[node], self.offsets[node + 1]
+        return zip(self.types[start:end], self.targets[start:end])
+
+    def degree(self, node: int) -> int:
+        if node + 1 >= len(self.offsets):
+            return 0
+        return self.offsets[node + 1] - self.offsets[node]
+
+    def sources(self) -> Iterator[int]:
+        """The row node of every stored edge, in storage order."""
+        offsets = self.offsets
+        return chain.from_iterable(repeat(node, offsets[node + 1] - offsets[node]) for node in range(len(offsets) - 1))
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+class EdgeIndex:
+    """Forward and reverse adjacency for typed edges, with traversal queries.
+
+    Node ids and edge types are interned to integers. The bulk of the edges
+    sit in CSR arrays; edges added or removed since the last compact() live in
+    small per-node overlays, and are folded in once the overlay grows past
+    `compact_ratio` of the CSR size. Callers are expected not to add an edge
+    that already exists (the stores dedupe before indexing).
+    """
+
+    def __init__(self, compact_min: int = 10000, compact_ratio: float = 0.1):
+        self.compact_min = compact_min
+        self.compact_ratio = compact_ratio
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._type_ids: Dict[str, int] = {}
+        self._type_names: List[str] = []
+        empty = array("q")
+        self._out = _CSR(0, empty, array("i"), empty)
+        self._in = _CSR(0, empty, array("i"), empty)
+        self._added_out: Dict[int, List[Tuple[int, int]]] = {}
+        self._added_in: Dict[int, List[Tuple[int, int]]] = {}
+        self._removed: Set[Tuple[int, int, int]] = set()
+        self._overlay = 0
+
+    def __len__(self) -> int:
+        return len(self._out) + self._overlay - len(self._removed)
+
+    def _node(self, name: str) -> int:
+        node = self._ids.get(name)
+        if node is None:
+            node = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return node
+
+    def _type(self, name: str) -> int:
+        edge_type = self._type_ids.get(name)
+        if edge_type is None:
+            edge_type = self._type_ids[name] = len(self._type_names)
+            self._type_names.append(name)
+        return edge_type
+
+    # Building and mutation
+
+    def build(self, edges: Iterable[Edge]):
+        """Replace the index with `edges` in one pass."""
+        srcs, types, dsts = array("q"), array("i"), array("q")
+        node, edge_type_id = self._node, self._type
+        for src, edge_type, dst in edges:
+            srcs.append(node(src))
+            types.append(edge_type_id(edge_type))
+            dsts.append(node(dst))
+        self._rebuild(srcs, types, dsts)
+
+    def _rebuild(self, srcs: array, types: array, dsts: array):
+        n = len(self._names)
+        self._out = _CSR(n, srcs, types, dsts)
+        self._in = _CSR(n, dsts, types, srcs)
+        self._added_out, self._added_in = {}, {}
+        self._removed = set()
+        self._overlay = 0
+
+    def add(self, src: str, edge_type: str, dst: str):
+        s, t, d = self._node(src), self._type(edge_type), self._node(dst)
+        if (s, t, d) in self._removed:
+            self._removed.discard((s, t, d))
+            return
+        self._added_out.setdefault(s, []).append((t, d))
+        self._added_in.setdefault(d, []).append((t, s))
+        self._overlay += 1
+        self._maybe_compact()
+
+    def remove(self, src: str, edge_type: str, dst: str):
+        s, t, d = self._ids.get(src), self._type_ids.get(edge_type), self._ids.get(dst)
+        if s is None or t is None or d is None:
+            return
+        added = self._added_out.get(s)
+        if added and (t, d) in added:
+            added.remove((t, d))
+            self._added_in[d].remove((t, s))
+            self._overlay -= 1
+            return
+        self._removed.add((s, t, d))
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self._overlay + len(self._removed) > max(self.compact_min, len(self._out) * self.compact_ratio):
+            self.compact()
+
+    def compact(self):
+        """Fold the overlays into fresh CSR arrays."""
+        srcs = array("q", self._out.sources())
+        types, dsts = array("i", self._out.types), array("q", self._out.targets)
+        if self._removed:
+            removed = self._removed
+            kept = [i for i, edge in enumerate(zip(srcs, types, dsts)) if edge not in removed]
+            srcs = array("q", map(srcs.__getitem__, kept))
+            types = array("i", map(types.__getitem__, kept))
+            dsts = array("q", map(dsts.__getitem__, kept))
+        for src, added in self._added_out.items():
+            for edge_type, dst in added:
+                srcs.append(src)
+                types.append(edge_type)
+                dsts.append(dst)
+        self._rebuild(srcs, types, dsts)
+
+    # Queries
+
+    def _row(self, csr: _CSR, added: Dict[int, List[Tuple[int, int]]], node: int, reverse: bool):
+        removed = self._removed
+        for edge_type, other in csr.row(node):
+            if removed and ((other, edge_type, node) if reverse else (node, edge_type, other)) in removed:
+                continue
+            yield edge_type, other
+        yield from added.get(node, ())
+
+    def _adjacent(self, node: int, type_filter: Optional[int], direction: str):
+        if direction in ("out", "both"):
+            for edge_type, other in self._row(self._out, self._added_out, node, False):
+                if type_filter is None or edge_type == type_filter:
+                    yield edge_type, other, "out"
+        if direction in ("in", "both"):
+            for edge_type, other in self._row(self._in, self._added_in, node, True):
+                if type_filter is None or edge_type == type_filter:
+                    yield edge_type, other, "in"
+
+    def _type_filter(self, edge_type: Optional[str]) -> Tuple[bool, Optional[int]]:
+        if edge_type is None:
+            return True, None
+        type_id = self._type_ids.get(edge_type)
+        return type_id is not None, type_id
+
+    def neighbors(self, node: str, edge_type: str = None, direction: str = "out") -> List[Tuple[str, str, str]]:
+        """(edge_type, neighbour, "out"/"in") for each edge touching `node`."""
+        known, type_id = self._type_filter(edge_type)
+        start = self._ids.get(node)
+        if start is None or not known:
+            return []
+        names, types = self._names, self._type_names
+        return [(types[t], names[o], side) for t, o, side in self._adjacent(start, type_id, direction)]
+
+    def k_hop(self, node: str, k: int = 2, edge_type: str = None, direction: str = "both",
+              limit: int = None) -> Dict[str, int]:
+        """Nodes within `k` hops, mapped to their distance (the start node is 0)."""
+        known, type_id = self._type_filter(edge_type)
+        start = self._ids.get(node)
+        if start is None:
+            return {}
+        depth = {start: 0}
+        frontier = [start]
+        for hop in range(1, k + 1):
+            if not known:
+                break
+            next_frontier = []
+            for current in frontier:
+                for _, other, _ in self._adjacent(current, type_id, direction):
+                    if other not in depth:
+                        depth[other] = hop
+                        next_frontier.append(other)
+                        if limit and len(depth) >= limit:
+                            return {self._names[n]: d for n, d in depth.items()}
+            frontier = next_frontier
+            if not frontier:
+                break
+        return {self._names[n]: d for n, d in depth.items()}
+
+    def shortest_path(self, src: str, dst: str, edge_type: str = None, direction: str = "out",
+                      max_depth: int = 6) -> Optional[List[str]]:
+        """Fewest-hop path from src to dst as a list of node ids, or None.
+
+        Bidirectional BFS: expands whichever side has the smaller frontier.
+        """
+        known, type_id = self._type_filter(edge_type)
+        s, d = self._ids.get(src), self._ids.get(dst)
+        if s is None or d is None or not known:
+            return None
+        if s == d:
+            return [src]
+        backward = {"out": "in", "in": "out", "both": "both"}[direction]
+        parents_fwd, parents_bwd = {s: None}, {d: None}
+        frontier_fwd, frontier_bwd = [s], [d]
+        for _ in range(max_depth):
+            if not frontier_fwd or not frontier_bwd:
+                return None
+            forward_side = len(frontier_fwd) <= len(frontier_bwd)
+            frontier = frontier_fwd if forward_side else frontier_bwd
+            parents, others = (parents_fwd, parents_bwd) if forward_side else (parents_bwd, parents_fwd)
+            step = direction if forward_side else backward
+            next_frontier = []
+            for current in frontier:
+                for _, other, _ in self._adjacent(current, type_id, step):
+                    if other in parents:
+                        continue
+                    parents[other] = current
+                    if other in others:
+                        return self._join_path(other, parents_fwd, parents_bwd)
+                    next_frontier.append(other)
+            if forward_side:
+                frontier_fwd = next_frontier
+            else:
+                frontier_bwd = next_frontier
+        return None
+
+    def _join_path(self, meet: int, parents_fwd: Dict[int, Optional[int]], parents_bwd: Dict[int, Optional[int]]) -> List[str]:
+        path = []
+        node = meet
+        while node is not None:
+            path.append(node)
+            node = parents_fwd[node]
+        path.reverse()
+        node = parents_bwd[meet]
+        while node is not None:
+            path.append(node)
+            node = parents_bwd[node]
+        return [self._names[n] for n in path]
+
+    def edges_among(self, nodes: Iterable[str]) -> List[Edge]:
+        """Every edge whose two ends are both in `nodes`."""
+        members = {self._ids[n] for n in nodes if n in self._ids}
+        # Scan whichever direction touches fewer edges; hubs can have huge out- or in-rows
+        out_cost = sum(self._out.degree(n) + len(self._added_out.get(n, ())) for n in members)
+        in_cost = sum(self._in.degree(n) + len(self._added_in.get(n, ())) for n in members)
+        direction = "out" if out_cost <= in_cost else "in"
+        edges = []
+        for node in members:
+            for edge_type, other, _ in self._adjacent(node, None, direction):
+                if other in members:
+                    src, dst = (node, other) if direction == "out" else (other, node)
+                    edges.append((self._names[src], self._type_names[edge_type], self._names[dst]))
+        return edges
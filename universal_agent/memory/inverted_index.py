@@ -0,0 +1,173 @@
+import gc
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+def flatten_fields(properties: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, str]]:
+    """Yield (field, text) pairs; nested dicts become dotted field names."""
+    for key, value in properties.items():
+        field = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten_fields(value, field + ".")
+        elif isinstance(value, (list, tuple)):
+            yield field, " ".join(str(v) for v in value)
+        elif value is not None:
+            yield field, str(value)
+
+class InvertedIndex:
+    """Incrementally maintained term index with BM25 ranking.
+
+    Every document is a dict of fields. Postings are kept per term across all
+    fields and per (field, term), so `field:term` queries are scored against
+    that field only; field names match case-insensitively, as in the sqlite
+    backend. Queries are OR'ed terms; results are the top k by score.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}  # term -> doc -> tf
+        self._field_postings: Dict[Tuple[str, str], Dict[str, int]] = {}  # (field, term) -> doc -> tf
+        self._doc_terms: Dict[str, Counter] = {}  # doc -> (field, term) counts, for removal
+        self._doc_len: Dict[str, int] = {}
+        self._field_len: Dict[str, Dict[str, int]] = {}  # field -> doc -> length
+        self._total_len = 0
+        self._field_total: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def add(self, doc_id: str, properties: Dict[str, Any]):
+        if doc_id in self._doc_len:
+            self.remove(doc_id)
+        counts = Counter([(field.lower(), term) for field, text in flatten_fields(properties)
+                          for term in TOKEN_RE.findall(text.lower())])
+
+        postings, field_postings = self._postings, self._field_postings
+        field_lengths: Dict[str, int] = {}
+        for key, tf in counts.items():
+            field, term = key
+            docs = postings.get(term)
+            if docs is None:
+                postings[term] = {doc_id: tf}
+            else:
+                docs[doc_id] = docs.get(doc_id, 0) + tf
+            docs = field_postings.get(key)
+            if docs is None:
+                field_postings[key] = {doc_id: tf}
+            else:
+                docs[doc_id] = tf
+            field_lengths[field] = field_lengths.get(field, 0) + tf
+        for field, length in field_lengths.items():
+            self._field_len.setdefault(field, {})[doc_id] = length
+            self._field_total[field] = self._field_total.get(field, 0) + length
+
+        length = sum(field_lengths.values())
+        self._doc_terms[doc_id] = counts
+        self._doc_len[doc_id] = length
+        self._total_len += length
+
+    def add_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]):
+        """Bulk add. The cyclic GC is paused meanwhile: it would rescan every posting dict."""
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for doc_id, properties in items:
+                self.add(doc_id, properties)
+        finally:
+            if enabled:
+                gc.enable()
+
+    def remove(self, doc_id: str):
+        counts = self._doc_terms.pop(doc_id, None)
+        if counts is None:
+            return
+        for (field, term), tf in counts.items():
+            postings = self._postings.get(term)
+            if postings is not None:
+                remaining = postings.get(doc_id, 0) - tf
+                if remaining > 0:
+                    postings[doc_id] = remaining
+                else:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._postings[term]
+            field_postings = self._field_postings.get((field, term))
+            if field_postings is not None:
+                field_postings.pop(doc_id, None)
+                if not field_postings:
+                    del self._field_postings[(field, term)]
+            lengths = self._field_len.get(field)
+            if lengths is not None and doc_id in lengths:
+                self._field_total[field] -= lengths.pop(doc_id)
+                if not lengths:
+                    del self._field_len[field]
+                    del self._field_total[field]
+        self._total_len -= self._doc_len.pop(doc_id)
+
+    @staticmethod
+    def parse_query(query: str) -> List[Tuple[Optional[str], str]]:
+        """Split a query into (field or None, term) pairs. `field:words` scopes to a field."""
+        parsed = []
+        for part in query.split():
+            field = None
+            if ":" in part:
+                field, _, part = part.partition(":")
+                field = field.lower() or None
+            parsed.extend((field, term) for term in tokenize(part))
+        return parsed
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top `k` (doc_id, score) pairs for the query, best first."""
+        n = len(self._doc_len)
+        if not n or k <= 0:
+            return []
+        k1, b = self.k1, self.b
+        terms = []
+        for field, term in self.parse_query(query):
+            if field is None:
+                postings = self._postings.get(term)
+                lengths = self._doc_len
+                avg_len = self._total_len / n
+            else:
+                postings = self._field_postings.get((field, term))
+                lengths = self._field_len.get(field, {})
+                avg_len = self._field_total.get(field, 0) / max(len(lengths), 1)
+            if postings:
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                terms.append((idf, postings, lengths, k1 * b / (avg_len or 1)))
+        if not terms:
+            return []
+
+        # MaxScore: rare terms first. Once the k-th best score beats the most the
+        # remaining (common) terms could add, documents they alone match can't
+        # reach the top k, so those terms only update existing candidates.
+        terms.sort(key=lambda t: t[0], reverse=True)
+        remaining_max = [idf * (k1 + 1) for idf, _, _, _ in terms]
+        for i in range(len(remaining_max) - 2, -1, -1):
+            remaining_max[i] += remaining_max[i + 1]
+
+        norm = k1 * (1 - b)
+        scores: Dict[str, float] = {}
+        pruned = False
+        for i, (idf, postings, lengths, slope) in enumerate(terms):
+            if not pruned and len(scores) >= k:
+                kth = heapq.nlargest(k, scores.values())[-1]
+                pruned = kth > remaining_max[i]
+            if pruned:
+                for doc_id in scores:
+                    tf = postings.get(doc_id)
+                    if tf:
+                        scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm + slope * lengths[doc_id])
+                continue
+            for doc_id, tf in postings.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm + slope * lengths[doc_id])
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
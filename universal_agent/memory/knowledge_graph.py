@@ -1,36 +1,588 @@
-import json
+import bisect
 import os
-from typing import Dict, Any, List
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from core.config import Config
+from core.database import Database
+from memory.log_store import LogStore
+from memory.inverted_index import InvertedIndex, flatten_fields
+from memory.graph_index import Edge, EdgeIndex
+
+# (node_id, data or None when deleted, version, deleted)
+Change = Tuple[str, Optional[Dict[str, Any]], str, bool]
+
+class VersionClock:
+    """Hybrid logical clock for node version stamps.
+
+    Stamps look like "<ms>.<counter>.<replica>", zero-padded so that string
+    order is time order, never go backwards on one replica, and break ties by
+    replica id. Comparing two stamps is the whole conflict rule: the larger
+    one wins (last writer wins), on every replica alike.
+    """
+
+    def __init__(self, replica: str):
+        self.replica = replica
+        self._ms = 0
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def next(self) -> str:
+        with self._lock:
+            now = int(time.time() * 1000)
+            if now > self._ms:
+                self._ms, self._counter = now, 0
+            else:
+                self._counter += 1
+            return f"{self._ms:013d}.{self._counter:06d}.{self.replica}"
+
+    def observe(self, version: str):
+        """Move past a stamp seen from another replica, so later local edits win over it."""
+        ms, counter, _ = version.split(".", 2)
+        with self._lock:
+            if (int(ms), int(counter)) > (self._ms, self._counter):
+                self._ms, self._counter = int(ms), int(counter)
+
+class _LogBackend:
+    """Whole graph in memory; knowledge.json is the snapshot, changes are appended to knowledge.json.log."""
+
+    def __init__(self, storage_path: str):
+        self.store = LogStore(storage_path)
+        self.data: Dict[str, Any] = self.store.load()
+        self._index: InvertedIndex = None  # built on the first search, then kept in step
+        # Edges get their own snapshot + log, keyed "src\ttype\tdst"
+        self.edge_store = LogStore(storage_path + ".edges")
+        self.edges: Dict[str, List[str]] = self.edge_store.load()
+        # Sync journal: node id -> [version, deleted, rev]; sync state under "\t" keys
+        self.version_store = LogStore(storage_path + ".versions")
+        self.versions: Dict[str, List[Any]] = self.version_store.load()
+        self.sync_state = {key[1:]: self.versions.pop(key) for key in [k for k in self.versions if k.startswith("\t")]}
+        self._rebuild_journal()
+        self.rev = self._journal_revs[-1] if self._journal_revs else 0
+
+    def put(self, node_id: str, properties: Dict[str, Any], version: str = None):
+        self.data[node_id] = properties
+        self.store.put(node_id, properties)
+        if self._index is not None:
+            self._index.add(node_id, properties)
+        if version:
+            self._stamp([(node_id, version, False)])
+        self._maybe_compact()
+
+    def put_many(self, nodes: List[Tuple[str, Dict[str, Any]]], versions: List[str] = None):
+        self.data.update(nodes)
+        self.store.put_many(nodes)
+        if self._index is not None:
+            self._index.add_many(nodes)
+        if versions:
+            self._stamp([(node_id, version, False) for (node_id, _), version in zip(nodes, versions)])
+        self._maybe_compact()
+
+    def delete(self, node_id: str, version: str = None):
+        if self.data.pop(node_id, None) is not None:
+            self.store.delete(node_id)
+            if self._index is not None:
+                self._index.remove(node_id)
+        if version:
+            self._stamp([(node_id, version, True)])
+        self._maybe_compact()
+
+    def _stamp(self, entries: List[Tuple[str, str, bool]]):
+        records = []
+        for node_id, version, deleted in entries:
+            self.rev += 1
+            self.versions[node_id] = record = [version, deleted, self.rev]
+            self._journal_revs.append(self.rev)
+            self._journal_ids.append(node_id)
+            records.append((node_id, record))
+        self.version_store.put_many(records)
+        if len(self._journal_ids) > 2 * len(self.versions) + 1024:
+            self._rebuild_journal()
+
+    def _rebuild_journal(self):
+        # (rev, node id) in rev order, bisected by changes_since; entries a later write superseded are skipped there
+        journal = sorted((record[2], node_id) for node_id, record in self.versions.items())
+        self._journal_revs = [rev for rev, _ in journal]
+        self._journal_ids = [node_id for _, node_id in journal]
+
+    def versions_of(self, node_ids: List[str]) -> Dict[str, str]:
+        return {node_id: self.versions[node_id][0] for node_id in node_ids if node_id in self.versions}
+
+    def latest_version(self) -> Optional[str]:
+        return max((record[0] for record in self.versions.values()), default=None)
+
+    def changes_since(self, rev: int, limit: int) -> Tuple[List[Change], int]:
+        changes = []
+        for i in range(bisect.bisect_right(self._journal_revs, rev), len(self._journal_revs)):
+            node_id = self._journal_ids[i]
+            version, deleted, current = self.versions[node_id]
+            if current != self._journal_revs[i]:
+                continue
+            changes.append((node_id, self.data.get(node_id), version, deleted))
+            rev = current
+            if len(changes) == limit:
+                break
+        return changes, rev
+
+    def stamp_unversioned(self, version: str) -> int:
+        missing = [node_id for node_id in self.data if node_id not in self.versions]
+        self._stamp([(node_id, version, False) for node_id in missing])
+        return len(missing)
+
+    def get_state(self, key: str) -> Optional[str]:
+        return self.sync_state.get(key)
+
+    def set_state(self, key: str, value: str):
+        self.sync_state[key] = str(value)
+        self.version_store.put("\t" + key, str(value))
+
+    def get(self, node_id: str) -> Optional[Dict[str, Any]]:
+        return self.data.get(node_id)
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        return iter(list(self.data.items()))
+
+    def count(self) -> int:
+        return len(self.data)
+
+    @property
+    def index(self) -> InvertedIndex:
+        if self._index is None:
+            self._index = InvertedIndex()
+            self._index.add_many(self.data.items())
+        return self._index
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, Dict[str, Any], float]]:
+        return [(node_id, self.data[node_id], score) for node_id, score in self.index.search(query, top_k)]
+
+    def put_edges(self, edges: List[Edge]) -> List[Edge]:
+        added = [edge for edge in edges if "\t".join(edge) not in self.edges]
+        for edge in added:
+            self.edges["\t".join(edge)] = list(edge)
+        self.edge_store.put_many(("\t".join(edge), list(edge)) for edge in added)
+        self._maybe_compact()
+        return added
+
+    def delete_edges(self, edges: List[Edge]) -> List[Edge]:
+        removed = [edge for edge in edges if self.edges.pop("\t".join(edge), None) is not None]
+        for edge in removed:
+            self.edge_store.delete("\t".join(edge))
+        self._maybe_compact()
+        return removed
+
+    def iter_edges(self) -> Iterator[Edge]:
+        return (tuple(edge) for edge in list(self.edges.values()))
+
+    def _version_snapshot(self) -> Dict[str, Any]:
+        snapshot = dict(self.versions)
+        snapshot.update(("\t" + key, value) for key, value in self.sync_state.items())
+        return snapshot
+
+    def save(self):
+        self.store.compact(self.data)
+        self.edge_store.compact(self.edges)
+        self.version_store.compact(self._version_snapshot())
+
+    def _maybe_compact(self):
+        if self.store.needs_compaction(len(self.data)):
+            self.store.compact(self.data)
+        if self.edge_store.needs_compaction(len(self.edges)):
+            self.edge_store.compact(self.edges)
+        if self.version_store.needs_compaction(len(self.versions)):
+            self.version_store.compact(self._version_snapshot())
+
+    def close(self):
+        self.store.close()
+        self.edge_store.close()
+        self.version_store.close()
+
+class _SQLiteBackend:
+    """Nodes live in the `knowledge` table (full-text indexed by knowledge_fts); nothing is loaded up front."""
+
+    def __init__(self, storage_path: str, db_path: str = None):
+        self.db = Database(db_path)
+        self._migrate(storage_path)
+
+    def _migrate(self, storage_path: str):
+        # One-time import of the node, edge and version stores (snapshot + log each) written by the log backend
+        def import_nodes(store: LogStore) -> int:
+            nodes = list(store.load().items())
+            self.db.save_knowledge_many(nodes)
+            return len(nodes)
+
+        def import_edges(store: LogStore) -> int:
+            return len(self.db.save_edges([tuple(edge) for edge in store.load().values()]))
+
+        def import_versions(store: LogStore) -> int:
+            # Node id -> [version, deleted, rev], sync state under "\t" keys (see _LogBackend)
+            records = store.load()
+            state = {key[1:]: records.pop(key) for key in [k for k in records if k.startswith("\t")]}
+            offset = self.db.import_knowledge_versions(
+                [(node_id, version, deleted, rev) for node_id, (version, deleted, rev) in records.items()]
+            )
+            if "push_rev" in state:
+                # The push cursor is a journal rev; keep it pointing at the same entry
+                state["push_rev"] = int(state["push_rev"]) + offset
+            for key, value in state.items():
+                self.db.set_sync_state(key, value)
+            return len(records)
+
+        nodes = self._import(storage_path, import_nodes)
+        edges = self._import(storage_path + ".edges", import_edges)
+        versions = self._import(storage_path + ".versions", import_versions)
+        if nodes is not None or edges is not None or versions is not None:
+            print(f"[MEMORY] Migrated {nodes or 0} knowledge node(s), {edges or 0} edge(s) and "
+                  f"{versions or 0} version stamp(s) from {storage_path} to SQLite")
+
+    @staticmethod
+    def _import(path: str, load: Callable[[LogStore], int]) -> Optional[int]:
+        """Run `load` on the LogStore at `path`, then set its files aside. None if there is nothing there."""
+        if not (os.path.exists(path) or os.path.exists(path + ".log")):
+            return None
+        store = LogStore(path)
+        try:
+            count = load(store)
+        finally:
+            store.close()
+        for file in (path, path + ".log"):
+            if os.path.exists(file) and os.path.getsize(file):
+                os.replace(file, file + ".migrated")
+            elif os.path.exists(file):
+                os.remove(file)
+        return count
+
+    def put(self, node_id: str, properties: Dict[str, Any], version: str = None):
+        self.db.save_knowledge(node_id, properties, version)
+
+    def put_many(self, nodes: List[Tuple[str, Dict[str, Any]]], versions: List[str] = None):
+        self.db.save_knowledge_many(nodes, versions)
+
+    def delete(self, node_id: str, version: str = None):
+        self.db.delete_knowledge(node_id, version)
+
+    def versions_of(self, node_ids: List[str]) -> Dict[str, str]:
+        return self.db.knowledge_versions(node_ids)
+
+    def latest_version(self) -> Optional[str]:
+        return self.db.latest_knowledge_version()
+
+    def changes_since(self, rev: int, limit: int) -> Tuple[List[Change], int]:
+        return self.db.knowledge_changes_since(rev, limit)
+
+    def stamp_unversioned(self, version: str) -> int:
+        return self.db.stamp_unversioned_knowledge(version)
+
+    def get_state(self, key: str) -> Optional[str]:
+        return self.db.get_sync_state(key)
+
+    def set_state(self, key: str, value: str):
+        self.db.set_sync_state(key, value)
+
+    def get(self, node_id: str) -> Optional[Dict[str, Any]]:
+        return self.db.get_knowledge(node_id)
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        return self.db.iter_knowledge()
+
+    def count(self) -> int:
+        return self.db.count_knowledge()
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, Dict[str, Any], float]]:
+        return self.db.search_knowledge(query, top_k)
+
+    def put_edges(self, edges: List[Edge]) -> List[Edge]:
+        return self.db.save_edges(edges)
+
+    def delete_edges(self, edges: List[Edge]) -> List[Edge]:
+        return self.db.delete_edges(edges)
+
+    def iter_edges(self) -> Iterator[Edge]:
+        return self.db.iter_edges()
+
+    def save(self):
+        pass  # every write is already committed
+
+    def close(self):
+        self.db.close()
 
 class KnowledgeGraph:
-    def __init__(self, storage_path: str = "knowledge.json"):
+    def __init__(self, storage_path: str = "knowledge.json", backend: str = None, db_path: str = None):
         self.storage_path = storage_path
-        self.data: Dict[str, Any] = self._load()
+        self.backend_name = backend or Config.KNOWLEDGE_BACKEND
+        if self.backend_name == "log":
+            self.backend = _LogBackend(storage_path)
+        else:
+            self.backend = _SQLiteBackend(storage_path, db_path)
+        self._edges: EdgeIndex = None  # adjacency, built on the first traversal
+        self.vector_path = storage_path + ".vec"
+        self._vectors = None  # memory.vector_index.VectorIndex, opened on first use
+        self._embedder = None
+        # Every write is stamped with a version for sync (see integrations/cloud_sync.py)
+        self.replica = self.backend.get_state("replica")
+        if self.replica is None:
+            self.replica = uuid.uuid4().hex[:12]
+            self.backend.set_state("replica", self.replica)
+        self.clock = VersionClock(self.replica)
+        latest = self.backend.latest_version()
+        if latest:
+            # Start past every stamp on disk, even if the wall clock went back since
+            self.clock.observe(latest)
+        # Writes and sync may come from different threads (see integrations/sync_worker.py)
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[], None]] = []
+
+    def on_change(self, callback: Callable[[], None]):
+        """Call `callback` after every local write. It runs on the writer's thread, so keep it cheap."""
+        self._listeners.append(callback)
 
-    def _load(self) -> Dict[str, Any]:
-        if os.path.exists(self.storage_path):
-            try:
-                with open(self.storage_path, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-        return {}
+    def _changed(self):
+        for callback in self._listeners:
+            callback()
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """All nodes as a dict (loads the whole graph with the sqlite backend)."""
+        if isinstance(self.backend, _LogBackend):
+            return self.backend.data
+        return dict(self.backend.items())
 
     def save(self):
-        with open(self.storage_path, 'w') as f:
-            json.dump(self.data, f, indent=2)
+        """Persist everything now (log backend: write a snapshot and reset the log)."""
+        with self._lock:
+            self.backend.save()
 
     def add_node(self, node_id: str, properties: Dict[str, Any]):
-        self.data[node_id] = properties
-        self.save()
+        with self._lock:
+            index = self._active_vectors()  # opened before the write, so it isn't seen as stale
+            self.backend.put(node_id, properties, self.clock.next())
+            if index is not None:
+                self._embed_nodes(index, [(node_id, properties)])
+        self._changed()
+
+    def add_nodes(self, nodes: Iterable[Tuple[str, Dict[str, Any]]]):
+        """Insert many nodes in one append / one transaction."""
+        nodes = list(nodes)
+        self._put_nodes(nodes, [self.clock.next() for _ in nodes])
+        self._changed()
+
+    def _put_nodes(self, nodes: List[Tuple[str, Dict[str, Any]]], versions: List[str]):
+        with self._lock:
+            index = self._active_vectors()
+            self.backend.put_many(nodes, versions)
+            if index is not None:
+                self._embed_nodes(index, nodes)
+
+    def remove_node(self, node_id: str):
+        """Remove a node and every edge touching it."""
+        self._delete_node(node_id, self.clock.next())
+        self._changed()
+
+    def _delete_node(self, node_id: str, version: str):
+        with self._lock:
+            index = self._active_vectors()
+            self.backend.delete(node_id, version)
+            if index is not None:
+                index.remove(node_id)
+            incident = [
+                (node_id, edge_type, other) if side == "out" else (other, edge_type, node_id)
+                for edge_type, other, side in self.edge_index.neighbors(node_id, direction="both")
+            ]
+            self.remove_edges(incident)
+
+    # Edges
+
+    @property
+    def edge_index(self) -> EdgeIndex:
+        if self._edges is None:
+            self._edges = EdgeIndex()
+            self._edges.build(self.backend.iter_edges())
+        return self._edges
+
+    def add_edge(self, src: str, dst: str, edge_type: str = "related_to"):
+        self.add_edges([(src, edge_type, dst)])
+
+    def add_edges(self, edges: Iterable[Edge]):
+        """Add (src, edge_type, dst) edges; ones that already exist are ignored."""
+        with self._lock:
+            added = self.backend.put_edges([tuple(edge) for edge in edges])
+            if self._edges is not None:
+                for edge in added:
+                    self._edges.add(*edge)
+
+    def remove_edge(self, src: str, dst: str, edge_type: str = "related_to"):
+        self.remove_edges([(src, edge_type, dst)])
+
+    def remove_edges(self, edges: Iterable[Edge]):
+        with self._lock:
+            removed = self.backend.delete_edges([tuple(edge) for edge in edges])
+            if self._edges is not None:
+                for edge in removed:
+                    self._edges.remove(*edge)
+
+    def neighbors(self, node_id: str, edge_type: str = None, direction: str = "out") -> List[Dict[str, str]]:
+        """Edges touching a node: [{"type", "node", "direction"}]. direction is out, in or both."""
+        return [
+            {"type": t, "node": other, "direction": side}
+            for t, other, side in self.edge_index.neighbors(node_id, edge_type, direction)
+        ]
+
+    def k_hop(self, node_id: str, k: int = 2, edge_type: str = None, direction: str = "both",
+              limit: int = None) -> Dict[str, int]:
+        """Node ids within k hops, mapped to their distance."""
+        return self.edge_index.k_hop(node_id, k, edge_type, direction, limit)
+
+    def shortest_path(self, src: str, dst: str, edge_type: str = None, direction: str = "out",
+                      max_depth: int = 6) -> Optional[List[str]]:
+        return self.edge_index.shortest_path(src, dst, edge_type, direction, max_depth)
+
+    def subgraph(self, node_ids: Iterable[str], k: int = 1, limit: int = 50) -> Dict[str, Any]:
+        """The seeds plus everything within k hops (at most `limit` nodes), with their data
+        and the edges between them. Sized for use as prompt context."""
+        depth: Dict[str, int] = {}
+        for node_id in node_ids:
+            for other, d in self.k_hop(node_id, k, limit=limit).items():
+                if len(depth) >= limit:
+                    break
+                depth[other] = min(d, depth.get(other, d))
+            depth.setdefault(node_id, 0)
+        members = sorted(depth, key=depth.get)[:limit]
+        return {
+            "nodes": {node_id: self.get_node(node_id) for node_id in members},
+            "edges": self.edge_index.edges_among(members),
+        }
+
+    # Sync
+
+    def changes_since(self, rev: int, limit: int = 500) -> Tuple[List[Dict[str, Any]], int]:
+        """Nodes changed after journal revision `rev` (deletions included), oldest first.
+
+        Returns ([{"id", "data", "version", "deleted"}], new_rev); pass new_rev
+        back to continue. Each node appears once, in its latest state.
+        """
+        with self._lock:
+            changes, new_rev = self.backend.changes_since(rev, limit)
+        return [
+            {"id": node_id, "data": data, "version": version, "deleted": deleted}
+            for node_id, data, version, deleted in changes
+        ], new_rev
+
+    def apply_changes(self, changes: List[Dict[str, Any]]) -> int:
+        """Merge changes from another replica; returns how many were applied.
+
+        A change is applied only if its version is newer than the local one
+        (deletions are versioned too), so replicas that have seen the same
+        changes agree, whatever order they saw them in.
+        """
+        with self._lock:
+            local = self.backend.versions_of([change["id"] for change in changes])
+            winners: Dict[str, Dict[str, Any]] = {}
+            for change in changes:
+                current = local.get(change["id"])
+                if current is None or change["version"] > current:
+                    local[change["id"]] = change["version"]
+                    winners[change["id"]] = change
+                self.clock.observe(change["version"])
+            puts = [change for change in winners.values() if not change.get("deleted")]
+            if puts:
+                self._put_nodes([(change["id"], change["data"]) for change in puts], [change["version"] for change in puts])
+            for change in winners.values():
+                if change.get("deleted"):
+                    self._delete_node(change["id"], change["version"])
+        return len(winners)
+
+    def stamp_unversioned(self) -> int:
+        """Version nodes that predate sync (or were migrated in), so they get pushed."""
+        with self._lock:
+            return self.backend.stamp_unversioned(self.clock.next())
+
+    def sync_state(self, key: str, default: str = None) -> Optional[str]:
+        value = self.backend.get_state(key)
+        return default if value is None else value
+
+    def set_sync_state(self, key: str, value: Any):
+        with self._lock:
+            self.backend.set_state(key, value)
+
+    # Similarity
+
+    @staticmethod
+    def node_text(node_id: str, properties: Dict[str, Any]) -> str:
+        """What gets embedded for a node: its id and every field value."""
+        return " ".join([node_id] + [text for _, text in flatten_fields(properties)])
+
+    def _active_vectors(self):
+        # Once an index exists on disk every write keeps it in step
+        if self._vectors is not None or (Config.KNOWLEDGE_VECTORS and os.path.exists(self.vector_path + ".meta")):
+            return self.vector_index
+        return None
+
+    @property
+    def vector_index(self):
+        # Under the write lock, so concurrent first callers open the files only once
+        with self._lock:
+            if self._vectors is None:
+                from memory.vector_index import HashingEmbedder, VectorIndex
+                self._embedder = HashingEmbedder()
+                self._vectors = VectorIndex(self.vector_path, self._embedder.dim, self._embedder.tag)
+                if len(self._vectors) != len(self):
+                    self.rebuild_vectors()
+            return self._vectors
+
+    def rebuild_vectors(self, batch: int = 10000):
+        """Re-embed every node (after an embedder change, or nodes written while the index was off)."""
+        with self._lock:
+            index = self._vectors if self._vectors is not None else self.vector_index
+            index.reset()
+            nodes = []
+            for item in self.backend.items():
+                nodes.append(item)
+                if len(nodes) >= batch:
+                    self._embed_nodes(index, nodes)
+                    nodes = []
+            self._embed_nodes(index, nodes)
+            index.flush()
+        print(f"[MEMORY] Embedded {len(index)} knowledge node(s)")
+
+    def _embed_nodes(self, index, nodes: List[Tuple[str, Dict[str, Any]]]):
+        if nodes:
+            index.add_many([node_id for node_id, _ in nodes],
+                           self._embedder.embed_many([self.node_text(n, p) for n, p in nodes]))
+
+    def similar(self, text: str, top_k: int = 5, min_score: float = 0.0) -> List[Dict[str, Any]]:
+        """Nodes whose text is closest to `text` (cosine over hashed n-gram vectors)."""
+        return self.similar_many([text], top_k, min_score)[0]
+
+    def similar_many(self, texts: List[str], top_k: int = 5, min_score: float = 0.0) -> List[List[Dict[str, Any]]]:
+        """similar() for several texts in one batched search."""
+        index = self.vector_index
+        queries = self._embedder.embed_many(texts)
+        # Writes may train or reorder the index (sync worker, other threads), so search under the same lock
+        with self._lock:
+            results = index.search_many(queries, top_k)
+        return [
+            [{"id": node_id, "data": self.get_node(node_id), "score": score}
+             for node_id, score in hits if score >= min_score]
+            for hits in results
+        ]
+
+    def close(self):
+        self.backend.close()
+        if self._vectors is not None:
+            self._vectors.close()
+
+    def __len__(self) -> int:
+        return self.backend.count()
+
+    def nodes(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        return self.backend.items()
 
     def get_node(self, node_id: str) -> Dict[str, Any]:
-        return self.data.get(node_id, {})
-
-    def search(self, query: str) -> List[Dict[str, Any]]:
-        # Simple keyword search
-        results = []
-        for key, value in self.data.items():
-            if query.lower() in str(value).lower():
-                results.append({"id": key, "data": value})
-        return results
+        return self.backend.get(node_id) or {}
+
+    def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        """Ranked keyword search (BM25). Terms are OR'ed; `field:term` searches one field only."""
+        return [
+            {"id": node_id, "data": data, "score": score}
+            for node_id, data, score in self.backend.search(query, top_k)
+        ]
@@ -0,0 +1,193 @@
+import atexit
+import json
+import os
+import threading
+import zlib
+from typing import Any, Dict, Iterable, Optional, Tuple
+from core.config import Config
+
+class LogStore:
+    """Append-only persistence for a dict of JSON-serializable records.
+
+    State lives in two files: a snapshot (`path`, a plain JSON object) and a
+    mutation log (`path` + ".log"), one CRC-checked JSON line per put/delete.
+    Mutations are appended and fsync'ed in batches (every `fsync_batch`
+    records or `fsync_interval` seconds, whichever comes first). When the log
+    outgrows the live data it is folded into a fresh snapshot (compaction).
+
+    Loading replays the log over the snapshot and stops at the first torn or
+    corrupt line, which is what a crash mid-append leaves behind.
+    """
+
+    def __init__(self, path: str, fsync_interval: float = None, fsync_batch: int = None,
+                 compact_ratio: float = None, compact_min: int = None):
+        self.path = path
+        self.log_path = path + ".log"
+        self.fsync_interval = fsync_interval if fsync_interval is not None else Config.KNOWLEDGE_FSYNC_INTERVAL
+        self.fsync_batch = fsync_batch or Config.KNOWLEDGE_FSYNC_BATCH
+        self.compact_ratio = compact_ratio or Config.KNOWLEDGE_COMPACT_RATIO
+        self.compact_min = compact_min or Config.KNOWLEDGE_COMPACT_MIN
+        self._lock = threading.RLock()
+        self._file = None
+        self._unsynced = 0
+        self.log_records = 0
+        self._stop = threading.Event()
+        self._syncer: Optional[threading.Thread] = None
+        self._registered = False
+
+    # Loading
+
+    def load(self) -> Dict[str, Any]:
+        """Read the snapshot and replay the log. Opens the log for appending."""
+        data = self._read_snapshot()
+        replayed, good_offset = self._replay(data)
+        with self._lock:
+            if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > good_offset:
+                # Drop the torn tail so new records don't land after garbage
+                print(f"[MEMORY] Discarding corrupt tail of {self.log_path}")
+                with open(self.log_path, "r+b") as f:
+                    f.truncate(good_offset)
+            self.log_records = replayed
+            self._open_log()
+        return data
+
+    def _read_snapshot(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except json.JSONDecodeError:
+            print(f"[MEMORY] Snapshot {self.path} is unreadable, starting from the log only")
+            return {}
+
+    def _replay(self, data: Dict[str, Any]) -> Tuple[int, int]:
+        if not os.path.exists(self.log_path):
+            return 0, 0
+        count, offset = 0, 0
+        with open(self.log_path, "rb") as f:
+            for line in f:
+                record = self._decode(line)
+                if record is None:
+                    break
+                self._apply(data, record)
+                count += 1
+                offset += len(line)
+        return count, offset
+
+    @staticmethod
+    def _apply(data: Dict[str, Any], record: Dict[str, Any]):
+        if record["op"] == "put":
+            data[record["id"]] = record["data"]
+        elif record["op"] == "del":
+            data.pop(record["id"], None)
+
+    @staticmethod
+    def _encode(record: Dict[str, Any]) -> bytes:
+        body = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        return b"%08x %s\n" % (zlib.crc32(body), body)
+
+    @staticmethod
+    def _decode(line: bytes) -> Optional[Dict[str, Any]]:
+        if not line.endswith(b"\n") or len(line) < 10:
+            return None
+        checksum, body = line[:8], line[9:-1]
+        try:
+            if int(checksum, 16) != zlib.crc32(body):
+                return None
+            return json.loads(body)
+        except ValueError:
+            return None
+
+    # Writing
+
+    def _open_log(self):
+        if self._file is None:
+            self._file = open(self.log_path, "ab")
+        if self._syncer is None:
+            self._stop = threading.Event()
+            self._syncer = threading.Thread(target=self._sync_loop, args=(self._stop,),
+                                            name="nexus-knowledge-sync", daemon=True)
+            self._syncer.start()
+            if not self._registered:
+                atexit.register(self.close)
+                self._registered = True
+
+    def put(self, key: str, value: Any):
+        self.append([{"op": "put", "id": key, "data": value}])
+
+    def put_many(self, items: Iterable[Tuple[str, Any]]):
+        self.append({"op": "put", "id": key, "data": value} for key, value in items)
+
+    def delete(self, key: str):
+        self.append([{"op": "del", "id": key}])
+
+    def append(self, records: Iterable[Dict[str, Any]]):
+        payload = b"".join(self._encode(r) for r in records)
+        if not payload:
+            return
+        with self._lock:
+            self._open_log()
+            self._file.write(payload)
+            added = payload.count(b"\n")
+            self.log_records += added
+            self._unsynced += added
+            if self._unsynced >= self.fsync_batch:
+                self._sync()
+
+    def _sync(self):
+        if self._file is None or not self._unsynced:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def flush(self):
+        """Make every appended record durable now."""
+        with self._lock:
+            self._sync()
+
+    def _sync_loop(self, stop: threading.Event):
+        while not stop.wait(self.fsync_interval):
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"[MEMORY] Log fsync failed, will retry: {e}")
+
+    # Compaction
+
+    def needs_compaction(self, live_count: int) -> bool:
+        return self.log_records >= max(self.compact_min, live_count * self.compact_ratio)
+
+    def compact(self, data: Dict[str, Any]):
+        """Write `data` as the new snapshot and start an empty log.
+
+        The snapshot is replaced atomically before the log is cleared; if we
+        crash in between, replaying the old log over the new snapshot yields
+        the same state, since records are absolute puts and deletes.
+        """
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._file = open(self.log_path, "wb")  # truncate
+            os.fsync(self._file.fileno())
+            self.log_records = 0
+            self._unsynced = 0
+
+    def close(self):
+        with self._lock:
+            self._stop.set()
+            self._syncer = None
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
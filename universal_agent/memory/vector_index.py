@@ -0,0 +1,491 @@
+import json
+import os
+import zlib
+from array import array
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from core.config import Config
+from memory.inverted_index import tokenize
+
+class HashingEmbedder:
+    """Text -> unit vector with no model download or network call.
+
+    Words and their character trigrams are hashed (crc32, so stable across
+    runs) into `dim` buckets with a random sign. Texts sharing words or word
+    fragments end up with a high cosine similarity, which is enough to pull
+    related memories into a prompt.
+    """
+
+    VERSION = "hash-ngram-v1"  # bump when the features change, so stored vectors get rebuilt
+    TRIGRAM_WEIGHT = 0.5
+
+    def __init__(self, dim: int = None):
+        self.dim = dim or Config.VECTOR_DIM
+        self._word_slots = lru_cache(maxsize=1 << 18)(self._slots)
+
+    @property
+    def tag(self) -> str:
+        return f"{self.VERSION}/{self.dim}"
+
+    def _hash(self, feature: str, weight: float) -> Tuple[int, float]:
+        h = zlib.crc32(feature.encode("utf-8"))
+        return h % self.dim, -weight if h & 0x80000000 else weight
+
+    def _slots(self, word: str) -> Tuple[Tuple[int, ...], Tuple[float, ...]]:
+        # Buckets and signed weights of a word and its trigrams; cached, words repeat a lot
+        padded = f"<{word}>"
+        features = [self._hash(word, 1.0)]
+        features.extend(self._hash(padded[i:i + 3], self.TRIGRAM_WEIGHT) for i in range(len(padded) - 2))
+        cols, values = zip(*features)
+        return cols, values
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        """One float32 row per text, L2-normalized (all-zero for texts without words)."""
+        cols, values, counts = [], [], []
+        slots, dim = self._word_slots, self.dim
+        for text in texts:
+            before = len(cols)
+            for word in tokenize(text):
+                word_cols, weights = slots(word)
+                cols.extend(word_cols)
+                values.extend(weights)
+            counts.append(len(cols) - before)
+        cells = np.repeat(np.arange(len(texts), dtype=np.intp) * dim, counts) + np.array(cols, dtype=np.intp)
+        out = np.bincount(cells, weights=np.array(values, dtype=np.float64),
+                          minlength=len(texts) * dim).astype(np.float32).reshape(len(texts), dim)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        out /= np.maximum(norms, 1e-12)
+        return out
+
+class VectorIndex:
+    """Persistent cosine-similarity index over unit vectors, keyed by string id.
+
+    Vectors sit in one float32 matrix, memory-mapped from `path` and grown in
+    place. Below `train_min` vectors every search is an exact scan. Beyond
+    that a small k-means splits them into clusters (an IVF index) and a search
+    only scores the `nprobe` clusters whose centroids are closest to the
+    query, so latency tracks n / nlist instead of n.
+
+    After training, the matrix is reordered so each cluster is one contiguous
+    block that a search scores with a single slice, no gather. Rows appended
+    later go to a tail with per-cluster lists, and removed rows in the blocks
+    are zeroed; once tail and holes outgrow `reorder_ratio` of the blocks the
+    matrix is reordered again (the same base + overlay scheme as EdgeIndex).
+
+    Files next to `path`: ".ids" (id of each row) + ".ids.log" (changes
+    since), ".lists" (cluster of each row), ".centroids.npy" and ".meta".
+    The index is derived data: if the stored embedder tag or dimension
+    differs, it starts empty.
+    """
+
+    GROW_ROWS = 65536
+    SCAN_CHUNK = 65536
+
+    def __init__(self, path: str, dim: int, tag: str = "", nprobe: int = None, train_min: int = None,
+                 reorder_ratio: float = 0.25):
+        self.path = path
+        self.dim = dim
+        self.tag = tag
+        self.nprobe = nprobe or Config.VECTOR_NPROBE
+        self.train_min = train_min or Config.VECTOR_TRAIN_MIN
+        self.reorder_ratio = reorder_ratio
+        self.ids_path = path + ".ids"
+        self.log_path = path + ".ids.log"
+        self.lists_path = path + ".lists"
+        self.centroids_path = path + ".centroids.npy"
+        self.meta_path = path + ".meta"
+        self._ids: Dict[str, int] = {}
+        self._row_ids: List[Optional[str]] = []
+        self._free: List[int] = []  # empty tail rows, reused first
+        self._holes = 0  # removed rows inside the cluster blocks, reclaimed by reorder()
+        self._log = None
+        self._log_records = 0
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_on = 0
+        self.sorted_rows = 0  # rows [0, sorted_rows) are grouped by cluster
+        self._bounds: Optional[np.ndarray] = None  # cluster c is rows [_bounds[c], _bounds[c + 1])
+        self._tail_lists: List[array] = []  # tail rows per cluster
+        self._open()
+
+    # Files
+
+    def _open(self):
+        meta = {}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        if meta.get("dim") != self.dim or meta.get("tag") != self.tag:
+            if meta:
+                print(f"[MEMORY] Vector index {self.path} was built with {meta.get('tag')} (dim {meta.get('dim')}), rebuilding")
+            self._remove_files()
+            meta = {}
+        self.trained_on = meta.get("trained_on", 0)
+        self.sorted_rows = meta.get("sorted_rows", 0)
+        self._write_meta()
+
+        for path in (self.path, self.lists_path):
+            if not os.path.exists(path):
+                open(path, "wb").close()
+        self._map(os.path.getsize(self.path) // (self.dim * 4))
+        self._load_ids()
+        if self.trained_on and os.path.exists(self.centroids_path):
+            self.centroids = np.load(self.centroids_path)
+            self._index_clusters()
+        self._log = open(self.log_path, "ab")
+
+    def _map(self, capacity: int):
+        for path, row_bytes in ((self.path, self.dim * 4), (self.lists_path, 4)):
+            if os.path.getsize(path) < capacity * row_bytes:
+                with open(path, "r+b") as f:
+                    f.truncate(capacity * row_bytes)  # sparse extension, no copy
+        self.capacity = capacity
+        if capacity:
+            self.matrix = np.memmap(self.path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+            self.assign = np.memmap(self.lists_path, dtype=np.int32, mode="r+", shape=(capacity,))
+        else:
+            self.matrix = np.zeros((0, self.dim), dtype=np.float32)
+            self.assign = np.zeros(0, dtype=np.int32)
+
+    def _reserve(self, rows: int):
+        if rows > self.capacity:
+            self._flush_maps()
+            self._map(max(rows, self.capacity * 2, self.GROW_ROWS))
+
+    def _load_ids(self):
+        row_ids: List[Optional[str]] = []
+        if os.path.exists(self.ids_path):
+            with open(self.ids_path, "rb") as f:
+                row_ids = [node_id or None for node_id in f.read().decode("utf-8").split("\n")[:-1]]
+        if os.path.exists(self.log_path):
+            good_offset = 0
+            with open(self.log_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn append
+                    row, _, node_id = line[:-1].decode("utf-8").partition("\t")
+                    row = int(row)
+                    if row >= len(row_ids):
+                        row_ids.extend([None] * (row + 1 - len(row_ids)))
+                    row_ids[row] = node_id or None
+                    good_offset += len(line)
+                    self._log_records += 1
+            if os.path.getsize(self.log_path) > good_offset:
+                with open(self.log_path, "r+b") as f:
+                    f.truncate(good_offset)
+        del row_ids[self.capacity:]
+        while row_ids and row_ids[-1] is None:
+            row_ids.pop()
+        self._row_ids = row_ids
+        self._ids = dict(zip(row_ids, range(len(row_ids))))
+        self._ids.pop(None, None)
+        self.sorted_rows = min(self.sorted_rows, len(row_ids))
+        self._holes = row_ids[:self.sorted_rows].count(None)
+        self._free = [row for row in range(len(row_ids) - 1, self.sorted_rows - 1, -1) if row_ids[row] is None]
+
+    def _write_ids(self):
+        """Snapshot the row -> id table and start an empty change log."""
+        tmp_path = self.ids_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write("".join(f"{node_id or ''}\n" for node_id in self._row_ids).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.ids_path)
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self.log_path, "wb")
+        self._log_records = 0
+
+    def _append_log(self, lines: List[str]):
+        if not lines:
+            return
+        self._log.write("".join(lines).encode("utf-8"))
+        self._log.flush()
+        self._log_records += len(lines)
+        if self._log_records > max(10000, len(self._ids) // 4):
+            self._write_ids()
+
+    def _write_meta(self):
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "tag": self.tag, "trained_on": self.trained_on,
+                       "sorted_rows": self.sorted_rows}, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _remove_files(self):
+        for path in (self.path, self.ids_path, self.log_path, self.lists_path, self.centroids_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _flush_maps(self):
+        if isinstance(self.matrix, np.memmap):
+            self.matrix.flush()
+            self.assign.flush()
+
+    def flush(self):
+        """Write dirty pages and the id log to disk."""
+        self._flush_maps()
+        if self._log is not None:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+
+    def close(self):
+        if self._log is not None:
+            self.flush()
+            self._log.close()
+            self._log = None
+
+    def reset(self):
+        """Drop every vector (and the trained clusters)."""
+        self.close()
+        self._remove_files()
+        self._ids, self._row_ids, self._free, self._holes = {}, [], [], 0
+        self._log_records = 0
+        self.centroids, self.trained_on, self.sorted_rows = None, 0, 0
+        self._bounds, self._tail_lists = None, []
+        self._open()
+
+    # Clusters
+
+    def _index_clusters(self):
+        nlist = len(self.centroids)
+        self._bounds = np.searchsorted(np.asarray(self.assign[:self.sorted_rows]), np.arange(nlist + 1))
+        labels = np.asarray(self.assign[self.sorted_rows:len(self._row_ids)])
+        rows = np.flatnonzero(labels >= 0)  # freed tail rows are labelled -1
+        order = rows[np.argsort(labels[rows], kind="stable")]
+        cuts = np.searchsorted(labels[order], np.arange(nlist + 1))
+        order += self.sorted_rows
+        self._tail_lists = [array("q", order[cuts[c]:cuts[c + 1]].tolist()) for c in range(nlist)]
+
+    def _nearest_centroids(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def train(self, nlist: int = None, iterations: int = 6, sample_size: int = None):
+        """Cluster the stored vectors (spherical k-means on a sample), then reorder by cluster."""
+        live = np.array(sorted(self._ids.values()), dtype=np.int64)
+        if not len(live):
+            return
+        nlist = nlist or int(min(max(2 * np.sqrt(len(live)), 16), 4096))
+        nlist = min(nlist, len(live))
+        rng = np.random.default_rng(0)
+        sample_size = min(sample_size or nlist * 32, len(live))
+        sample = np.asarray(self.matrix[np.sort(rng.choice(live, sample_size, replace=False))])
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(labels, kind="stable")
+            present, starts = np.unique(labels[order], return_index=True)
+            sums = np.zeros_like(centroids)
+            sums[present] = np.add.reduceat(sample[order], starts, axis=0)
+            empty = ~sums.any(axis=1)
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+        self.centroids = centroids.astype(np.float32)
+
+        for start in range(0, len(live), self.SCAN_CHUNK):
+            rows = live[start:start + self.SCAN_CHUNK]
+            self.assign[rows] = self._nearest_centroids(np.asarray(self.matrix[rows]))
+        np.save(self.centroids_path, self.centroids)
+        self.trained_on = len(live)
+        self.reorder()
+        print(f"[MEMORY] Vector index trained: {nlist} clusters over {len(live)} vectors")
+
+    def reorder(self):
+        """Rewrite the matrix grouped by cluster, dropping holes and emptying the tail."""
+        if self.centroids is None:
+            return
+        live = np.array([row for row, node_id in enumerate(self._row_ids) if node_id is not None], dtype=np.int64)
+        order = live[np.argsort(np.asarray(self.assign[live]), kind="stable")]
+        capacity = max(self.capacity, 1)
+        matrix_tmp, lists_tmp = self.path + ".tmp", self.lists_path + ".tmp"
+        matrix = np.memmap(matrix_tmp, dtype=np.float32, mode="w+", shape=(capacity, self.dim))
+        assign = np.memmap(lists_tmp, dtype=np.int32, mode="w+", shape=(capacity,))
+        for start in range(0, len(order), self.SCAN_CHUNK):
+            rows = order[start:start + self.SCAN_CHUNK]
+            matrix[start:start + len(rows)] = self.matrix[rows]
+            assign[start:start + len(rows)] = self.assign[rows]
+        matrix.flush()
+        assign.flush()
+        del matrix, assign
+        self.matrix = self.assign = None
+        os.replace(matrix_tmp, self.path)
+        os.replace(lists_tmp, self.lists_path)
+
+        row_ids = self._row_ids
+        self._row_ids = [row_ids[row] for row in order.tolist()]
+        self._ids = dict(zip(self._row_ids, range(len(self._row_ids))))
+        self._free, self._holes = [], 0
+        self.sorted_rows = len(self._row_ids)
+        self._map(capacity)
+        self._write_ids()
+        self._write_meta()
+        self._index_clusters()
+
+    def _maybe_train(self):
+        live = len(self._ids)
+        if self.centroids is None:
+            if live >= self.train_min:
+                self.train()
+        elif live > self.trained_on * 8:
+            self.train()  # clusters grew far past what they were sized for
+        elif len(self._row_ids) - self.sorted_rows + self._holes > max(10000, self.sorted_rows * self.reorder_ratio):
+            self.reorder()
+
+    # Mutation
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self._ids
+
+    def add_many(self, ids: Sequence[str], vectors: np.ndarray):
+        """Insert or replace vectors (rows of `vectors`, already unit length)."""
+        if not len(ids):
+            return
+        if len(set(ids)) != len(ids):
+            last = {node_id: i for i, node_id in enumerate(ids)}
+            keep = sorted(last.values())
+            ids, vectors = [ids[i] for i in keep], vectors[keep]
+        trained = self.centroids is not None
+        labels = self._nearest_centroids(vectors).tolist() if trained else [-1] * len(ids)
+        rows, lines = [], []
+        for node_id, label in zip(ids, labels):
+            row = self._ids.get(node_id)
+            if row is not None and trained and int(self.assign[row]) != label:
+                if row < self.sorted_rows:
+                    self._release(row, lines)  # can't leave its cluster's block: move to the tail
+                    row = None
+                else:
+                    self._tail_lists[int(self.assign[row])].remove(row)
+                    self._tail_lists[label].append(row)
+            if row is None:
+                row = self._free.pop() if self._free else len(self._row_ids)
+                if row == len(self._row_ids):
+                    self._row_ids.append(None)
+                self._row_ids[row] = node_id
+                self._ids[node_id] = row
+                lines.append(f"{row}\t{node_id}\n")
+                if trained:
+                    self._tail_lists[label].append(row)
+            rows.append(row)
+        self._reserve(len(self._row_ids))
+        index = np.array(rows, dtype=np.int64)
+        self.matrix[index] = vectors
+        self.assign[index] = labels
+        self._append_log(lines)
+        self._maybe_train()
+
+    def add(self, node_id: str, vector: np.ndarray):
+        self.add_many([node_id], vector.reshape(1, -1))
+
+    def remove(self, node_id: str):
+        row = self._ids.pop(node_id, None)
+        if row is None:
+            return
+        lines = []
+        self._release(row, lines)
+        self._append_log(lines)
+
+    def _release(self, row: int, lines: List[str]):
+        self.matrix[row] = 0.0  # a zero row scores 0 wherever it is still scanned
+        self._row_ids[row] = None
+        if row < self.sorted_rows:
+            self._holes += 1  # keeps its cluster label so the block stays sorted
+        else:
+            if self.centroids is not None:
+                self._tail_lists[int(self.assign[row])].remove(row)
+            self.assign[row] = -1
+            self._free.append(row)
+        lines.append(f"{row}\t\n")
+
+    # Search
+
+    def search(self, vector: np.ndarray, k: int = 10) -> List[Tuple[str, float]]:
+        return self.search_many(vector.reshape(1, -1), k)[0]
+
+    def search_many(self, queries: np.ndarray, k: int = 10) -> List[List[Tuple[str, float]]]:
+        """Top `k` (id, cosine) pairs per query row, best first."""
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if not len(self._ids) or k <= 0:
+            return [[] for _ in range(len(queries))]
+        margin = self._holes + len(self._free)  # empty rows that may outscore real ones
+        if self.centroids is None:
+            parts = self._scan_all(queries, k + margin)
+        else:
+            parts = self._scan_probed(queries)
+
+        results = []
+        row_ids = self._row_ids
+        for query_parts in parts:
+            if not query_parts:
+                results.append([])
+                continue
+            rows = np.concatenate([r for r, _ in query_parts])
+            scores = np.concatenate([s for _, s in query_parts])
+            take = min(k + margin, len(scores))
+            top = np.argpartition(-scores, take - 1)[:take] if take < len(scores) else np.arange(len(scores))
+            top = top[np.argsort(-scores[top])]
+            hits = []
+            for i in top.tolist():
+                node_id = row_ids[rows[i]]
+                if node_id is not None:
+                    hits.append((node_id, float(scores[i])))
+                    if len(hits) == k:
+                        break
+            results.append(hits)
+        return results
+
+    def _scan_all(self, queries: np.ndarray, keep: int) -> List[List[Tuple[np.ndarray, np.ndarray]]]:
+        # Exact: score every row chunk by chunk, keeping each chunk's best `keep` per query
+        count = len(self._row_ids)
+        parts = [[] for _ in range(len(queries))]
+        for start in range(0, count, self.SCAN_CHUNK):
+            block = self.matrix[start:min(start + self.SCAN_CHUNK, count)] @ queries.T
+            if len(block) > keep:
+                top = np.argpartition(-block, keep - 1, axis=0)[:keep]
+                block = np.take_along_axis(block, top, axis=0)
+            else:
+                top = np.broadcast_to(np.arange(len(block))[:, None], block.shape)
+            for i in range(len(queries)):
+                parts[i].append((top[:, i] + start, block[:, i]))
+        return parts
+
+    def _scan_probed(self, queries: np.ndarray) -> List[List[Tuple[np.ndarray, np.ndarray]]]:
+        # IVF: each query scores only its `nprobe` nearest clusters. A cluster probed by
+        # several queries in the batch is read once and scored for all of them.
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        by_cluster: Dict[int, List[int]] = {}
+        for i, clusters in enumerate(probes.tolist()):
+            for cluster in clusters:
+                by_cluster.setdefault(cluster, []).append(i)
+        parts = [[] for _ in range(len(queries))]
+        for cluster in sorted(by_cluster):  # ascending blocks: sequential reads of the memmap
+            asking = by_cluster[cluster]
+            batch = queries[asking].T
+            start, end = int(self._bounds[cluster]), int(self._bounds[cluster + 1])
+            blocks = []
+            if end > start:
+                blocks.append((np.arange(start, end), self.matrix[start:end] @ batch))
+            tail = self._tail_lists[cluster]
+            if len(tail):
+                rows = np.frombuffer(tail, dtype=np.int64)
+                blocks.append((rows, self.matrix[rows] @ batch))
+            for rows, scores in blocks:
+                for j, i in enumerate(asking):
+                    parts[i].append((rows, scores[:, j]))
+        return parts
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "vectors": len(self._ids),
+            "clusters": 0 if self.centroids is None else len(self.centroids),
+            "trained_on": self.trained_on,
+            "sorted": self.sorted_rows,
+            "tail": len(self._row_ids) - self.sorted_rows,
+            "holes": self._holes,
+        }
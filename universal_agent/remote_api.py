@@ -7,12 +7,16 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.database import Database
-from core.types import Task
+from core.retention import RetentionManager
+from core.types import Task, TaskStatus
 import asyncio
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for remote access
 db = Database()
+retention = None  # Archived task history; the agent's RetentionManager when hosted by run_remote_api
+orchestrator = None  # Set by run_remote_api when hosted inside the agent process
+STATUS_VALUES = [s.value for s in TaskStatus]
 
 @app.route('/')
 def index():
@@ -22,17 +26,63 @@ def index():
         "version": "1.0"
     })
 
-@app.route('/api/tasks', methods=['GET'])
-def get_tasks():
-    tasks = db.get_all_tasks()
-    return jsonify([{
+def task_to_dict(t: Task):
+    return {
         "id": t.id,
         "description": t.description,
         "status": t.status.value,
         "result": t.result,
         "error": t.error,
         "created_at": t.created_at.isoformat()
-    } for t in tasks])
+    }
+
+def get_retention() -> RetentionManager:
+    # Standalone (python remote_api.py, or the app used directly) there is no agent's to share
+    global retention
+    if retention is None:
+        retention = RetentionManager()
+    return retention
+
+def bad_status(status):
+    """A 400 response for an unknown ?status= value, else None."""
+    if status and status not in STATUS_VALUES:
+        return jsonify({"error": f"Unknown status {status!r}", "valid": STATUS_VALUES}), 400
+    return None
+
+@app.route('/api/tasks', methods=['GET'])
+def get_tasks():
+    if not request.args:
+        # Bare /api/tasks keeps its original shape, a list, now capped at the newest page
+        tasks, _ = db.get_tasks(limit=db.page_size())
+        return jsonify([task_to_dict(t) for t in tasks])
+    limit = request.args.get('limit', 50, type=int)
+    since = request.args.get('since', type=int)
+    if since is not None:
+        # Change feed: ?since=<rev> returns only tasks created or modified after rev
+        tasks, rev = db.changes_since(since, limit)
+        return jsonify({
+            "tasks": [task_to_dict(t) for t in tasks],
+            "rev": rev,
+            "more": len(tasks) == db.page_size(limit)  # a full page; the server may have clamped limit
+        })
+
+    # Paginated: ?limit=50&before=<next_cursor>&status=completed
+    # rev is read first so following changes from it can't miss a write made meanwhile
+    status = request.args.get('status')
+    error = bad_status(status)
+    if error:
+        return error
+    rev = db.current_rev()
+    tasks, next_cursor = db.get_tasks(
+        limit=limit,
+        before_cursor=request.args.get('before'),
+        status=status
+    )
+    return jsonify({
+        "tasks": [task_to_dict(t) for t in tasks],
+        "next_cursor": next_cursor,
+        "rev": rev
+    })
 
 @app.route('/api/submit', methods=['POST'])
 def submit_task():
@@ -44,19 +94,69 @@ def submit_task():
         return jsonify({"status": "success", "id": task.id})
     return jsonify({"status": "error"}), 400
 
+@app.route('/api/tasks/<task_id>/cancel', methods=['POST'])
+def cancel_task(task_id):
+    if orchestrator is None:
+        # Standalone: the agent process may be running this task from memory and
+        # would overwrite a cancelled row, so don't claim a cancel we can't enforce
+        return jsonify({"status": "error", "message": "Cancelling needs the API hosted by the running agent (main.py)"}), 503
+    if orchestrator.cancel_task(task_id):
+        return jsonify({"status": "success", "id": task_id})
+    
+    # Not tracked by the orchestrator (e.g. submitted through /api/submit): nothing
+    # will run it, so marking the row is enough if it never started
+    task = db.get_task(task_id)
+    if not task:
+        return jsonify({"status": "error", "message": "Task not found"}), 404
+    if task.status != TaskStatus.PENDING:
+        return jsonify({"status": "error", "message": f"Task is {task.status.value}"}), 409
+    task.status = TaskStatus.CANCELLED
+    task.error = "Cancelled"
+    db.save_task(task)
+    return jsonify({"status": "success", "id": task_id})
+
 @app.route('/api/status', methods=['GET'])
 def get_status():
-    tasks = db.get_all_tasks()
+    counts = db.count_by_status()
+    status = {"total_tasks": sum(counts.values())}
+    for task_status in TaskStatus:
+        status[task_status.value] = counts.get(task_status.value, 0)
+    return jsonify(status)
+
+@app.route('/api/archive', methods=['GET'])
+def get_archive():
+    # Archived history, same paging as /api/tasks: ?limit=50&before=<next_cursor>&status=failed
+    status = request.args.get('status')
+    error = bad_status(status)
+    if error:
+        return error
+    tasks, next_cursor = get_retention().query_archive(
+        limit=request.args.get('limit', 50, type=int),
+        before_cursor=request.args.get('before'),
+        status=status
+    )
     return jsonify({
-        "total_tasks": len(tasks),
-        "pending": len([t for t in tasks if t.status.value == "pending"]),
-        "running": len([t for t in tasks if t.status.value == "running"]),
-        "completed": len([t for t in tasks if t.status.value == "completed"]),
-        "failed": len([t for t in tasks if t.status.value == "failed"])
+        "tasks": [task_to_dict(t) for t in tasks],
+        "next_cursor": next_cursor
     })
 
-def run_remote_api(host='0.0.0.0', port=8080):
+@app.route('/api/archive/<task_id>', methods=['GET'])
+def get_archived_task(task_id):
+    task = get_retention().get_archived_task(task_id)
+    if not task:
+        return jsonify({"error": "Task not found in archive"}), 404
+    return jsonify(task_to_dict(task))
+
+@app.route('/api/archive/run', methods=['POST'])
+def run_retention():
+    moved = get_retention().run_once()
+    return jsonify({"status": "success", "archived": moved, **get_retention().stats()})
+
+def run_remote_api(host='0.0.0.0', port=8080, task_orchestrator=None, retention_manager=None):
     """Run the remote API server"""
+    global orchestrator, retention
+    orchestrator = task_orchestrator
+    retention = retention_manager or get_retention()
     print(f"[REMOTE API] Starting on http://{host}:{port}")
     print(f"[REMOTE API] Access from other devices at http://<your-ip>:{port}")
     app.run(host=host, port=port, debug=False)
@@ -2,32 +2,69 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request
 from core.database import Database
-from core.types import Task
+from core.types import Task, TaskStatus
 
 app = Flask(__name__)
 db = Database()
+STATUS_VALUES = [s.value for s in TaskStatus]
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/api/tasks')
-def get_tasks():
-    tasks = db.get_all_tasks()
+def task_to_dict(t):
     # Convert tasks to dict for JSON serialization
-    return jsonify([{
+    return {
         "id": t.id,
         "description": t.description,
         "status": t.status.value,
         "result": t.result,
-        "error": t.error
-    } for t in tasks])
+        "error": t.error,
+        "created_at": t.created_at.isoformat()
+    }
+
+def bad_status(status):
+    """A 400 response for an unknown ?status= value, else None."""
+    if status and status not in STATUS_VALUES:
+        return jsonify({"error": f"Unknown status {status!r}", "valid": STATUS_VALUES}), 400
+    return None
+
+@app.route('/api/tasks')
+def get_tasks():
+    if not request.args:
+        # Bare /api/tasks keeps its original shape, a list, now capped at the newest page
+        tasks, _ = db.get_tasks(limit=db.page_size())
+        return jsonify([task_to_dict(t) for t in tasks])
+    limit = request.args.get('limit', 50, type=int)
+    since = request.args.get('since', type=int)
+    if since is not None:
+        tasks, rev = db.changes_since(since, limit)
+        return jsonify({
+            "tasks": [task_to_dict(t) for t in tasks],
+            "rev": rev,
+            "more": len(tasks) == db.page_size(limit)  # a full page; the server may have clamped limit
+        })
+
+    status = request.args.get('status')
+    error = bad_status(status)
+    if error:
+        return error
+    rev = db.current_rev()
+    tasks, next_cursor = db.get_tasks(
+        limit=limit,
+        before_cursor=request.args.get('before'),
+        status=status
+    )
+    return jsonify({
+        "tasks": [task_to_dict(t) for t in tasks],
+        "next_cursor": next_cursor,
+        "rev": rev
+    })
 
 @app.route('/api/submit', methods=['POST'])
 def submit_task():
-    from flask import request
     data = request.json
     description = data.get('description')
     if description:
@@ -11,6 +11,8 @@ class NexusGUI:
         self.brain = brain
         self.voice = voice
         self.db = Database()
+        self._tasks = {}  # task id -> Task currently shown
+        self._task_rev = None  # last task revision seen; None until the first full load
         
         # Create main window
         self.root = tk.Tk()
@@ -58,7 +60,12 @@ class NexusGUI:
         submit_btn = tk.Button(input_frame, text="Execute", command=self.submit_command,
                               bg='#38bdf8', fg='#0f172a', font=('Arial', 10, 'bold'),
                               relief=tk.FLAT, padx=20, pady=5, cursor='hand2')
-        submit_btn.pack(pady=5)
+        submit_btn.pack(side=tk.LEFT, pady=5)
+        
+        stop_btn = tk.Button(input_frame, text="Stop Tasks", command=self.cancel_tasks,
+                            bg='#ef4444', fg='#0f172a', font=('Arial', 10, 'bold'),
+                            relief=tk.FLAT, padx=20, pady=5, cursor='hand2')
+        stop_btn.pack(side=tk.LEFT, padx=10, pady=5)
         
         # Task List
         task_frame = ttk.Frame(self.root, style='Dark.TFrame')
@@ -104,8 +111,23 @@ class NexusGUI:
             # Force immediate refresh
             self.root.after(500, self.update_task_list)
             
+    def cancel_tasks(self):
+        cancelled = self.brain.orchestrator.cancel_all()
+        print(f"[GUI] Cancelled {cancelled} task(s)")
+        self.root.after(500, self.update_task_list)
+            
     def update_task_list(self):
-        tasks = self.db.get_all_tasks()
+        if self._task_rev is None:
+            self._task_rev = self.db.current_rev()
+            tasks, _ = self.db.get_tasks(limit=20)  # Show last 20 tasks
+        else:
+            tasks, self._task_rev = self.db.changes_since(self._task_rev)
+            if not tasks:
+                return  # Nothing changed since the last refresh
+        for task in tasks:
+            self._tasks[task.id] = task
+        tasks = sorted(self._tasks.values(), key=lambda t: t.created_at, reverse=True)[:20]
+        self._tasks = {task.id: task for task in tasks}
         
         self.task_display.config(state=tk.NORMAL)
         self.task_display.delete(1.0, tk.END)
@@ -113,12 +135,14 @@ class NexusGUI:
         if not tasks:
             self.task_display.insert(tk.END, "No tasks yet. Say 'Nexus' or type a command above.\n")
         else:
-            for task in tasks[:20]:  # Show last 20 tasks
+            for task in tasks:
                 status_color = {
                     'pending': '🟡',
                     'running': '🔵',
                     'completed': '🟢',
-                    'failed': '🔴'
+                    'failed': '🔴',
+                    'cancelled': '⚫',
+                    'timed_out': '🟠'
                 }.get(task.status.value, '⚪')
                 
                 self.task_display.insert(tk.END, f"{status_color} {task.status.value.upper()}\n", 'status')